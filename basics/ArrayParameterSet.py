@@ -0,0 +1,541 @@
+from numbers import Number
+from typing import Any, Callable
+
+import numpy as np
+
+from basics.Parameters import Parameter, DerivedParameter, compile_derived_formulas
+from basics.ValueHistory import (ValueHistory, INTEGRATION_METHODS, step_intervals, step_integrals, derivatives,
+                                 window_integral)
+
+
+class ArrayParameter:
+    """
+    ArrayParameter
+    ---
+    Представление одного параметра ArrayParameterSet с интерфейсом Parameter: значение, границы, признак сенсора,
+    предыдущие значения и интеграл читаются из массивов набора. Описание параметра (имя, единицы, формула)
+    берётся из исходного Parameter / DerivedParameter.
+
+    Аргументы:
+        parameter_set: ArrayParameterSet    - Набор, в массивах которого хранится параметр
+        position: int                       - Номер параметра в массивах набора
+        definition: Parameter               - Исходное описание параметра
+    """
+
+    def __init__(self, parameter_set: "ArrayParameterSet", position: int, definition: Parameter) -> None:
+        self._set = parameter_set
+        self.position = position
+        self.definition = definition
+        self.name = definition.name
+        self.units = definition.units
+        self.description = definition.description
+        self.category = definition.category
+        self.sensor = definition.sensor
+        self.sensor_noise = definition.sensor_noise
+        self.min_value = definition.min_value
+        self.max_value = definition.max_value
+        self.previous_value_depth = definition.previous_value_depth
+        self.formula_func = getattr(definition, "formula_func", None)
+        self.dependencies = getattr(definition, "dependencies", None)
+
+    @property
+    def value(self) -> Number:
+        return self._set.values[self.position]
+
+    @property
+    def previous_values(self) -> list[Number]:
+        """Предыдущие значения, начиная с последнего, как в Parameter.previous_values"""
+        return self._set.previous_values(self.position)
+
+    @property
+    def Integral(self) -> Number:
+        return self._set.integrals[self.position]
+
+    def read_sensor(self) -> Number:
+        if self.sensor_noise is None:
+            return self.value
+        return self.sensor_noise(self.value)
+
+    def validate(self) -> None:
+        self._set.validate_index(self.position)
+
+    def derivative(self, dt: Number | None = None, order: int = 1) -> Number:
+        return self._set.get_derivative([self.name], dt=dt, order=order)[self.name]
+
+    def symbolic(self):
+        return self.definition.symbolic() if isinstance(self.definition, DerivedParameter) else None
+
+    def __str__(self):
+        return f"{self.name} = {self.value} {self.units}"
+
+    def __call__(self):
+        return self.value
+
+
+class ArrayParameterSet:
+    """
+    ArrayParameterSet
+    ---
+    Набор параметров с хранением в непрерывных массивах NumPy: значения, границы, признаки сенсоров,
+    предыдущие значения (кольцевой буфер на параметр) и интегралы. Имя параметра переводится в номер через
+    словарь index, для горячих циклов есть доступ по номеру (get/set) и пакетная загрузка (load_array/as_array).
+    Вместе с предыдущими значениями хранятся отметки времени (time, см. set_time), интегралы и производные
+    по ним считаются векторно для всех параметров сразу.
+
+    Совместим с ParameterSet по интерфейсу, который используют функциональные блоки: __getitem__/__setitem__,
+    as_dict, load_dict, update_derived, params_dict, order, интегралы, snapshot/restore.
+    Поддерживаются только числовые параметры, значения хранятся как float64.
+
+    Аргументы:
+        **params: Parameter     - Набор именованных параметров (класс Parameter или DerivedParameter)
+    """
+
+    def __init__(self, **params: Parameter | DerivedParameter) -> None:
+        self._compiled_derived = None  # (функция, номера входов, номера результатов), если включена компиляция
+        self._compile_options = None  # Аргументы compile_derived, None - компиляция не включена
+        self.compile_stats = None  # Статистика компиляции зависимых параметров, см. compile_derived_formulas
+        self.time = None  # Отметка времени для записываемых значений, см. set_time
+        self._tracked_integrals = {}  # {ключ: (ключ для записи интеграла или None, метод)}, см. track_integral
+        self._tracked_derivatives = {}  # {ключ: (ключ для записи производной, порядок)}, см. track_derivative
+        self._build(params)
+
+    @classmethod
+    def from_parameter_set(cls, parameter_set) -> "ArrayParameterSet":
+        """Набор в массивах с теми же параметрами, текущими значениями и отслеживаемыми интегралами и производными,
+        что и parameter_set"""
+        result = cls(**parameter_set.params_dict)
+        result._tracked_integrals = dict(getattr(parameter_set, "_tracked_integrals", {}))
+        result._tracked_derivatives = dict(getattr(parameter_set, "_tracked_derivatives", {}))
+        result.time = getattr(getattr(parameter_set, "clock", None), "time", None)
+        return result
+
+    def _build(self, params: dict[str, Parameter | DerivedParameter]) -> None:
+        definitions = {key: param.definition if isinstance(param, ArrayParameter) else param
+                       for key, param in params.items()}
+        # Представления ArrayParameter читают массивы этого же набора, поэтому их состояние
+        # забираем до того, как массивы будут созданы заново (update)
+        states = {key: (param.value, param._set._history_copy(param.position), param.Integral)
+                  if isinstance(param, ArrayParameter) else (param.value, param.previous_values, param.Integral)
+                  for key, param in params.items()}
+        self.names: list[str] = list(definitions.keys())
+        self.index: dict[str, int] = {key: position for position, key in enumerate(self.names)}
+        size = len(self.names)
+
+        self.values = np.zeros(size, dtype=np.float64)
+        for key, (value, _, _) in states.items():
+            if value is None and isinstance(definitions[key], DerivedParameter):
+                continue  # Зависимый параметр будет вычислен ниже
+            if not isinstance(value, Number):
+                raise TypeError(f"{key}: в ArrayParameterSet допустимы только числовые параметры, получено {value!r}")
+            self.values[self.index[key]] = value
+        self.min_values = np.array([-np.inf if p.min_value is None else p.min_value for p in definitions.values()],
+                                   dtype=np.float64)
+        self.max_values = np.array([np.inf if p.max_value is None else p.max_value for p in definitions.values()],
+                                   dtype=np.float64)
+        self.sensor = np.array([p.sensor is True for p in definitions.values()], dtype=bool)
+        self.derived = np.array([isinstance(p, DerivedParameter) for p in definitions.values()], dtype=bool)
+        self.sensor_noise: list[Callable[[Number], Number] | None] = [p.sensor_noise for p in definitions.values()]
+        self.integrals = np.array([states[key][2] for key in self.names], dtype=np.float64)
+
+        # Предыдущие значения: кольцевой буфер на каждый параметр, позиция последнего значения и их число
+        self._history_limit = np.array([(p.previous_value_depth or 0) + 1 for p in definitions.values()], dtype=np.int64)
+        self._history = np.zeros((size, int(self._history_limit.max(initial=1))), dtype=np.float64)
+        self._history_position = np.full(size, -1, dtype=np.int64)
+        self._history_count = np.zeros(size, dtype=np.int64)
+        self._history_times = np.full_like(self._history, np.nan)
+        for key, (_, previous_values, _) in states.items():
+            self._load_history(self.index[key], previous_values)
+
+        self.params_dict: dict[str, ArrayParameter] = {key: ArrayParameter(self, self.index[key], definitions[key])
+                                                       for key in self.names}
+        self._params = self.params_dict
+
+        # Граф зависимостей и порядок пересчёта, как в ParameterSet
+        self._graph = {key: [] for key in self.names}
+        for key, definition in definitions.items():
+            if isinstance(definition, DerivedParameter):
+                for dependency in definition.dependencies:
+                    if dependency not in self.index:
+                        raise KeyError(f"Зависимость '{dependency}' не найдена для '{key}'")
+                    self._graph[dependency].append(key)
+        self.order = self._topological_sort(definitions)
+        self._derived_plan = [(self.index[key], definitions[key].formula_func,
+                               [self.index[dependency] for dependency in definitions[key].dependencies])
+                              for key in self.order if isinstance(definitions[key], DerivedParameter)]
+        self._definitions = definitions
+        self._changed = None  # Номера параметров, изменённых после пересчёта зависимых, None - нужен полный пересчёт
+        self._affected_cache = {}  # Номера зависимых параметров для набора изменённых, см. _affected_derived
+        self._affected_plan = {}  # Шаги _derived_plan для набора изменённых
+        if self._compile_options is not None:
+            self.compile_derived(**self._compile_options)
+        self.update_derived()
+
+    def _topological_sort(self, definitions: dict[str, Parameter]) -> list[str]:
+        indegree = {key: len(definition.dependencies) if isinstance(definition, DerivedParameter) else 0
+                    for key, definition in definitions.items()}
+        queue = [key for key, degree in indegree.items() if degree == 0]
+        order = []
+        while queue:
+            key = queue.pop(0)
+            order.append(key)
+            for dependent in self._graph[key]:
+                indegree[dependent] -= 1
+                if indegree[dependent] == 0:
+                    queue.append(dependent)
+        if len(order) != len(definitions):
+            raise ValueError("Обнаружена циклическая зависимость между параметрами")
+        return order
+
+    def _load_history(self, position: int, previous: ValueHistory | list | None) -> None:
+        """Заполнение буфера предыдущих значений номера position из истории (новые - первыми)"""
+        self._history_position[position] = -1
+        self._history_count[position] = 0
+        if not previous:
+            return
+        count = min(len(previous), self._history_limit[position])
+        values = list(previous)[:count]
+        times = previous.times(count) if isinstance(previous, ValueHistory) else [np.nan] * count
+        for value, time in zip(reversed(values), reversed(list(times))):
+            self._push_history(position, value, time)
+
+    def _push_history(self, position: int, value: Number, time: Number | None = None) -> None:
+        limit = self._history_limit[position]
+        slot = (self._history_position[position] + 1) % limit
+        self._history[position, slot] = value
+        if time is None:
+            time = np.nan if self.time is None else self.time
+        self._history_times[position, slot] = time
+        self._history_position[position] = slot
+        if self._history_count[position] < limit:
+            self._history_count[position] += 1
+
+    def _push_history_array(self, positions: np.ndarray, values: np.ndarray) -> None:
+        """Векторный _push_history для набора различных номеров"""
+        limits = self._history_limit[positions]
+        slots = (self._history_position[positions] + 1) % limits
+        self._history[positions, slots] = values
+        self._history_times[positions, slots] = np.nan if self.time is None else self.time
+        self._history_position[positions] = slots
+        self._history_count[positions] = np.minimum(self._history_count[positions] + 1, limits)
+
+    def previous_values(self, position: int) -> list[Number]:
+        """Предыдущие значения параметра с номером position, начиная с последнего"""
+        count = self._history_count[position]
+        limit = self._history_limit[position]
+        last = self._history_position[position]
+        return [self._history[position, (last - i) % limit] for i in range(count)]
+
+    def _last_values(self, positions: np.ndarray, count: int) -> tuple[np.ndarray, np.ndarray]:
+        """Последние count значений и отметок времени параметров positions формы (N, count), новые - первыми,
+        недостающие - NaN, как gather_last"""
+        limits = self._history_limit[positions][:, None]
+        steps = np.arange(count)
+        slots = (self._history_position[positions][:, None] - steps) % limits
+        missing = steps >= self._history_count[positions][:, None]
+        values = np.where(missing, np.nan, self._history[positions[:, None], slots])
+        times = np.where(missing, np.nan, self._history_times[positions[:, None], slots])
+        return values, times
+
+    def set_time(self, time: Number | None) -> None:
+        """Время, с которым записываются следующие значения в предыдущие значения (None - без отметок)"""
+        self.time = time
+
+    # Доступ по номеру
+
+    def get(self, position: int) -> Number:
+        return self.values[position]
+
+    def set(self, position: int, value: Number) -> None:
+        """Запись значения по номеру с сохранением в предыдущие значения и проверкой границ"""
+        if self.derived[position]:
+            raise AttributeError(f"{self.names[position]} — вычисляемый параметр.")
+        self.values[position] = value
+        self._push_history(position, value)
+        if self._changed is not None:  # До проверки, как в ParameterSet.__setitem__
+            self._changed.add(position)
+        self.validate_index(position)
+
+    def load_array(self, values: np.ndarray, positions: np.ndarray | list[int] | None = None) -> None:
+        """
+        load_array
+        ---
+        Пакетная запись значений: values - значения для номеров positions (по умолчанию всех независимых параметров
+        в порядке names). Границы проверяются одной векторной операцией
+        """
+        if positions is None:
+            positions = np.flatnonzero(~self.derived)
+        positions = np.asarray(positions, dtype=np.int64)
+        if np.any(self.derived[positions]):
+            raise AttributeError(f"{[self.names[p] for p in positions[self.derived[positions]]]} — вычисляемые параметры.")
+        values = np.asarray(values, dtype=np.float64)
+        self.values[positions] = values
+        self._push_history_array(positions, values)
+        if self._changed is not None:
+            self._changed.update(positions.tolist())
+        self._validate_positions(positions)
+
+    def as_array(self, positions: np.ndarray | list[int] | None = None) -> np.ndarray:
+        """Копия значений по номерам positions, по умолчанию всех параметров"""
+        if positions is None:
+            return self.values.copy()
+        return self.values[np.asarray(positions, dtype=np.int64)]
+
+    def positions(self, keys: list[str]) -> np.ndarray:
+        """Номера параметров по именам, для многократного использования в load_array/as_array"""
+        return np.array([self.index[key] for key in keys], dtype=np.int64)
+
+    # Проверки
+
+    def validate_index(self, position: int) -> None:
+        value = self.values[position]
+        if value < self.min_values[position]:
+            raise ValueError(f"{self.names[position]}: ниже минимума ({value} < {self.min_values[position]})")
+        if value > self.max_values[position]:
+            raise ValueError(f"{self.names[position]}: выше максимума ({value} > {self.max_values[position]})")
+
+    def _validate_positions(self, positions: np.ndarray | None = None) -> None:
+        values = self.values if positions is None else self.values[positions]
+        minimums = self.min_values if positions is None else self.min_values[positions]
+        maximums = self.max_values if positions is None else self.max_values[positions]
+        invalid = (values < minimums) | (values > maximums) | np.isnan(values)
+        if invalid.any():
+            first = int(np.flatnonzero(invalid)[0])
+            position = first if positions is None else int(positions[first])
+            if np.isnan(self.values[position]):
+                raise ValueError(f"{self.names[position]}: Значение не задано")
+            self.validate_index(position)
+
+    def compile_derived(self, use_symbolic: bool = True, cse: bool = True) -> dict[str, int]:
+        """
+        compile_derived
+        ---
+        Пересчёт зависимых параметров одним вызовом сгенерированной функции, см. ParameterSet.compile_derived.
+        Возвращает статистику компиляции
+        """
+        function, inputs, outputs, self.compile_stats = compile_derived_formulas(self._definitions, self.order,
+                                                                                 use_symbolic, cse)
+        self._compiled_derived = (function, self.positions(inputs), self.positions(outputs))
+        self._compile_options = {"use_symbolic": use_symbolic, "cse": cse}
+        return self.compile_stats
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Сгенерированная функция не сериализуется, она строится заново при загрузке
+        state = self.__dict__.copy()
+        state["_compiled_derived"] = None
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        if self._compile_options is not None:
+            self.compile_derived(**self._compile_options)
+
+    def update_derived(self, full: bool = False) -> None:
+        """
+        update_derived
+        ---
+        Пересчёт зависимых параметров в порядке зависимостей и векторная проверка границ.
+        Как в ParameterSet.update_derived, пересчитываются только параметры, зависящие от изменённых
+        после предыдущего пересчёта, проверяются они и сами изменённые, full=True - полный пересчёт с проверкой всех параметров
+        """
+        if full or self._changed is None:
+            affected = None
+        elif self._changed:
+            affected = self._affected_derived(frozenset(self._changed))
+        else:
+            return
+
+        values = self.values
+        # Сгенерированная функция считает все зависимые параметры, при малой доле затронутых дешевле пересчитать их по одному
+        if self._compiled_derived is not None and (affected is None or 2 * len(affected) >= len(self._compiled_derived[2])):
+            function, inputs, outputs = self._compiled_derived
+            if len(outputs):
+                results = np.asarray(function(*values[inputs].tolist()), dtype=np.float64)
+                if affected is not None:
+                    mask = np.isin(outputs, affected)
+                    outputs, results = outputs[mask], results[mask]
+                values[outputs] = results
+                self._push_history_array(outputs, results)
+        else:
+            plan = self._derived_plan if affected is None else self._affected_plan[frozenset(self._changed)]
+            for position, formula, dependencies in plan:
+                value = formula(*(values[dependency] for dependency in dependencies))
+                values[position] = value
+                self._push_history(position, value)
+        if affected is None:
+            self._validate_positions()
+        else:
+            self._validate_positions(np.concatenate((np.fromiter(self._changed, dtype=np.int64), affected)).astype(np.int64))
+        self._changed = set()
+
+    def _affected_derived(self, changed: frozenset[int]) -> np.ndarray:
+        """Номера зависимых параметров, достижимых по графу из изменённых, в порядке пересчёта"""
+        affected = self._affected_cache.get(changed)
+        if affected is None:
+            reached, stack = set(), [self.names[position] for position in changed]
+            while stack:
+                for dependent in self._graph[stack.pop()]:
+                    if dependent not in reached:
+                        reached.add(dependent)
+                        stack.append(dependent)
+            affected = self._affected_cache[changed] = self.positions([key for key in self.order if key in reached])
+            affected_set = set(affected.tolist())
+            self._affected_plan[changed] = [step for step in self._derived_plan if step[0] in affected_set]
+        return affected
+
+    # Интерфейс ParameterSet
+
+    def __getitem__(self, key) -> Number:
+        return self.values[self.index[key]]
+
+    def __setitem__(self, key, value) -> None:
+        position = self.index.get(key)
+        if position is None:
+            raise KeyError(f"{key} не найден.")
+        self.set(position, value)
+
+    def __contains__(self, key) -> bool:
+        return key in self.index
+
+    def update(self, **additional_parameters: Parameter | DerivedParameter) -> None:
+        """Добавление или замена параметров, массивы набора строятся заново с сохранением текущих значений"""
+        params: dict[str, Any] = dict(self.params_dict)
+        params.update(additional_parameters)
+        self._build(params)
+
+    def as_dict(self, keys: list[str] = None, read_sensors: bool = False) -> dict[str, Number]:
+        if keys is None:
+            keys = self.names
+        if not read_sensors:
+            return {key: self.values[self.index[key]] for key in keys}
+        res = {}
+        for key in keys:
+            position = self.index[key]
+            noise = self.sensor_noise[position]
+            res[key] = self.values[position] if noise is None else noise(self.values[position])
+        return res
+
+    def load_dict(self, data: dict[str, Number]) -> None:
+        for key, value in data.items():
+            if key not in self.index:
+                raise KeyError(f'Попытка записать несуществующий {key}')
+            self.set(self.index[key], value)
+
+    def __repr__(self):
+        return ", ".join(f"{key}={self.values[position]}" for key, position in self.index.items())
+
+    @staticmethod
+    def _check_integral_inputs(dt: Number | None, method: str) -> None:
+        if dt is not None:
+            if not isinstance(dt, Number):
+                raise TypeError("dt должен быть числом")
+            if dt <= 0:
+                raise ValueError("dt должен быть положительным")
+        if method not in INTEGRATION_METHODS:
+            raise ValueError(f"Неизвестный метод интегрирования {method}, доступны {INTEGRATION_METHODS}")
+
+    def compute_step_integral(self, dt: Number | None = None, keys: list[str] = None, method: str = "trapezoid") -> None:
+        """Шаг интеграла по последним значениям для всех параметров сразу, как ParameterSet.compute_step_integral"""
+        self._check_integral_inputs(dt, method)
+        positions = np.arange(len(self.names)) if keys is None else self.positions(keys)
+        if np.any(self._history_count[positions] < 2):
+            raise RuntimeWarning("Недостаточно предыдущих значений параметров, интеграл не обновлён")
+        values, times = self._last_values(positions, 3 if method == "simpson" else 2)
+        self.integrals[positions] += step_integrals(values, step_intervals(times, dt), method)
+
+    def compute_multiple_step_integral(self, dt: Number | None = None, steps: int | None = None, keys: list[str] = None,
+                                       method: str = "trapezoid") -> None:
+        """Интеграл по steps последним шагам, как ParameterSet.compute_multiple_step_integral"""
+        self._check_integral_inputs(dt, method)
+        for key in self.names if keys is None else keys:
+            position = self.index[key]
+            available = int(self._history_count[position])
+            if available < 2:
+                raise RuntimeWarning(f"Недостаточно предыдущих значений параметра {key}, интеграл не обновлён")
+            count = available if steps is None else min(steps + 1, available)
+            values, times = self._last_values(np.array([position]), count)
+            intervals = step_intervals(times, dt)
+            if np.isnan(intervals).any():
+                raise ValueError("Не у всех значений есть отметки времени, задайте шаг dt")
+            self.integrals[position] = window_integral(values[0], intervals[0], method)
+
+    def track_integral(self, key: str, target: str | None = None, method: str = "trapezoid") -> None:
+        """Добавляет параметр в пакетный расчёт интегралов update_tracked, см. ParameterSet.track_integral"""
+        self._check_tracked(key, target)
+        self._check_integral_inputs(None, method)
+        self._tracked_integrals[key] = (target, method)
+
+    def track_derivative(self, key: str, target: str, order: int = 1) -> None:
+        """Добавляет параметр в пакетный расчёт производных update_tracked, см. ParameterSet.track_derivative"""
+        self._check_tracked(key, target)
+        if order not in (1, 2):
+            raise ValueError(f"Поддерживается порядок производной 1 или 2, получено {order}")
+        self._tracked_derivatives[key] = (target, order)
+
+    def _check_tracked(self, key: str, target: str | None) -> None:
+        for name in (key, target):
+            if name is not None and name not in self.index:
+                raise KeyError(f"{name} не найден.")
+        if target is not None and self.derived[self.index[target]]:
+            raise AttributeError(f"{target} — вычисляемый параметр.")
+
+    def update_tracked(self, dt: Number | None = None) -> None:
+        """Пакетный шаг интегралов и производных из track_integral / track_derivative, см. ParameterSet.update_tracked"""
+        self._check_integral_inputs(dt, "trapezoid")
+        targets, results = [], []
+        for method in INTEGRATION_METHODS:
+            keys = [key for key, (_, key_method) in self._tracked_integrals.items() if key_method == method]
+            if not keys:
+                continue
+            self.compute_step_integral(dt=dt, keys=keys, method=method)
+            for key in keys:
+                if self._tracked_integrals[key][0] is not None:
+                    targets.append(self._tracked_integrals[key][0])
+                    results.append(self.integrals[self.index[key]])
+        for order in (1, 2):
+            keys = [key for key, (_, key_order) in self._tracked_derivatives.items() if key_order == order]
+            if not keys:
+                continue
+            values = self.get_derivative(keys, dt=dt, order=order)
+            for key in keys:
+                targets.append(self._tracked_derivatives[key][0])
+                results.append(values[key])
+        for target, value in zip(targets, results):
+            self.set(self.index[target], value)
+
+    def get_derivative(self, keys: list[str] = None, dt: Number | None = None, order: int = 1) -> dict[str, Number]:
+        """Производные параметров в момент последнего значения, см. Parameter.derivative"""
+        positions = np.arange(len(self.names)) if keys is None else self.positions(keys)
+        if np.any(self._history_count[positions] < 2):
+            raise ValueError("Для производной нужно не меньше двух значений")
+        values, times = self._last_values(positions, order + 1)
+        result = derivatives(values, step_intervals(times, dt), order)
+        return {self.names[position]: value for position, value in zip(positions, result)}
+
+    def get_integral(self, keys: list[str] = None) -> dict[str, Number]:
+        if keys is None:
+            keys = self.names
+        return {key: self.integrals[self.index[key]] for key in keys}
+
+    def zero_integral(self, keys: list[str] = None):
+        positions = np.arange(len(self.names)) if keys is None else self.positions(keys)
+        self.integrals[positions] = 0
+
+    def snapshot(self) -> dict[str, tuple[Any, ValueHistory | None, Number]]:
+        """Состояние в формате ParameterSet.snapshot, предыдущие значения - с отметками времени"""
+        return {key: (self.values[position], self._history_copy(position), self.integrals[position])
+                for key, position in self.index.items()}
+
+    def _history_copy(self, position: int) -> ValueHistory:
+        """Предыдущие значения номера position с отметками времени в виде ValueHistory"""
+        values, times = self._last_values(np.array([position]), int(self._history_count[position]))
+        return ValueHistory(depth=int(self._history_limit[position]) - 1, values=values[0], times=times[0])
+
+    def restore(self, state: dict[str, tuple[Any, ValueHistory | list | None, Number]]) -> None:
+        for key, (value, previous_values, integral) in state.items():
+            position = self.index.get(key)
+            if position is None:
+                raise KeyError(f"Параметр {key} из сохранённого состояния не найден в наборе")
+            self.values[position] = value
+            self.integrals[position] = integral
+            self._load_history(position, previous_values)
+        self._changed = None
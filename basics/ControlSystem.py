@@ -6,10 +6,13 @@ from numbers import Number
 import copy
 
 from basics import FunctionalBlock, FunctionalBlockBank, Supervisor
+from basics.EventTrace import EVENT_CONTROLLER_SWITCH, EVENT_ESTIMATOR_SWITCH
 
 
 class ControlSystem(FunctionalBlock):
 
+    STATE_KEYS = ("current_controller", "current_estimator")
+
     def __init__(self,
                  logger: logging.Logger,
                  parameters: ParameterSet,
@@ -17,50 +20,92 @@ class ControlSystem(FunctionalBlock):
                  supervisor: Supervisor = None,
                  control_action_keys: list[str] = None):
         super().__init__(logger=logger, parameters=parameters, name=name)
-        self.logger.info(f"Инициализация системы управления {self.name}")
+        self.logger.info("Инициализация системы управления %s", self.name)
 
         self.control_actions = None
+        self._actions_controller = None  # Контроллер, от которого получены текущие control_actions
+        self.profiler = None  # TickProfiler, задаётся SimulationEngine
+        self.event_trace = None  # EventTrace, задаётся SimulationEngine
 
         if supervisor is None:
             self.logger.error(f"Супервизор не задан для {self.name}")
             raise ValueError("supervisor None при инициализации системы управления")
         else:
-            self.logger.debug(f"Супервизор {supervisor}")
+            self.logger.debug("Супервизор %s", supervisor)
             self.supervisor = supervisor
 
         if control_action_keys is None:
             self.logger.error(f"Не заданы требуемые управляющие воздействия для {self.name}")
             raise ValueError("control_actions None при инициализации системы управления")
         else:
-            self.logger.debug(f"Управляющие воздействия {control_action_keys}")
+            self.logger.debug("Управляющие воздействия %s", control_action_keys)
             self.control_action_keys = control_action_keys
 
     def compute(self, tick_duration:Number = None, **kwargs) -> None:
-        self.logger.info(f"Начинаем цикл работы системы управления {self.name}")
-        self.logger.debug(f"Период симуляции системы управления {tick_duration}")
+        self.logger.info("Начинаем цикл работы системы управления %s", self.name)
+        self.logger.debug("Период симуляции системы управления %s", tick_duration)
 
         # Бэкап эстиматоров и контроллеров пока сломан, сейчас не понадобится, временно отключает
         # TODO: Исправить бэкап эстиматоров. Встроить его в логику, чтобы не ломались вычисления и сохранялась история
         # self.supervisor.revert_estimators()
         # self.supervisor.revert_controllers()
 
-        self.logger.info(f"Начинаем работу с банком эстиматоров системы управления {self.name}")
+        profiler = self.profiler
+        if profiler is not None:
+            phase_start = profiler.start()
+        previous_estimator = self.supervisor.current_estimator
+        previous_controller = self.supervisor.current_controller
+
+        self.logger.info("Начинаем работу с банком эстиматоров системы управления %s", self.name)
         self.supervisor.compute_estimators(tick_duration=tick_duration, save_backup=False, **kwargs)
+        if profiler is not None:
+            profiler.add("compute_estimators", phase_start)
+            phase_start = profiler.start()
         self.supervisor.chose_estimator()
+        if profiler is not None:
+            profiler.add("choose_estimator", phase_start)
 
-        self.logger.info(f"Итоговый эстиматор {self.supervisor.current_estimator}")
+        self.logger.info("Итоговый эстиматор %s", self.supervisor.current_estimator)
+        if self.event_trace is not None and self.supervisor.current_estimator != previous_estimator:
+            self.event_trace.emit(EVENT_ESTIMATOR_SWITCH, source=self.supervisor.name,
+                                  old=previous_estimator, new=self.supervisor.current_estimator)
 
-        self.logger.info(f"Начинаем работу с банком контроллеров системы управления {self.name}")
+        self.logger.info("Начинаем работу с банком контроллеров системы управления %s", self.name)
+        if profiler is not None:
+            phase_start = profiler.start()
         self.supervisor.compute_controllers(tick_duration=tick_duration, save_backup=False, **kwargs)
+        if profiler is not None:
+            profiler.add("compute_controllers", phase_start)
+            phase_start = profiler.start()
         self.supervisor.choose_controller()
-
-        self.logger.info(f"Итоговый контроллер {self.supervisor.current_controller}")
-
-        self.logger.info(f"Начинаем вычисление управляющих воздействий {self.name}")
-        controller = copy.deepcopy(self.supervisor.controller_bank[self.supervisor.current_controller])
-        controller.compute(tick_duration=tick_duration)
+        if profiler is not None:
+            profiler.add("choose_controller", phase_start)
+            phase_start = profiler.start()
+
+        self.logger.info("Итоговый контроллер %s", self.supervisor.current_controller)
+        if self.event_trace is not None and self.supervisor.current_controller != previous_controller:
+            self.event_trace.emit(EVENT_CONTROLLER_SWITCH, source=self.supervisor.name,
+                                  old=previous_controller, new=self.supervisor.current_controller)
+
+        self.logger.info("Начинаем вычисление управляющих воздействий %s", self.name)
+        if self.supervisor.current_controller in self.supervisor.computed_controllers:
+            controller = copy.deepcopy(self.supervisor.controller_bank[self.supervisor.current_controller])
+            controller.compute(tick_duration=tick_duration)
+        elif self.supervisor.current_controller == self._actions_controller and self.control_actions is not None:
+            # Контроллер тот же и не вычислялся (входы не изменились или не истёк период) - управление прежнее
+            self.logger.info("Управляющие воздействия не изменились %s", self.control_actions)
+            if profiler is not None:
+                profiler.add("compute_control_actions", phase_start)
+            return
+        else:
+            # Выбранный контроллер не вычислялся на этом шаге (многочастотное выполнение) - держим его выходы
+            self.logger.debug("Контроллер %s не вычислялся, используем его последние выходы", self.supervisor.current_controller)
+            controller = self.supervisor.controller_bank[self.supervisor.current_controller]
         self.control_actions = controller.read_sensors(keys=self.control_action_keys)
-        self.logger.info(f"Итоговые управляющие воздействия {self.control_actions}")
+        self._actions_controller = self.supervisor.current_controller
+        if profiler is not None:
+            profiler.add("compute_control_actions", phase_start)
+        self.logger.info("Итоговые управляющие воздействия %s", self.control_actions)
 
     def read_control_actions(self):
         return self.control_actions
@@ -69,14 +114,29 @@ class ControlSystem(FunctionalBlock):
         return self.control_actions
 
     def load_sensor_data(self, data: dict[str, Number]) -> None:
-        self.logger.info(f"Загружаем данные с сенсоров в систему управления {self.name}")
-        self.logger.debug(f"Данные с сенсоров {data}")
+        self.logger.info("Загружаем данные с сенсоров в систему управления %s", self.name)
+        self.logger.debug("Данные с сенсоров %s", data)
 
         self.supervisor.estimator_bank.load_variables(data=data)
         self.supervisor.controller_bank.load_variables(data=data)
 
+    def snapshot(self) -> dict:
+        res = super().snapshot()
+        res["control_actions"] = None if self.control_actions is None else dict(self.control_actions)
+        res["actions_controller"] = self._actions_controller
+        res["supervisor"] = self.supervisor.snapshot()
+        return res
+
+    def restore(self, state: dict) -> None:
+        super().restore(state)
+        self.control_actions = None if state["control_actions"] is None else dict(state["control_actions"])
+        self._actions_controller = state["actions_controller"]
+        self.supervisor.restore(state["supervisor"])
+
     def get_state(self,  keys: list[str] = None) -> dict[str, Number | str]:
         res = super().get_state(keys=keys)
-        res['current_controller'] = self.supervisor.current_controller
-        res['current_estimator'] = self.supervisor.current_estimator
+        if keys is None or 'current_controller' in keys:
+            res['current_controller'] = self.supervisor.current_controller
+        if keys is None or 'current_estimator' in keys:
+            res['current_estimator'] = self.supervisor.current_estimator
         return res
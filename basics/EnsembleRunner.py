@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from numbers import Number
+from typing import Callable, TYPE_CHECKING
+
+import numpy as np
+
+from basics.SimulationEngine import SimulationEngine
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@dataclass
+class EnsembleResult:
+    """
+    EnsembleResult
+    ---
+    Результат ансамбля запусков
+
+    Поля:
+        metrics: pd.DataFrame                                       - Метрики по запускам, строка на запуск (run, seed, метрики)
+        statistics: pd.DataFrame                                    - Статистики по каждой метрике по всем запускам
+        histories: list[dict[str, pd.DataFrame]] | None = None      - История каждого запуска, если запрошена
+    """
+
+    metrics: pd.DataFrame
+    statistics: pd.DataFrame
+    histories: list[dict[str, pd.DataFrame]] | None = field(default=None)
+
+
+def final_model_state(engine: SimulationEngine) -> dict[str, Number]:
+    """Метрики по умолчанию - числовые значения параметров модели в конце запуска"""
+    return {key: value for key, value in engine.model.get_state().items() if isinstance(value, Number)}
+
+
+def seed_everything(seed: int) -> None:
+    """Задаёт начальное состояние генераторов random и numpy.random текущего процесса"""
+    random.seed(seed)
+    np.random.seed(seed % 2 ** 32)
+
+
+def aggregate_metrics(metrics: pd.DataFrame,
+                      exclude: tuple[str, ...] = ("run", "seed"),
+                      quantiles: tuple[float, ...] = (0.05, 0.5, 0.95)) -> pd.DataFrame:
+    """Статистики по каждой числовой метрике: среднее, СКО, минимум, максимум и квантили"""
+    import pandas as pd
+    values = metrics.drop(columns=[column for column in exclude if column in metrics]).select_dtypes(include="number")
+    statistics = {
+        "mean": values.mean(),
+        "std": values.std(ddof=1) if len(values) > 1 else values.std(ddof=0),
+        "min": values.min(),
+        "max": values.max(),
+    }
+    for quantile in quantiles:
+        statistics[f"q{round(quantile * 100):02d}"] = values.quantile(quantile)
+    return pd.DataFrame(statistics)
+
+
+def _run_member(factory: Callable[[int], SimulationEngine],
+                simulation_time: float,
+                run_index: int,
+                seed: int,
+                metrics: Callable[[SimulationEngine], dict[str, Number]],
+                keep_history: bool) -> tuple[int, int, dict[str, Number], dict[str, pd.DataFrame] | None]:
+    """Один запуск ансамбля, выполняется в процессе пула"""
+    seed_everything(seed)
+    engine = factory(run_index)
+    engine.run(simulation_time)
+    history = engine.historizer.records if keep_history else None
+    return run_index, seed, metrics(engine), history
+
+
+class EnsembleRunner:
+    """
+    EnsembleRunner
+    ---
+    Ансамбль независимых запусков одной конфигурации (метод Монте-Карло) на пуле процессов.
+    Каждый запуск создаёт свой SimulationEngine через factory и получает своё начальное состояние генераторов
+    случайных чисел (random и numpy.random), поэтому шум сенсоров в запусках независим, а весь ансамбль
+    воспроизводим при заданном seed.
+
+    Аргументы:
+        factory: Callable[[int], SimulationEngine]                          - Функция создания симуляции по номеру запуска.
+                                                                              Передаётся в другие процессы, поэтому должна
+                                                                              быть функцией уровня модуля (или functools.partial)
+        simulation_time: float                                              - Время моделирования каждого запуска
+        n_runs: int                                                         - Число запусков
+        seed: int | None = None                                             - Начальное значение для генерации seed запусков
+        metrics: Callable[[SimulationEngine], dict[str, Number]] = None     - Скалярные метрики запуска, по умолчанию -
+                                                                              конечное состояние модели
+        keep_history: bool = False                                          - Возвращать ли историю каждого запуска
+                                                                              (historizer.records, требует results_subfolder)
+        max_workers: int | None = None                                      - Число процессов, 1 - выполнение в текущем процессе
+        chunksize: int | None = None                                        - Число запусков в одной задаче пула
+    """
+
+    QUANTILES = (0.05, 0.5, 0.95)
+
+    def __init__(self,
+                 factory: Callable[[int], SimulationEngine],
+                 simulation_time: float,
+                 n_runs: int,
+                 seed: int | None = None,
+                 metrics: Callable[[SimulationEngine], dict[str, Number]] | None = None,
+                 keep_history: bool = False,
+                 max_workers: int | None = None,
+                 chunksize: int | None = None) -> None:
+        if n_runs < 1:
+            raise ValueError("Число запусков n_runs должно быть положительным")
+        self.factory = factory
+        self.simulation_time = simulation_time
+        self.n_runs = n_runs
+        self.seed = seed
+        self.metrics = metrics if metrics is not None else final_model_state
+        self.keep_history = keep_history
+        self.max_workers = max_workers
+        self.chunksize = chunksize
+
+    def seeds(self) -> list[int]:
+        """Независимые seed для каждого запуска, полученные из общего seed через np.random.SeedSequence"""
+        sequence = np.random.SeedSequence(self.seed)
+        return [int(child.generate_state(1, dtype=np.uint64)[0]) for child in sequence.spawn(self.n_runs)]
+
+    def run(self) -> EnsembleResult:
+        import pandas as pd
+        seeds = self.seeds()
+        arguments = (
+            [self.factory] * self.n_runs,
+            [self.simulation_time] * self.n_runs,
+            list(range(self.n_runs)),
+            seeds,
+            [self.metrics] * self.n_runs,
+            [self.keep_history] * self.n_runs,
+        )
+
+        if self.max_workers == 1:
+            results = list(map(_run_member, *arguments))
+        else:
+            workers = self.max_workers if self.max_workers is not None else os.cpu_count() or 1
+            chunksize = self.chunksize
+            if chunksize is None:
+                # Несколько задач на процесс - баланс между накладными расходами пула и равномерной загрузкой
+                chunksize = max(1, self.n_runs // (workers * 4))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(_run_member, *arguments, chunksize=chunksize))
+
+        results.sort(key=lambda item: item[0])
+        rows = [{"run": run_index, "seed": seed, **values} for run_index, seed, values, _ in results]
+        metrics = pd.DataFrame(rows)
+        histories = [history for _, _, _, history in results] if self.keep_history else None
+        return EnsembleResult(metrics=metrics, statistics=self.aggregate(metrics), histories=histories)
+
+    def aggregate(self, metrics: pd.DataFrame) -> pd.DataFrame:
+        """Статистики по каждой метрике: среднее, СКО, минимум, максимум и квантили"""
+        return aggregate_metrics(metrics, exclude=("run", "seed"), quantiles=self.QUANTILES)
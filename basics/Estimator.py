@@ -1,6 +1,8 @@
 import logging
 from numbers import Number
 
+import numpy as np
+
 from basics.FunctionalBlock import FunctionalBlock
 from basics.FunctionalBlockBank import FunctionalBlockBank
 from basics.Parameters import Parameter, ParameterSet
@@ -40,6 +42,7 @@ class Estimator(FunctionalBlock):
             extra_parameters=self.extra_parameters
         )
         super().__init__(logger=logger, parameters=parameters, name=name, *args, **kwargs)
+        self.event_trace = None  # EventTrace для промахов и пересечений областей, задаётся SimulationEngine
 
     def update_controllers(self, controller_bank: FunctionalBlockBank) -> None:
         """
@@ -98,6 +101,18 @@ class Estimator(FunctionalBlock):
         """Стратегия выбора контроллера. Должна быть реализована в наследнике."""
         raise NotImplementedError
 
+    def select_controller_batch(self, values: np.ndarray, index: dict[str, int]) -> np.ndarray:
+        """
+        Векторизованная стратегия выбора контроллера для ансамбля из N копий эстиматора.
+        Должна вернуть массив формы (N,) с номерами выбранных контроллеров в self.controller_names.
+        """
+        raise NotImplementedError(f"Векторизованный выбор контроллера не реализован для эстиматора {self.name}")
+
+    def compute_batch(self, values: np.ndarray, index: dict[str, int], tick_duration: Number = None) -> None:
+        selected = self.select_controller_batch(values, index)
+        for position, controller_name in enumerate(self.controller_names):
+            values[:, index[controller_name]] = selected == position
+
     def compute(self, tick_duration: Number = None) -> None:
         active_controller = self.select_controller()
 
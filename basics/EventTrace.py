@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import json
+from numbers import Number
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Типы событий
+EVENT_CONTROLLER_SWITCH = 1     # Смена выбранного контроллера, old/new - контроллеры
+EVENT_ESTIMATOR_SWITCH = 2      # Смена выбранного эстиматора, old/new - эстиматоры
+EVENT_REGION_MISS = 3           # Точка процесса не попала ни в одну область эстиматора source
+EVENT_REGION_OVERLAP = 4        # Точка процесса попала в несколько областей эстиматора source, new - первая из них
+
+EVENT_NAMES = {
+    EVENT_CONTROLLER_SWITCH: "controller_switch",
+    EVENT_ESTIMATOR_SWITCH: "estimator_switch",
+    EVENT_REGION_MISS: "region_miss",
+    EVENT_REGION_OVERLAP: "region_overlap",
+}
+
+EVENT_DTYPE = np.dtype([
+    ("tick", np.int64),
+    ("time", np.float64),
+    ("kind", np.uint8),
+    ("source", np.int32),
+    ("old", np.int32),
+    ("new", np.int32),
+])
+
+NO_NAME = -1  # Код отсутствующего имени (например, контроллер до первого выбора)
+
+
+class EventTrace:
+    """
+    EventTrace
+    ---
+    Журнал событий супервизора в бинарном виде: переключения контроллеров и эстиматоров, промахи
+    и пересечения областей RangeEstimator. События записываются в кольцевой буфер NumPy фиксированного
+    размера (структурированный массив EVENT_DTYPE), при переполнении затираются самые старые.
+    Имена блоков хранятся словарём, в событиях - их коды.
+
+    Подключается через SimulationEngine(event_trace=EventTrace()).
+
+    Аргументы:
+        capacity: int = 65536       - Размер кольцевого буфера в событиях
+    """
+
+    SAVE_VERSION = 1
+
+    def __init__(self, capacity: int = 65536) -> None:
+        if capacity < 1:
+            raise ValueError("Размер журнала событий capacity должен быть положительным")
+        self.capacity = capacity
+        self._buffer = np.zeros(capacity, dtype=EVENT_DTYPE)
+        self.total = 0  # Сколько событий записано за всё время, включая затёртые
+        self.names: list[str] = []
+        self._name_ids: dict[str, int] = {}
+        self.tick = 0
+        self.time: Number = 0
+
+    def __len__(self) -> int:
+        return min(self.total, self.capacity)
+
+    @property
+    def dropped(self) -> int:
+        """Число затёртых при переполнении событий"""
+        return max(0, self.total - self.capacity)
+
+    def name_id(self, name: str | None) -> int:
+        """Код имени блока, новые имена добавляются в словарь"""
+        if name is None:
+            return NO_NAME
+        code = self._name_ids.get(name)
+        if code is None:
+            code = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+        return code
+
+    def set_clock(self, tick: int, time: Number) -> None:
+        """Номер тика и время симуляции для следующих событий, задаётся SimulationEngine в начале тика"""
+        self.tick = tick
+        self.time = time
+
+    def emit(self, kind: int, source: str | None = None, old: str | None = None, new: str | None = None) -> None:
+        """
+        emit
+        ---
+        Записывает событие kind на текущий тик
+
+        Аргументы:
+            kind: int                   - Тип события (EVENT_*)
+            source: str | None = None   - Блок, в котором произошло событие
+            old: str | None = None      - Предыдущий выбранный блок
+            new: str | None = None      - Новый выбранный блок
+        """
+        event = self._buffer[self.total % self.capacity]
+        event["tick"] = self.tick
+        event["time"] = self.time
+        event["kind"] = kind
+        event["source"] = self.name_id(source)
+        event["old"] = self.name_id(old)
+        event["new"] = self.name_id(new)
+        self.total += 1
+
+    def clear(self) -> None:
+        self.total = 0
+
+    def events(self, kinds: list[int] | None = None) -> np.ndarray:
+        """
+        events
+        ---
+        Копия сохранившихся событий в порядке записи, при заданном kinds - только события этих типов
+        """
+        if self.total <= self.capacity:
+            res = self._buffer[:self.total].copy()
+        else:
+            start = self.total % self.capacity
+            res = np.concatenate([self._buffer[start:], self._buffer[:start]])
+        if kinds is not None:
+            res = res[np.isin(res["kind"], kinds)]
+        return res
+
+    def switches(self) -> np.ndarray:
+        """События смены контроллера"""
+        return self.events([EVENT_CONTROLLER_SWITCH])
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Имена блоков по кодам, None - для отсутствующего имени"""
+        return np.array(self.names + [None], dtype=object)[codes]
+
+    def to_frame(self, kinds: list[int] | None = None) -> pd.DataFrame:
+        """События в виде таблицы с раскодированными типами и именами блоков"""
+        import pandas as pd
+        events = self.events(kinds)
+        return pd.DataFrame({
+            "tick": events["tick"],
+            "time": events["time"],
+            "event": pd.Categorical.from_codes(
+                np.searchsorted(sorted(EVENT_NAMES), events["kind"]),
+                categories=[EVENT_NAMES[kind] for kind in sorted(EVENT_NAMES)]),
+            "source": self.decode(events["source"]),
+            "old": self.decode(events["old"]),
+            "new": self.decode(events["new"]),
+        })
+
+    def save(self, path: str) -> None:
+        """Сохраняет сохранившиеся события и словарь имён в файл .npz"""
+        meta = {"version": self.SAVE_VERSION, "capacity": self.capacity, "total": self.total, "names": self.names}
+        np.savez(path, events=self.events(), meta=np.array(json.dumps(meta, ensure_ascii=False)))
+
+    @classmethod
+    def load(cls, path: str) -> "EventTrace":
+        """Читает журнал, сохранённый save"""
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            events = data["events"]
+        if meta["version"] != cls.SAVE_VERSION:
+            raise ValueError(f"Неподдерживаемая версия журнала событий {meta['version']}")
+        res = cls(capacity=meta["capacity"])
+        # События раскладываются по тем же позициям буфера, чтобы сохранились total и dropped
+        res._buffer[np.arange(meta["total"] - len(events), meta["total"]) % res.capacity] = events
+        res.total = meta["total"]
+        for name in meta["names"]:
+            res.name_id(name)
+        return res
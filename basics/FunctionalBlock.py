@@ -1,7 +1,10 @@
 import logging
 
+import numpy as np
+
 from basics import Parameter, DerivedParameter, ParameterSet
 from numbers import Number
+from typing import Callable
 
 
 class FunctionalBlock:
@@ -13,6 +16,10 @@ class FunctionalBlock:
 
     """
 
+    STATE_KEYS: tuple[str, ...] = ()  # Ключи, которые get_state добавляет к параметрам блока
+    # Векторизованный шум сенсоров {параметр: f(значения (N,), np.random.Generator) -> (N,)} для VectorizedEnsemble
+    BATCH_SENSOR_NOISE: dict[str, Callable[[np.ndarray, np.random.Generator], np.ndarray]] = {}
+
     def __init__(self, logger: logging.Logger, parameters: ParameterSet, name: str = "", *args, **kwargs): #TODO: добавить больше логирования
         """
         __init__
@@ -26,7 +33,7 @@ class FunctionalBlock:
             self.sensors                    - Массив имён переменных, которые доступны для чтения = выходные переменные
         """
         self.logger = logger
-        self.logger.info(f"Инициализация функционального блока {name} с параметрами {parameters}")
+        self.logger.info("Инициализация функционального блока %s с параметрами %s", name, parameters)
 
         self.parameters = parameters
         if name == "":
@@ -42,8 +49,8 @@ class FunctionalBlock:
             if self.parameters.params_dict[key].sensor is True:
                 self.sensors.append(key)
 
-        self.logger.debug(f"Сенсоры функционального блока {self.name}: {self.sensors}")
-        self.logger.debug(f"Переменные функционального блока {self.name}: {self.variables}")
+        self.logger.debug("Сенсоры функционального блока %s: %s", self.name, self.sensors)
+        self.logger.debug("Переменные функционального блока %s: %s", self.name, self.variables)
 
     def update_params(self, new_params: ParameterSet):
         """
@@ -77,6 +84,21 @@ class FunctionalBlock:
         self.logger.error("Метод update не определён")
         raise NotImplementedError('Метод update не определён')
 
+    def compute_batch(self, values: np.ndarray, index: dict[str, int], tick_duration: Number = None) -> None:
+        """
+        compute_batch
+        ---
+        Векторизованный вариант compute для ансамбля из N копий блока (VectorizedEnsemble).
+        Состояние всех копий передаётся массивом values формы (N, число параметров), столбцы - параметры блока,
+        метод должен изменить values на месте. Параметры self.parameters при этом не используются.
+
+        Аргументы:
+            values: np.ndarray              - Значения параметров всех копий блока, форма (N, число параметров)
+            index: dict[str, int]           - Номер столбца по имени параметра
+            tick_duration:Number = None     - Время математического моделирования функции данного блока
+        """
+        raise NotImplementedError(f"Векторизованный расчёт не реализован для блока {self.name}")
+
     def read_sensors(self,  keys: list[str] = None) -> dict[str, Number]:
         """
         read_sensors
@@ -87,17 +109,17 @@ class FunctionalBlock:
             keys: list[str] = None      - Массив ключей при необходимости ограничивает выгружаемые параметры
         """
 
-        self.logger.info(f'Начат сбор данных сенсоров физической модели')
-        self.logger.debug(f'Для сбора данных сенсоров использованы заданы ключи: {keys}')
+        self.logger.info('Начат сбор данных сенсоров физической модели')
+        self.logger.debug('Для сбора данных сенсоров использованы заданы ключи: %s', keys)
 
         if keys is not None:
             keys = list(set(keys) & set(self.sensors))
         else:
             keys = self.sensors
 
-        self.logger.debug(f'Итоговый набор ключей для сбора данных сенсоров: {keys}')
+        self.logger.debug('Итоговый набор ключей для сбора данных сенсоров: %s', keys)
         res = self.parameters.as_dict(keys=keys, read_sensors=True)
-        self.logger.debug(f'Собраны данные сенсоров системы: {res}')
+        self.logger.debug('Собраны данные сенсоров системы: %s', res)
 
         return res
 
@@ -111,17 +133,15 @@ class FunctionalBlock:
             keys: list[str] = None      - Массив ключей при необходимости ограничивает выгружаемые параметры
         """
 
-        self.logger.info(f'Начат сбор состояния физической модели')
-        self.logger.debug(f'Для сбора состояния использованы заданы ключи: {keys}')
+        self.logger.info('Начат сбор состояния физической модели')
+        self.logger.debug('Для сбора состояния использованы заданы ключи: %s', keys)
 
         if keys is not None:
-            keys = list(set(keys) & set(self.parameters.as_dict().keys()))
-        else:
-            keys = self.parameters.as_dict().keys()
+            keys = [key for key in keys if key in self.parameters.params_dict]
 
-        self.logger.debug(f'Итоговый набор ключей для сбора состояния: {keys}')
+        self.logger.debug('Итоговый набор ключей для сбора состояния: %s', keys)
         res = self.parameters.as_dict(keys=keys, read_sensors=False)
-        self.logger.debug(f'Собрано состояние системы: {res}')
+        self.logger.debug('Собрано состояние системы: %s', res)
         return res
 
     def load_variables(self, data: dict[str, Number]) -> None:
@@ -133,12 +153,29 @@ class FunctionalBlock:
         Аргументы:
             d: dict[str, Number]      - Словарь с переменными и их значениями для загрузки
         """
-        self.logger.info(f'Начато обновление параметров функционального блока {self.name}')
-        self.logger.debug(f'Для обновления использованы значения {data}')
+        self.logger.info('Начато обновление параметров функционального блока %s', self.name)
+        self.logger.debug('Для обновления использованы значения %s', data)
         self.parameters.load_dict(data)
         self.parameters.update_derived()
-        self.logger.info(f'Обновлены значения параметров физической модели')
-        self.logger.debug(f'Новые параметры физической модели {self.parameters}')
+        self.logger.info('Обновлены значения параметров физической модели')
+        self.logger.debug('Новые параметры физической модели %s', self.parameters)
+
+    def snapshot(self) -> dict:
+        """
+        snapshot
+        ---
+        Состояние блока для контрольной точки. Наследники с собственным состоянием вне параметров
+        должны дополнить словарь и восстановить его в restore
+        """
+        return {"parameters": self.parameters.snapshot()}
+
+    def restore(self, state: dict) -> None:
+        """
+        restore
+        ---
+        Восстановление состояния блока из snapshot
+        """
+        self.parameters.restore(state["parameters"])
 
 
 if __name__ == '__main__':
@@ -14,7 +14,12 @@ class FunctionalBlockBank:
 
     """
 
-    def __init__(self, logger: logging.Logger, model_set: list[FunctionalBlock], name: str = "") -> None:
+    def __init__(self,
+                 logger: logging.Logger,
+                 model_set: list[FunctionalBlock],
+                 name: str = "",
+                 dirty_tracking: bool = False,
+                 tolerance: Number = 0) -> None:
         """
         __init__
         ---
@@ -22,23 +27,35 @@ class FunctionalBlockBank:
             logger: logging.Logger                  - Логгер для записи логов в файл и консоль
             model_set: list[FunctionalBlock]        - Набор блоков для данного набора
             name: str = ""                          - Имя данного набора функциональных блоков
+            dirty_tracking: bool = False            - Пропускать вычисление блоков, входные переменные которых не изменились
+                                                      с прошлого вычисления, блок при этом держит свои выходы.
+                                                      Подходит только для блоков, выходы которых зависят лишь от входов
+            tolerance: Number = 0                   - Допуск, в пределах которого числовой вход считается неизменным
         """
         self.logger = logger
         self.model_set = model_set
         self.name = name
 
-        self.logger.info(f"Инициализация набора функциональных блоков {self.name} : {[block.name for block in self.model_set]}")
+        self.dirty_tracking = dirty_tracking
+        self.tolerance = tolerance
+        self._last_inputs: dict[str, dict[str, Number]] = {}  # Входы, загруженные в блок перед его последним вычислением
+        self._dirty: dict[str, bool] = {}  # Изменились ли входы блока с его последнего вычисления
+        self.last_computed: list[str] = []  # Блоки, действительно вычисленные при последнем вызове compute
+        self.tracking_stats = {"computed": 0, "skipped": 0}  # Счётчики вычислений и пропусков (попаданий) блоков
+        self.profiler = None  # TickProfiler для замера времени вычисления блоков, задаётся SimulationEngine
+
+        self.logger.info("Инициализация набора функциональных блоков %s : %s", self.name, [block.name for block in self.model_set])
 
         try:
             self._dict_model_set = {block.name: block for block in self.model_set}
-            self.logger.debug(f"Словарь функциональных блоков успешно создан для {self.name}")
+            self.logger.debug("Словарь функциональных блоков успешно создан для %s", self.name)
         except Exception as e:
             self.logger.error(f"Ошибка создания словаря функциональных блоков для {self.name}, имена не уникальные")
             raise e
 
         self._variables = self._collect_variables() # Пока без применения, может понадобится потом
         self._sensors = self._collect_sensors()
-        self.logger.info(f"Найдены следующие входные переменные для набора {self.name}: {self._variables}")
+        self.logger.info("Найдены следующие входные переменные для набора %s: %s", self.name, self._variables)
 
     def _collect_variables(self) -> Set[str]:
         """
@@ -68,20 +85,57 @@ class FunctionalBlockBank:
             names:list[str] | None = None   - Массив имён блоков, из которых нужно выгрузить значения параметров, если не задан, то выгружаются все
         """
 
-        self.logger.info(f"Начато обновление функциональных блоков в наборе {self.name}")
-        self.logger.debug(f"Для обновления использованы значения {data}")
-        self.logger.debug(f"Для обновления использованы блоки {names}")
+        self.logger.info("Начато обновление функциональных блоков в наборе %s", self.name)
+        self.logger.debug("Для обновления использованы значения %s", data)
+        self.logger.debug("Для обновления использованы блоки %s", names)
         if names is None:
             names = self._dict_model_set.keys()
 
         for block_name in names:
-            self.logger.debug(f"Обрабатываем модель {block_name}")
+            self.logger.debug("Обрабатываем модель %s", block_name)
             if block_name not in self._dict_model_set.keys():
                 self.logger.error(f"Попытка записать значения в несуществующий в наборе {self.name} функциональный блок {block_name}")
                 raise KeyError
             dict_to_load = {key: value for key, value in data.items() if key in self[block_name].variables}
+            if self.dirty_tracking:
+                if self._inputs_unchanged(block_name, dict_to_load):
+                    continue  # Входы не изменились - не перезаписываем параметры и не пересчитываем зависимые
+                self._last_inputs[block_name] = {**self._last_inputs.get(block_name, {}), **dict_to_load}
+                self._dirty[block_name] = True
             self[block_name].load_variables(dict_to_load)
 
+    def _inputs_unchanged(self, block_name: str, data: dict[str, Number]) -> bool:
+        """Все ли входы data совпадают с загруженными ранее в блок block_name с учётом допуска"""
+        last_inputs = self._last_inputs.get(block_name)
+        if last_inputs is None:
+            return False
+        for key, value in data.items():
+            if key not in last_inputs:
+                return False
+            last_value = last_inputs[key]
+            if isinstance(value, Number) and isinstance(last_value, Number):
+                if abs(value - last_value) > self.tolerance:
+                    return False
+            elif value != last_value:
+                return False
+        return True
+
+    def _compute_block(self, block_name: str, tick_duration: Number) -> None:
+        """Вычисление одного блока с учётом отслеживания изменений входов"""
+        if self.dirty_tracking and not self._dirty.get(block_name, True):
+            self.logger.debug("Входы блока %s не изменились, вычисление пропущено", block_name)
+            self.tracking_stats["skipped"] += 1
+            return
+        if self.profiler is None:
+            self[block_name].compute(tick_duration=tick_duration)
+        else:
+            start = self.profiler.start()
+            self[block_name].compute(tick_duration=tick_duration)
+            self.profiler.add_block(self.name, block_name, start)
+        self._dirty[block_name] = False
+        self.tracking_stats["computed"] += 1
+        self.last_computed.append(block_name)
+
     def read_sensors(self, variables: list[str] = None, names:list[str] | None = None) -> dict[str, dict[str, Number]]:
         """
         read_sensors
@@ -94,9 +148,9 @@ class FunctionalBlockBank:
             names: list[str] = None     - Массив имён блоков, из которых нужно выгрузить значения параметров, если не задан, то выгружаются все
         """
 
-        self.logger.info(f"Начат сбор данных сенсоров по функциональным блокам в наборе {self.name}")
-        self.logger.debug(f"Ищем значения значения {variables}")
-        self.logger.debug(f"Ищем блоки {names}")
+        self.logger.info("Начат сбор данных сенсоров по функциональным блокам в наборе %s", self.name)
+        self.logger.debug("Ищем значения значения %s", variables)
+        self.logger.debug("Ищем блоки %s", names)
 
         if names is None:
             names = self._dict_model_set.keys()
@@ -109,7 +163,7 @@ class FunctionalBlockBank:
 
         res = {}
         for block_name in names:
-            self.logger.debug(f"Обрабатываем модель {block_name}")
+            self.logger.debug("Обрабатываем модель %s", block_name)
 
             if block_name not in self._dict_model_set.keys():
                 self.logger.error(
@@ -137,16 +191,16 @@ class FunctionalBlockBank:
             names: list[str] = None     - Массив имён блоков, из которых нужно выгрузить значения параметров, если не задан, то выгружаются все
         """
 
-        self.logger.info(f"Начат сбор данных состояния по функциональным блокам в наборе {self.name}")
-        self.logger.debug(f"Ищем значения значения {keys}")
-        self.logger.debug(f"Ищем блоки {names}")
+        self.logger.info("Начат сбор данных состояния по функциональным блокам в наборе %s", self.name)
+        self.logger.debug("Ищем значения значения %s", keys)
+        self.logger.debug("Ищем блоки %s", names)
 
         if names is None:
             names = self._dict_model_set.keys()
 
         res = {}
         for block_name in names:
-            self.logger.debug(f"Обрабатываем модель {block_name}")
+            self.logger.debug("Обрабатываем модель %s", block_name)
 
             if block_name not in self._dict_model_set.keys():
                 self.logger.error(
@@ -179,33 +233,54 @@ class FunctionalBlockBank:
             time_for_not_specified: Number = None               - Время, которое надо применить к функциональным блокам, не заданным в tick_duration при задании в виде словаря
         """
 
-        self.logger.info(f"Вычисляем функциональные блоки банка {self.name}")
-        self.logger.debug(f"Время тиков {tick_duration}")
-        self.logger.debug(f"Заданные блоки для вычисления {names}")
-        self.logger.debug(f"Время для оставшихся блоков {time_for_not_specified}")
+        self.logger.info("Вычисляем функциональные блоки банка %s", self.name)
+        self.logger.debug("Время тиков %s", tick_duration)
+        self.logger.debug("Заданные блоки для вычисления %s", names)
+        self.logger.debug("Время для оставшихся блоков %s", time_for_not_specified)
 
         if names is None:
             names = self._dict_model_set.keys()
+        self.last_computed = []
 
         if isinstance(tick_duration, Number):
-            self.logger.debug(f"Время тиков задано как число")
+            self.logger.debug("Время тиков задано как число")
             for block_name in names:
-                self[block_name].compute(tick_duration=tick_duration)
+                self._compute_block(block_name, tick_duration)
 
         if isinstance(tick_duration, dict):
-            self.logger.debug(f"Время тиков задано как словарь")
+            self.logger.debug("Время тиков задано как словарь")
             for block_name in names:
                 if block_name not in self._dict_model_set.keys():
                     self.logger.error(f"Попытка вычислить несуществующий блок {block_name} в наборе {self.name}")
                     raise KeyError
                 if block_name in tick_duration.keys():
-                    self[block_name].compute(tick_duration=tick_duration[block_name])
+                    self._compute_block(block_name, tick_duration[block_name])
                 elif time_for_not_specified is not None:
-                    self[block_name].compute(tick_duration=time_for_not_specified)
+                    self._compute_block(block_name, time_for_not_specified)
                 else:
                     self.logger.error(f"Попытка вычислить функциональный блок {block_name} в наборе {self.name}, но не задан период вычисления")
                     raise ValueError(f"Не задан период вычисления функционального блока")
 
+    def snapshot(self) -> dict:
+        """Состояние всех блоков набора и отслеживания изменений их входов"""
+        return {
+            "blocks": {block_name: block.snapshot() for block_name, block in self._dict_model_set.items()},
+            "last_inputs": {block_name: dict(inputs) for block_name, inputs in self._last_inputs.items()},
+            "dirty": dict(self._dirty),
+            "tracking_stats": dict(self.tracking_stats),
+        }
+
+    def restore(self, state: dict) -> None:
+        """Восстановление состояния набора из snapshot, объекты блоков остаются прежними"""
+        for block_name, block_state in state["blocks"].items():
+            if block_name not in self._dict_model_set:
+                self.logger.error(f"Блок {block_name} из сохранённого состояния не найден в наборе {self.name}")
+                raise KeyError(f"Блок {block_name} не найден в наборе {self.name}")
+            self[block_name].restore(block_state)
+        self._last_inputs = {block_name: dict(inputs) for block_name, inputs in state["last_inputs"].items()}
+        self._dirty = dict(state["dirty"])
+        self.tracking_stats = dict(state["tracking_stats"])
+
     def __getitem__(self, item) -> FunctionalBlock:
         return self._dict_model_set[item]
 
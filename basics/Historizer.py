@@ -1,22 +1,183 @@
+from __future__ import annotations
+
+import copy
 import os
+import queue
+import threading
+import time
 from datetime import datetime
 from numbers import Number
-import pandas as pd
+from typing import TYPE_CHECKING
+
+from basics.HistoryTable import HistoryTable
+from basics.HistoryWriter import CsvHistoryWriter, NpyHistoryWriter
+from basics.RecordingPolicy import RecordingPolicy
+from basics.HistoryQuery import HistoryQuery
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class Historizer:
     """
     Historizer
     ---
-    Класс для записи истории изменения значений во время симуляции
-
+    Класс для записи истории изменения значений во время симуляции.
+    Таблицы хранятся в колоночном виде (HistoryTable) и записываются на диск при save_history,
+    либо порциями по ходу запуска в режиме потоковой записи (stream_chunk_size).
+    В режиме фоновой записи (async_queue_size) запись выполняет отдельный поток, save_history дожидается его.
     """
 
-    def __init__(self) -> None:
+    WRITERS = {
+        CsvHistoryWriter.extension: CsvHistoryWriter,
+        NpyHistoryWriter.extension: NpyHistoryWriter,
+    }
+
+    def __init__(self,
+                 chunk_size: int = 1024,
+                 stream_chunk_size: int | None = None,
+                 file_format: str = "csv",
+                 async_queue_size: int | None = None,
+                 policies: dict[str, RecordingPolicy] | None = None,
+                 default_policy: RecordingPolicy | None = None,
+                 schemas: dict[str, dict[str, str | type]] | None = None) -> None:
+        """
+        __init__
+        ---
+        Аргументы:
+            chunk_size: int = 1024                  - Минимальный шаг увеличения буферов таблиц истории, в строках
+            stream_chunk_size: int | None = None    - Если задан, включает потоковую запись: как только в таблице
+                                                      накапливается stream_chunk_size строк, они записываются на диск
+                                                      отдельной порцией и удаляются из памяти.
+                                                      Порции объединяются при чтении через HistoryReader
+            file_format: str = "csv"                - Формат записи истории: "csv" или бинарный колоночный "npy"
+                                                      (сохраняет типы столбцов, открывается через memory-map)
+            async_queue_size: int | None = None     - Если задан, включает фоновую запись: record только кладёт снимок
+                                                      в очередь такого размера, а кодирование и запись на диск выполняет
+                                                      отдельный поток. При заполненной очереди record ждёт (backpressure).
+                                                      Переданные в record словари нельзя изменять после вызова
+            policies: dict[str, RecordingPolicy] = None     - Политики записи по именам таблиц: прореживание,
+                                                              зона нечувствительности, запись только изменений
+            default_policy: RecordingPolicy = None          - Политика для таблиц, не заданных в policies,
+                                                              каждая таблица получает свою копию
+            schemas: dict[str, dict[str, str | type]] = None        - Фиксированные схемы таблиц {таблица: {столбец: тип}},
+                                                              см. register_schema
+        """
+        if file_format not in self.WRITERS:
+            raise ValueError(f"Неизвестный формат истории {file_format}, доступны {list(self.WRITERS)}")
+        if stream_chunk_size is not None and stream_chunk_size < 1:
+            raise ValueError("stream_chunk_size должен быть положительным")
+        if async_queue_size is not None and async_queue_size < 1:
+            raise ValueError("async_queue_size должен быть положительным")
+
         self.name = None
         self.dir = None
         self.subfolder = None
-        self.records: dict[str, pd.DataFrame] = {}
+        self.chunk_size = chunk_size
+        self.stream_chunk_size = stream_chunk_size
+        self.file_format = file_format
+        self.tables: dict[str, HistoryTable] = {}
+        self.writer: CsvHistoryWriter | NpyHistoryWriter | None = None
+
+        self.policies: dict[str, RecordingPolicy] = dict(policies) if policies is not None else {}
+        self.default_policy = default_policy
+
+        self.schemas: dict[str, dict[str, str | type]] = {}
+        for table_name, schema in (schemas or {}).items():
+            self.register_schema(table_name, schema)
+
+        self.async_queue_size = async_queue_size
+        self._queue: queue.Queue | None = None
+        self._worker: threading.Thread | None = None
+        self._worker_error: BaseException | None = None
+        # Метрики фоновой записи: сколько снимков поставлено и записано, максимальная глубина очереди,
+        # сколько раз и сколько секунд record ждал освобождения места в очереди
+        self.queue_stats = {"enqueued": 0, "processed": 0, "max_depth": 0, "blocked_puts": 0, "blocked_time": 0.0}
+
+    @property
+    def records(self) -> dict[str, pd.DataFrame]:
+        """
+        Снимок таблиц истории в виде pd.DataFrame. Таблицы собираются из колоночного хранилища один раз
+        и переиспользуются до следующей записи, повторные обращения не перестраивают их
+        """
+        self.flush()
+        return {name: table.to_frame() for name, table in self.tables.items()}
+
+    def get_table(self, name: str) -> pd.DataFrame:
+        self.flush()
+        return self.tables[name].to_frame()
+
+    def query(self, table_name: str) -> HistoryQuery:
+        """
+        query
+        ---
+        Запросы по времени к таблице в памяти (интервалы, значение на момент, переключения).
+        При потоковой записи в памяти только последняя порция, для всего запуска используйте
+        HistoryReader(historizer.dir).query(table_name) после save_history
+        """
+        self.flush()
+        return HistoryQuery(self.tables[table_name])
+
+    def register_schema(self, table_name: str, schema: dict[str, str | type]) -> None:
+        """
+        register_schema
+        ---
+        Регистрирует фиксированную схему таблицы до начала записи.
+        Столбцы хранятся в типизированных буферах (float64, float32, int64, int32, category - строки словарным
+        кодированием, object), строки записываются без проверок типов и поиска новых столбцов.
+        Каждая записываемая строка должна содержать все столбцы схемы, остальные значения игнорируются.
+
+        Аргументы:
+            table_name: str                     - Имя таблицы
+            schema: dict[str, str | type]       - Столбцы и их типы, столбец time добавляется автоматически
+        """
+        table = self.tables.get(table_name)
+        if table is not None and len(table) > 0:
+            raise ValueError(f"Таблица {table_name} уже содержит записи, схему нужно задавать до начала записи")
+        HistoryTable(schema=schema)  # Проверяем схему сразу, а не на первом тике
+        self.schemas[table_name] = dict(schema)
+        self.tables.pop(table_name, None)
+
+    def set_policy(self, table_name: str, policy: RecordingPolicy | None) -> None:
+        """
+        set_policy
+        ---
+        Задаёт политику записи таблицы table_name, None - записывать каждую строку
+        """
+        self.policies[table_name] = policy if policy is not None else RecordingPolicy()
+
+    def get_policy(self, table_name: str) -> RecordingPolicy:
+        policy = self.policies.get(table_name)
+        if policy is None:
+            if self.default_policy is None:
+                policy = RecordingPolicy()
+            else:
+                policy = copy.deepcopy(self.default_policy)
+            self.policies[table_name] = policy
+        return policy
+
+    def branch(self, name: str) -> "Historizer":
+        """
+        branch
+        ---
+        Новое пустое хранилище с теми же настройками для продолжения истории в ветке симуляции.
+        Записанные строки не копируются, состояние политик записи продолжается с текущего.
+        Если у хранилища есть папка запуска, история ветки пишется в её подпапку name.
+        """
+        self.flush()
+        res = Historizer(chunk_size=self.chunk_size,
+                         stream_chunk_size=self.stream_chunk_size,
+                         file_format=self.file_format,
+                         async_queue_size=self.async_queue_size,
+                         policies=copy.deepcopy(self.policies),
+                         default_policy=copy.deepcopy(self.default_policy),
+                         schemas=self.schemas)
+        res.subfolder = self.subfolder
+        if self.dir is not None:
+            res.name = name
+            res.dir = os.path.join(self.dir, name)
+            os.makedirs(res.dir, exist_ok=True)
+        return res
 
     def create_folder(self, name) -> None:
         if self.subfolder is None:
@@ -36,30 +197,131 @@ class Historizer:
         if self.name is None or self.dir is None:
             raise AttributeError('Не указан путь к папке для записи истории')
 
+        # Политики проверяются в вызывающем потоке, чтобы ненужные строки даже не попадали в очередь
+        if self.policies or self.default_policy is not None:
+            kwargs = {table_name: data for table_name, data in kwargs.items()
+                      if self.get_policy(table_name).should_record(timestamp, data)}
+            if not kwargs:
+                return
+
+        if self.async_queue_size is None:
+            self._write_record(timestamp, kwargs)
+        else:
+            self._enqueue(timestamp, kwargs)
+
+    def _write_record(self, timestamp: float, kwargs: dict[str, dict[str, Number | str]]) -> None:
         for table_name, data in kwargs.items():
+            table = self.tables.get(table_name)
             # Добавляем в словарь хранимых таблиц, если новая таблица
-            if table_name not in self.records.keys():
-                self.records[table_name] = pd.DataFrame(columns=["time"] + list(data.keys()))
+            if table is None:
+                table = self.tables[table_name] = self._create_table(table_name)
+            # Новые столбцы добавляются в таблицу автоматически
+            table.append(timestamp, data)
 
-            # Обрабатываем новые данные
-            row = {key: value for key, value in data.items()}
-            row.update({"time": timestamp})
-            data_df = pd.DataFrame([row])
+            if self.stream_chunk_size is not None and len(table) >= self.stream_chunk_size:
+                self._flush_table(table_name)
 
-            # Добавляем новые столбцы, если появились новые параметры
-            for col in data_df.columns:
-                if col not in self.records[table_name].columns:
-                    self.records[table_name][col] = None
+    def _enqueue(self, timestamp: float, kwargs: dict[str, dict[str, Number | str]]) -> None:
+        if self._worker_error is not None:
+            raise RuntimeError("Фоновая запись истории завершилась с ошибкой") from self._worker_error
+        if self._worker is None:
+            self._start_worker()
 
-            # Добавляем новую строку в таблицу
-            self.records[table_name] = pd.concat([self.records[table_name], data_df], ignore_index=True)
+        stats = self.queue_stats
+        try:
+            self._queue.put_nowait((timestamp, kwargs))
+        except queue.Full:
+            start = time.perf_counter()
+            self._queue.put((timestamp, kwargs))
+            stats["blocked_puts"] += 1
+            stats["blocked_time"] += time.perf_counter() - start
+        stats["enqueued"] += 1
+        depth = self._queue.qsize()
+        if depth > stats["max_depth"]:
+            stats["max_depth"] = depth
 
-    def save_history(self) -> None:
-        if self.subfolder is None:
+    def _start_worker(self) -> None:
+        self._queue = queue.Queue(maxsize=self.async_queue_size)
+        self._worker = threading.Thread(target=self._worker_loop, name=f"Historizer {self.name}", daemon=True)
+        self._worker.start()
+
+    def _worker_loop(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                if self._worker_error is None:  # После ошибки только разбираем очередь, чтобы не блокировать flush
+                    self._write_record(*item)
+                    self.queue_stats["processed"] += 1
+            except BaseException as e:
+                self._worker_error = e
+            finally:
+                self._queue.task_done()
+
+    def flush(self) -> None:
+        """
+        flush
+        ---
+        Ждёт, пока фоновый поток запишет все снимки из очереди. Без фоновой записи ничего не делает
+        """
+        if self._worker is None:
             return
+        self._queue.join()
+        if self._worker_error is not None:
+            raise RuntimeError("Фоновая запись истории завершилась с ошибкой") from self._worker_error
 
-        for name, df in self.records.items():
-            df.to_csv(f"{self.dir}/{name}.csv", index=False)
+    def close(self) -> None:
+        """
+        close
+        ---
+        Дописывает очередь и останавливает фоновый поток. Следующий record запустит поток заново
+        """
+        if self._worker is None:
+            return
+        try:
+            self.flush()
+        finally:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+            self._queue = None
+
+    def _create_table(self, table_name: str) -> HistoryTable:
+        schema = self.schemas.get(table_name)
+        if self.stream_chunk_size is not None:
+            # Буфер сразу выделяется под одну порцию и больше не растёт - память не зависит от длины запуска
+            return HistoryTable(chunk_size=self.stream_chunk_size, schema=schema)
+        return HistoryTable(chunk_size=self.chunk_size, schema=schema)
 
+    def _get_writer(self) -> CsvHistoryWriter | NpyHistoryWriter:
+        if self.writer is None:
+            self.writer = self.WRITERS[self.file_format](self.dir)
+        return self.writer
+
+    def _flush_table(self, table_name: str) -> None:
+        """Записывает накопленные строки таблицы на диск отдельной порцией и освобождает буфер"""
+        table = self.tables[table_name]
+        if len(table) == 0:
+            return
+        self._get_writer().write_part(table_name, table)
+        table.clear()
 
+    def save_history(self) -> None:
+        """
+        save_history
+        ---
+        Сохраняет историю в папку запуска.
+        При потоковой записи на диск дописываются оставшиеся строки, после чего таблицы в памяти пусты.
+        """
+        if self.subfolder is None:
+            return
 
+        self.close()
+        writer = self._get_writer()
+        for name, table in self.tables.items():
+            if self.stream_chunk_size is not None:
+                self._flush_table(name)
+            else:
+                writer.write_table(name, table)
+            writer.close(name)
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, TYPE_CHECKING
+
+import numpy as np
+
+from basics.HistoryTable import HistoryTable, KIND_CATEGORY
+from basics.HistoryReader import HistoryTableView
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+@dataclass
+class Transitions:
+    """
+    Transitions
+    ---
+    Индекс смен значения столбца: для каждой смены - номер строки, время, прежнее и новое значение.
+    Первая строка таблицы считается сменой с пропуска (previous = None).
+    """
+
+    column: str
+    rows: np.ndarray
+    times: np.ndarray
+    previous: np.ndarray
+    values: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def to_frame(self) -> pd.DataFrame:
+        import pandas as pd
+        return pd.DataFrame({"row": self.rows, "time": self.times, "previous": self.previous, "value": self.values})
+
+
+class HistoryQuery:
+    """
+    HistoryQuery
+    ---
+    Запросы по времени к таблице истории без полного просмотра таблицы.
+    Работает как с таблицей в памяти (HistoryTable), так и с сохранённой бинарной таблицей,
+    открытой через memory-map (HistoryTableView). Столбец time должен быть неубывающим,
+    поиск по времени выполняется двоичным поиском, срезы возвращаются представлениями без копирования.
+
+    Аргументы:
+        table: HistoryTable | HistoryTableView      - Таблица истории
+    """
+
+    TIME = HistoryTable.TIME
+
+    def __init__(self, table: HistoryTable | HistoryTableView) -> None:
+        self.table = table
+        # Индексы смен значений по столбцам: (поколение таблицы, число просмотренных строк, номера строк смен)
+        self._transitions: dict[str, tuple[int, int, np.ndarray]] = {}
+
+    @property
+    def time(self) -> np.ndarray:
+        return self.table.raw(self.TIME)
+
+    def index_range(self, t_start: float | None = None, t_end: float | None = None) -> tuple[int, int]:
+        """
+        index_range
+        ---
+        Диапазон строк [start, stop) с временем t_start <= time <= t_end, None - без ограничения
+        """
+        time = self.time
+        start = 0 if t_start is None else int(np.searchsorted(time, t_start, side="left"))
+        stop = len(time) if t_end is None else int(np.searchsorted(time, t_end, side="right"))
+        return start, max(start, stop)
+
+    def between(self, t_start: float | None = None, t_end: float | None = None,
+                columns: list[str] | None = None, decode: bool = False) -> dict[str, np.ndarray]:
+        """
+        between
+        ---
+        Значения столбцов на интервале времени [t_start, t_end]
+
+        Аргументы:
+            t_start: float | None = None        - Начало интервала, None - с начала записи
+            t_end: float | None = None          - Конец интервала включительно, None - до конца записи
+            columns: list[str] | None = None    - Столбцы, если None - все
+            decode: bool = False                - Раскодировать категориальные столбцы в строки (с копированием),
+                                                  иначе возвращаются коды
+        """
+        start, stop = self.index_range(t_start, t_end)
+        names = self.table.column_names if columns is None else columns
+        res = {}
+        for name in names:
+            values = self.table.raw(name)[start:stop]
+            if decode and self.table.kind(name) == KIND_CATEGORY:
+                values = self._decode(name, values)
+            res[name] = values
+        return res
+
+    def frame_between(self, t_start: float | None = None, t_end: float | None = None,
+                      columns: list[str] | None = None) -> pd.DataFrame:
+        """Интервал времени в виде pd.DataFrame (значения копируются, категории раскодируются)"""
+        import pandas as pd
+        return pd.DataFrame(self.between(t_start, t_end, columns=columns, decode=True))
+
+    def at(self, t: float, columns: list[str] | None = None) -> dict[str, Any]:
+        """
+        at
+        ---
+        Последняя записанная строка с time <= t (значения удерживаются между записями)
+        """
+        row = int(np.searchsorted(self.time, t, side="right")) - 1
+        if row < 0:
+            raise KeyError(f"Нет записей до момента времени {t}")
+        names = self.table.column_names if columns is None else columns
+        res = {}
+        for name in names:
+            value = self.table.raw(name)[row]
+            if self.table.kind(name) == KIND_CATEGORY:
+                value = self._decode(name, np.array([value]))[0]
+            res[name] = value.item() if isinstance(value, np.generic) else value
+        return res
+
+    def _decode(self, name: str, codes: np.ndarray) -> np.ndarray:
+        return np.array(list(self.table.categories(name)) + [None], dtype=object)[codes]
+
+    def _transition_rows(self, column: str) -> np.ndarray:
+        """Номера строк смен значения столбца, индекс строится один раз и дополняется по мере роста таблицы"""
+        values = self.table.raw(column)
+        length = len(values)
+        generation = getattr(self.table, "generation", 0)  # У сохранённой таблицы (HistoryTableView) очистки нет
+        cached_generation, scanned, rows = self._transitions.get(column, (generation, 0, np.array([], dtype=np.int64)))
+        if cached_generation != generation:  # Таблица была очищена (например, после записи порции) - строим заново
+            scanned, rows = 0, np.array([], dtype=np.int64)
+        if scanned == length:
+            return rows
+
+        # Сравниваем новые строки с предыдущими, начиная с последней уже просмотренной
+        start = max(scanned - 1, 0)
+        segment = values[start:length]
+        current, previous = segment[1:], segment[:-1]
+        # NaN != NaN, поэтому пропуски подряд считаются равными и не дают смены значения
+        different = (current != previous) & ~((current != current) & (previous != previous))
+        changed = np.flatnonzero(different) + start + 1
+        if scanned == 0 and length > 0:
+            changed = np.concatenate(([0], changed))
+        rows = np.concatenate((rows, changed.astype(np.int64)))
+        self._transitions[column] = (generation, length, rows)
+        return rows
+
+    def transitions(self, column: str = "current_controller",
+                    t_start: float | None = None, t_end: float | None = None) -> Transitions:
+        """
+        transitions
+        ---
+        Смены значения столбца (по умолчанию - переключения контроллера) на интервале времени.
+        Индекс смен строится при первом вызове, последующие запросы выполняются двоичным поиском по нему.
+        """
+        rows = self._transition_rows(column)
+        start, stop = self.index_range(t_start, t_end)
+        rows = rows[np.searchsorted(rows, start, side="left"):np.searchsorted(rows, stop, side="left")]
+
+        values = self.table.raw(column)
+        current = values[rows]
+        previous_rows = rows - 1
+        previous = values[np.maximum(previous_rows, 0)]
+        if self.table.kind(column) == KIND_CATEGORY:
+            current = self._decode(column, current)
+            previous = self._decode(column, previous)
+        previous = previous.astype(object)
+        previous[previous_rows < 0] = None
+        return Transitions(column=column, rows=rows, times=self.time[rows], previous=previous, values=current)
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import os
+import re
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from basics.HistoryTable import KIND_CATEGORY, KIND_OBJECT
+from basics.HistoryWriter import NpyHistoryWriter, read_schema
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class HistoryTableView:
+    """
+    HistoryTableView
+    ---
+    Таблица истории в бинарном формате (NpyHistoryWriter), открытая через memory-map.
+    Открытие не читает данные: столбцы отображаются в память при первом обращении,
+    поэтому многогигабайтные запуски открываются мгновенно.
+
+    Аргументы:
+        folder: str     - Папка таблицы с файлом schema.json
+    """
+
+    def __init__(self, folder: str) -> None:
+        schema = read_schema(folder)
+        self.folder = folder
+        self.length: int = schema["rows"]
+        self._meta: dict[str, dict] = {column["name"]: column for column in schema["columns"]}
+        self._arrays: dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return self.length
+
+    @property
+    def column_names(self) -> list[str]:
+        return list(self._meta.keys())
+
+    def kind(self, name: str) -> str:
+        return self._meta[name]["kind"]
+
+    def raw(self, name: str) -> np.ndarray:
+        """
+        raw
+        ---
+        Массив столбца в том виде, в котором он хранится на диске (для категорий - коды int32, -1 - пропуск).
+        Для всех столбцов, кроме объектных, возвращается memory-map без чтения в память.
+        """
+        array = self._arrays.get(name)
+        if array is None:
+            meta = self._meta[name]
+            is_object = meta["kind"] == KIND_OBJECT
+            array = np.load(os.path.join(self.folder, meta["file"]),
+                            mmap_mode=None if is_object else "r", allow_pickle=is_object)
+            self._arrays[name] = array
+        return array
+
+    def categories(self, name: str) -> list[str]:
+        """Словарь строк категориального столбца, индекс в списке - код"""
+        return self._meta[name].get("categories", [])
+
+    def column(self, name: str) -> np.ndarray:
+        """Значения столбца, категории раскодированы в строки (None - пропуск)"""
+        if self.kind(name) == KIND_CATEGORY:
+            return np.array(self.categories(name) + [None], dtype=object)[self.raw(name)]
+        return self.raw(name)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.column(name)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Таблица целиком в pd.DataFrame, строковые столбцы становятся pd.Categorical"""
+        import pandas as pd
+        data = {}
+        for name in self._meta:
+            if self.kind(name) == KIND_CATEGORY:
+                data[name] = pd.Categorical.from_codes(np.asarray(self.raw(name)), categories=self.categories(name))
+            else:
+                data[name] = np.asarray(self.raw(name))
+        return pd.DataFrame(data)
+
+
+class HistoryReader:
+    """
+    HistoryReader
+    ---
+    Чтение сохранённой истории запуска симуляции.
+    Поддерживает оба формата записи:
+        - CSV: таблица целиком ({name}.csv) или порциями потоковой записи ({name}/part-XXXXX.csv);
+        - бинарный NumPy: папка {name}/ со schema.json и файлами столбцов, либо порции {name}/part-XXXXX/,
+          если запуск прервался до объединения.
+    Порции объединяются в одну таблицу в порядке записи.
+
+    Аргументы:
+        directory: str      - Папка с историей запуска (Historizer.dir)
+    """
+
+    _PART_PATTERN = re.compile(r"part-(\d+)(\.csv)?$")
+
+    def __init__(self, directory: str) -> None:
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(f"Папка истории {directory} не найдена")
+        self.directory = directory
+
+    def table_names(self) -> list[str]:
+        """Имена всех таблиц, сохранённых в папке"""
+        names = []
+        for entry in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, entry)
+            if os.path.isfile(path) and entry.endswith(".csv"):
+                names.append(entry[:-len(".csv")])
+            elif os.path.isdir(path) and (self._is_binary(path) or self._parts(path)):
+                names.append(entry)
+        return names
+
+    @staticmethod
+    def _is_binary(folder: str) -> bool:
+        return os.path.isfile(os.path.join(folder, NpyHistoryWriter.SCHEMA_FILE))
+
+    def _parts(self, folder: str) -> list[str]:
+        """Записанные до конца порции таблицы в порядке записи"""
+        parts = []
+        for entry in os.listdir(folder):
+            match = self._PART_PATTERN.match(entry)
+            if match is None:
+                continue
+            path = os.path.join(folder, entry)
+            if match.group(2) is None and not self._is_binary(path):
+                continue  # Бинарная порция без схемы - запись прервалась
+            parts.append((int(match.group(1)), path))
+        return [path for _, path in sorted(parts)]
+
+    def open(self, name: str) -> HistoryTableView:
+        """
+        open
+        ---
+        Открывает таблицу в бинарном формате через memory-map, данные не читаются в память
+        """
+        folder = os.path.join(self.directory, name)
+        if not os.path.isdir(folder) or not self._is_binary(folder):
+            raise KeyError(f"Таблица {name} в бинарном формате не найдена в {self.directory}, "
+                           f"CSV и необъединённые порции доступны через read")
+        return HistoryTableView(folder)
+
+    def query(self, name: str) -> "HistoryQuery":
+        """Запросы по времени к бинарной таблице, открытой через memory-map"""
+        from basics.HistoryQuery import HistoryQuery  # HistoryQuery сам зависит от HistoryTableView
+        return HistoryQuery(self.open(name))
+
+    def read(self, name: str) -> pd.DataFrame:
+        """
+        read
+        ---
+        Читает таблицу name в pd.DataFrame. Порции потоковой записи объединяются,
+        столбцы, появившиеся в середине запуска, заполняются пропусками для ранних порций.
+        """
+        import pandas as pd
+        path = os.path.join(self.directory, f"{name}.csv")
+        if os.path.isfile(path):
+            return pd.read_csv(path)
+
+        folder = os.path.join(self.directory, name)
+        if os.path.isdir(folder) and self._is_binary(folder):
+            return HistoryTableView(folder).to_frame()
+
+        parts = self._parts(folder) if os.path.isdir(folder) else []
+        if not parts:
+            raise KeyError(f"Таблица {name} не найдена в {self.directory}")
+        return pd.concat([self._read_part(part) for part in parts], ignore_index=True)
+
+    @staticmethod
+    def _read_part(path: str) -> pd.DataFrame:
+        import pandas as pd
+        if path.endswith(".csv"):
+            return pd.read_csv(path)
+        return HistoryTableView(path).to_frame()
+
+    def read_all(self) -> dict[str, pd.DataFrame]:
+        return {name: self.read(name) for name in self.table_names()}
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        return self.read(name)
@@ -0,0 +1,343 @@
+from __future__ import annotations
+
+from numbers import Integral, Real
+from typing import Any, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Типы значений, с которыми умеют работать столбцы таблицы истории
+KIND_INT = "int"
+KIND_FLOAT = "float"
+KIND_CATEGORY = "category"
+KIND_OBJECT = "object"
+KIND_MISSING = "missing"
+
+# Кэш соответствия типа python и вида столбца, чтобы не делать isinstance на каждое значение
+_KIND_CACHE: dict[type, str] = {type(None): KIND_MISSING, bool: KIND_OBJECT, np.bool_: KIND_OBJECT}
+
+
+def value_kind(value: Any) -> str:
+    """
+    value_kind
+    ---
+    Определяет, в столбце какого вида может храниться значение
+    """
+    value_type = type(value)
+    kind = _KIND_CACHE.get(value_type)
+    if kind is None:
+        if issubclass(value_type, Integral):
+            kind = KIND_INT
+        elif issubclass(value_type, Real):
+            kind = KIND_FLOAT
+        elif issubclass(value_type, str):
+            kind = KIND_CATEGORY
+        else:
+            kind = KIND_OBJECT
+        _KIND_CACHE[value_type] = kind
+    return kind
+
+
+def kind_dtype(kind: str) -> np.dtype:
+    """Тип данных буфера по умолчанию для столбца вида kind"""
+    return np.dtype(HistoryColumn.DEFAULT_DTYPES[kind])
+
+
+# Типы столбцов, доступные при явной регистрации схемы таблицы: имя -> (вид столбца, тип буфера)
+SCHEMA_TYPES = {
+    "float64": (KIND_FLOAT, np.float64),
+    "float32": (KIND_FLOAT, np.float32),
+    "int64": (KIND_INT, np.int64),
+    "int32": (KIND_INT, np.int32),
+    "category": (KIND_CATEGORY, np.int32),
+    "object": (KIND_OBJECT, object),
+}
+
+
+def parse_schema_type(column_type: str | type | np.dtype) -> tuple[str, np.dtype]:
+    """
+    parse_schema_type
+    ---
+    Вид столбца и тип буфера по описанию типа в схеме: строка из SCHEMA_TYPES, тип python или np.dtype
+    """
+    if isinstance(column_type, str) and column_type in SCHEMA_TYPES:
+        kind, dtype = SCHEMA_TYPES[column_type]
+        return kind, np.dtype(dtype)
+    if column_type is str:
+        return KIND_CATEGORY, np.dtype(np.int32)
+    dtype = np.dtype(column_type)
+    if np.issubdtype(dtype, np.floating):
+        return KIND_FLOAT, dtype
+    if np.issubdtype(dtype, np.integer):
+        return KIND_INT, dtype
+    if dtype == np.dtype(object):
+        return KIND_OBJECT, dtype
+    raise TypeError(f"Тип столбца {column_type} не поддерживается, доступны {list(SCHEMA_TYPES)}")
+
+
+class HistoryColumn:
+    """
+    HistoryColumn
+    ---
+    Столбец таблицы истории на основе предвыделенного массива NumPy.
+    Хранит значения по индексам строк, пропущенные значения заполняются значением missing.
+
+    Аргументы:
+        kind: str                   - Вид столбца: int, float, category или object
+        capacity: int = 0           - Начальная ёмкость буфера
+        dtype: np.dtype = None      - Тип данных буфера, по умолчанию определяется видом столбца
+    """
+
+    DEFAULT_DTYPES = {
+        KIND_INT: np.int64,
+        KIND_FLOAT: np.float64,
+        KIND_CATEGORY: np.int32,  # Для категорий в буфере хранятся коды, сами строки в словаре categories
+        KIND_OBJECT: object,
+    }
+
+    # Какие виды значений можно записать в столбец без смены его вида
+    _ACCEPTS = {
+        KIND_INT: {KIND_INT},
+        KIND_FLOAT: {KIND_INT, KIND_FLOAT, KIND_MISSING},
+        KIND_CATEGORY: {KIND_CATEGORY, KIND_MISSING},
+        KIND_OBJECT: {KIND_INT, KIND_FLOAT, KIND_CATEGORY, KIND_OBJECT, KIND_MISSING},
+    }
+
+    def __init__(self, kind: str, capacity: int = 0, dtype: np.dtype = None) -> None:
+        self.kind = kind
+        self.dtype = np.dtype(dtype if dtype is not None else self.DEFAULT_DTYPES[kind])
+        self.categories: list[str] = []
+        self._codes: dict[str, int] = {}
+        self.data = self._empty(capacity)
+
+    def _empty(self, capacity: int) -> np.ndarray:
+        """Буфер, заполненный пропущенными значениями"""
+        if self.kind == KIND_FLOAT:
+            return np.full(capacity, np.nan, dtype=self.dtype)
+        if self.kind == KIND_CATEGORY:
+            return np.full(capacity, -1, dtype=self.dtype)
+        if self.kind == KIND_OBJECT:
+            return np.full(capacity, None, dtype=object)
+        return np.zeros(capacity, dtype=self.dtype)
+
+    def accepts(self, kind: str) -> bool:
+        return kind in self._ACCEPTS[self.kind]
+
+    def grow(self, capacity: int) -> None:
+        """Увеличивает буфер до ёмкости capacity с сохранением записанных значений"""
+        data = self._empty(capacity)
+        data[:len(self.data)] = self.data
+        self.data = data
+
+    def clear(self) -> None:
+        """Заполняет буфер пропущенными значениями, ёмкость и словарь категорий сохраняются"""
+        self.data = self._empty(len(self.data))
+
+    def set(self, index: int, value: Any) -> None:
+        if self.kind == KIND_CATEGORY:
+            if value is None:
+                self.data[index] = -1
+                return
+            self.data[index] = self.encode(value)
+        else:
+            self.data[index] = value
+
+    def encode(self, value: str) -> int:
+        """Код категории для строки, новая строка добавляется в словарь"""
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.categories)
+            self._codes[value] = code
+            self.categories.append(value)
+        return code
+
+    def values(self, length: int) -> np.ndarray:
+        """
+        values
+        ---
+        Возвращает первые length значений столбца в виде массива NumPy.
+        Для числовых столбцов возвращается представление буфера без копирования,
+        для категорий - декодированные строки.
+        """
+        if self.kind == KIND_CATEGORY:
+            lookup = np.array(self.categories + [None], dtype=object)
+            return lookup[self.data[:length]]  # код -1 попадает на последний элемент - None
+        return self.data[:length]
+
+    def promoted(self, kind: str, length: int) -> "HistoryColumn":
+        """
+        promoted
+        ---
+        Создаёт столбец более общего вида с теми же значениями.
+        Используется, если в столбец пришло значение, которое нельзя сохранить в текущем виде.
+        """
+        if kind == KIND_MISSING or (self.kind == KIND_INT and kind == KIND_FLOAT):
+            new_kind = KIND_FLOAT
+        else:
+            new_kind = KIND_OBJECT
+        column = HistoryColumn(new_kind, capacity=len(self.data))
+        if new_kind == KIND_FLOAT:
+            column.data[:length] = self.data[:length]
+        else:
+            column.data[:length] = self.values(length)
+        return column
+
+
+class HistoryTable:
+    """
+    HistoryTable
+    ---
+    Колоночное хранилище одной таблицы истории.
+    Значения хранятся в буферах NumPy, которые увеличиваются блоками, поэтому добавление строки
+    в среднем занимает O(1) независимо от длины симуляции. Новые столбцы могут появиться в любой момент,
+    для предыдущих строк они заполняются пропущенными значениями.
+    Преобразование в pd.DataFrame выполняется только по запросу (to_frame).
+
+    Если задана схема, набор столбцов и их типы фиксированы: строки пишутся сразу в типизированные буферы
+    без проверки типов и появления новых столбцов. Значения столбцов схемы обязаны быть в каждой строке,
+    значения, не описанные в схеме, игнорируются.
+
+    Аргументы:
+        chunk_size: int = 1024                          - Минимальный шаг увеличения буферов, в строках
+        schema: dict[str, str | type] | None = None     - Фиксированная схема {имя столбца: тип}, типы из SCHEMA_TYPES
+                                                          (float64, float32, int64, int32, category, object)
+    """
+
+    TIME = "time"
+
+    def __init__(self, chunk_size: int = 1024, schema: dict[str, str | type] | None = None) -> None:
+        if chunk_size < 1:
+            raise ValueError("chunk_size должен быть положительным")
+        self.chunk_size = chunk_size
+        self.length = 0
+        self.capacity = 0
+        self.generation = 0  # Увеличивается при каждом clear, по нему кэши запросов узнают об очистке таблицы
+        self.columns: dict[str, HistoryColumn] = {self.TIME: HistoryColumn(KIND_FLOAT)}
+        self._frame = None  # pd.DataFrame из to_frame, сбрасывается при добавлении строк и clear
+
+        self.schema = schema
+        self._schema_columns: list[tuple[str, HistoryColumn]] | None = None
+        if schema is not None:
+            if self.TIME in schema:
+                raise ValueError(f"Столбец {self.TIME} добавляется автоматически и не задаётся в схеме")
+            self._schema_columns = []
+            for name, column_type in schema.items():
+                kind, dtype = parse_schema_type(column_type)
+                column = HistoryColumn(kind, dtype=dtype)
+                self.columns[name] = column
+                self._schema_columns.append((name, column))
+
+    def __len__(self) -> int:
+        return self.length
+
+    def _grow(self) -> None:
+        # Растим геометрически, но не меньше чем на chunk_size строк - амортизированное O(1) на строку
+        self.capacity += max(self.chunk_size, self.capacity)
+        for column in self.columns.values():
+            column.grow(self.capacity)
+
+    def _add_column(self, name: str, kind: str) -> HistoryColumn:
+        if kind == KIND_MISSING:
+            kind = KIND_FLOAT
+        if kind == KIND_INT and self.length > 0:
+            kind = KIND_FLOAT  # У предыдущих строк значения пропущены, целочисленный столбец их не хранит
+        column = HistoryColumn(kind, capacity=self.capacity)
+        self.columns[name] = column
+        return column
+
+    def append(self, timestamp: float, data: dict[str, Any]) -> None:
+        """
+        append
+        ---
+        Добавляет строку в таблицу
+
+        Аргументы:
+            timestamp: float                - Время записи
+            data: dict[str, Any]            - Значения строки в виде {имя столбца: значение}
+        """
+        if self.length == self.capacity:
+            self._grow()
+        index = self.length
+        columns = self.columns
+        self._frame = None
+
+        if self._schema_columns is not None:
+            columns[self.TIME].data[index] = timestamp
+            for name, column in self._schema_columns:
+                value = data[name]
+                if column.kind == KIND_CATEGORY:
+                    column.data[index] = column.encode(value) if value is not None else -1
+                else:
+                    column.data[index] = value
+            self.length += 1
+            return
+
+        columns[self.TIME].data[index] = timestamp
+        for name, value in data.items():
+            kind = value_kind(value)
+            column = columns.get(name)
+            if column is None:
+                column = self._add_column(name, kind)
+            elif not column.accepts(kind):
+                column = column.promoted(kind, index)
+                columns[name] = column
+            column.set(index, value)
+
+        # Столбцы, которых нет в строке, остаются пропущенными; целочисленные приходится расширять до float
+        if len(data) + 1 < len(columns):
+            for name, column in list(columns.items()):
+                if column.kind == KIND_INT and name not in data:
+                    columns[name] = column.promoted(KIND_MISSING, index)
+
+        self.length += 1
+
+    def clear(self) -> None:
+        """Удаляет все строки, набор столбцов и выделенная память сохраняются"""
+        for column in self.columns.values():
+            column.clear()
+        self.length = 0
+        self.generation += 1
+        self._frame = None
+
+    def column(self, name: str) -> np.ndarray:
+        """Значения столбца name для всех записанных строк"""
+        return self.columns[name].values(self.length)
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.column(name)
+
+    @property
+    def column_names(self) -> list[str]:
+        return list(self.columns.keys())
+
+    def kind(self, name: str) -> str:
+        return self.columns[name].kind
+
+    def raw(self, name: str) -> np.ndarray:
+        """
+        raw
+        ---
+        Представление буфера столбца без копирования (для категорий - коды int32, -1 - пропуск).
+        Представление остаётся верным до следующего увеличения буфера или clear.
+        """
+        return self.columns[name].data[:self.length]
+
+    def categories(self, name: str) -> list[str]:
+        """Словарь строк категориального столбца, индекс в списке - код"""
+        return self.columns[name].categories
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        to_frame
+        ---
+        Преобразует таблицу в pd.DataFrame, столбец time идёт первым, далее в порядке появления.
+        Таблица собирается один раз до следующего добавления строк, каждый вызов возвращает поверхностную копию:
+        добавление и удаление столбцов результата безопасно, значения на месте изменять нельзя (копируйте через copy())
+        """
+        import pandas as pd
+        if self._frame is None:
+            self._frame = pd.DataFrame({name: column.values(self.length) for name, column in self.columns.items()})
+        return self._frame.copy(deep=False)
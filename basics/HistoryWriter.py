@@ -0,0 +1,208 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from basics.HistoryTable import HistoryTable, HistoryColumn, kind_dtype, KIND_CATEGORY, KIND_FLOAT, KIND_INT, KIND_OBJECT
+
+
+class CsvHistoryWriter:
+    """
+    CsvHistoryWriter
+    ---
+    Запись таблиц истории в CSV.
+    Таблица целиком записывается в файл {name}.csv, при потоковой записи каждая порция строк
+    записывается в отдельный файл {name}/part-XXXXX.csv, которые затем объединяет HistoryReader.
+
+    Аргументы:
+        directory: str      - Папка для записи истории данного запуска
+    """
+
+    extension = "csv"
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.parts: dict[str, int] = {}
+
+    def write_table(self, name: str, table: HistoryTable) -> None:
+        """Записывает таблицу целиком"""
+        self._write(table, os.path.join(self.directory, f"{name}.{self.extension}"))
+
+    def write_part(self, name: str, table: HistoryTable) -> None:
+        """Записывает очередную порцию строк таблицы в отдельный файл"""
+        folder = os.path.join(self.directory, name)
+        os.makedirs(folder, exist_ok=True)
+        index = self.parts.get(name, 0)
+        self._write(table, os.path.join(folder, f"part-{index:05d}.{self.extension}"))
+        self.parts[name] = index + 1
+
+    def close(self, name: str) -> None:
+        """Завершает запись таблицы, для CSV порции остаются отдельными файлами"""
+        return None
+
+    @staticmethod
+    def _write(table: HistoryTable, path: str) -> None:
+        # Пишем во временный файл и переименовываем, чтобы при падении не осталось обрезанного файла
+        tmp_path = path + ".tmp"
+        table.to_frame().to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+
+
+class NpyHistoryWriter:
+    """
+    NpyHistoryWriter
+    ---
+    Запись таблиц истории в бинарном колоночном формате NumPy.
+    Каждая таблица - папка {name}/ с файлом schema.json и отдельным файлом .npy на каждый столбец.
+    Типы столбцов сохраняются, строковые столбцы хранятся словарным кодированием: коды int32 в .npy,
+    словарь строк в schema.json. Числовые столбцы можно открывать через memory-map без чтения в память.
+
+    При потоковой записи порции пишутся в {name}/part-XXXXX/ в том же формате, а в close объединяются
+    в один файл на столбец. Объединение идёт через memory-map, поэтому не требует памяти на всю таблицу
+    (кроме столбцов с произвольными объектами).
+
+    Аргументы:
+        directory: str      - Папка для записи истории данного запуска
+    """
+
+    extension = "npy"
+    SCHEMA_FILE = "schema.json"
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.parts: dict[str, int] = {}
+
+    def write_table(self, name: str, table: HistoryTable) -> None:
+        """Записывает таблицу целиком"""
+        self._write(table, os.path.join(self.directory, name))
+
+    def write_part(self, name: str, table: HistoryTable) -> None:
+        """Записывает очередную порцию строк таблицы в отдельную папку"""
+        index = self.parts.get(name, 0)
+        self._write(table, os.path.join(self.directory, name, f"part-{index:05d}"))
+        self.parts[name] = index + 1
+
+    def close(self, name: str) -> None:
+        """Объединяет записанные порции таблицы в один набор файлов столбцов"""
+        count = self.parts.pop(name, 0)
+        if count == 0:
+            return
+        folder = os.path.join(self.directory, name)
+        part_folders = [os.path.join(folder, f"part-{index:05d}") for index in range(count)]
+        schemas = [read_schema(part_folder) for part_folder in part_folders]
+
+        # Общая схема: столбец получает наиболее общий вид из всех порций
+        merged: dict[str, dict] = {}
+        for schema in schemas:
+            for column in schema["columns"]:
+                meta = merged.setdefault(column["name"], {"kinds": set(), "dtypes": set(), "categories": [], "present": 0})
+                meta["kinds"].add(column["kind"])
+                meta["dtypes"].add(column["dtype"])
+                meta["present"] += 1
+                for category in column.get("categories", []):
+                    if category not in meta["categories"]:
+                        meta["categories"].append(category)
+
+        total = sum(schema["rows"] for schema in schemas)
+        columns = []
+        for position, (column_name, meta) in enumerate(merged.items()):
+            complete = meta["present"] == len(schemas)
+            kind = _merge_kinds(meta["kinds"], complete=complete)
+            # Записанный тип сохраняется, только если столбец есть во всех порциях и его вид не изменился,
+            # иначе пропуски (например, целочисленного столбца) должны храниться в типе общего вида
+            if complete and len(meta["dtypes"]) == 1 and meta["kinds"] == {kind}:
+                dtype = np.dtype(meta["dtypes"].pop())
+            else:
+                dtype = kind_dtype(kind)
+            file_name = f"c{position}.npy"
+            path = os.path.join(folder, file_name)
+            categories = meta["categories"] if kind == KIND_CATEGORY else []
+
+            if kind == KIND_OBJECT:
+                chunks = [_read_part_column(part_folder, schema, column_name, kind, dtype, categories)
+                          for part_folder, schema in zip(part_folders, schemas)]
+                np.save(path, np.concatenate(chunks) if chunks else np.array([], dtype=object), allow_pickle=True)
+            else:
+                out = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(total,))
+                offset = 0
+                for part_folder, schema in zip(part_folders, schemas):
+                    rows = schema["rows"]
+                    out[offset:offset + rows] = _read_part_column(part_folder, schema, column_name, kind, dtype,
+                                                                  categories)
+                    offset += rows
+                out.flush()
+                del out
+            columns.append(_column_meta(column_name, kind, dtype, file_name, categories))
+
+        _write_schema(folder, total, columns)
+        for part_folder in part_folders:
+            shutil.rmtree(part_folder)
+
+    def _write(self, table: HistoryTable, folder: str) -> None:
+        os.makedirs(folder, exist_ok=True)
+        length = len(table)
+        columns = []
+        for position, (column_name, column) in enumerate(table.columns.items()):
+            file_name = f"c{position}.npy"
+            data = column.data[:length]
+            if column.kind == KIND_OBJECT:
+                np.save(os.path.join(folder, file_name), data, allow_pickle=True)
+            else:
+                np.save(os.path.join(folder, file_name), data, allow_pickle=False)
+            columns.append(_column_meta(column_name, column.kind, column.dtype, file_name, column.categories))
+        # Схема пишется последней: папка без схемы считается недописанной
+        _write_schema(folder, length, columns)
+
+
+def _column_meta(name: str, kind: str, dtype: np.dtype, file_name: str, categories: list[str]) -> dict:
+    meta = {"name": name, "kind": kind, "dtype": np.dtype(dtype).str if kind != KIND_OBJECT else "object",
+            "file": file_name}
+    if kind == KIND_CATEGORY:
+        meta["categories"] = list(categories)
+    return meta
+
+
+def _write_schema(folder: str, rows: int, columns: list[dict]) -> None:
+    path = os.path.join(folder, NpyHistoryWriter.SCHEMA_FILE)
+    with open(path + ".tmp", "w", encoding="UTF-8") as file:
+        json.dump({"format": NpyHistoryWriter.extension, "rows": rows, "columns": columns}, file, ensure_ascii=False)
+    os.replace(path + ".tmp", path)
+
+
+def read_schema(folder: str) -> dict:
+    """Читает schema.json таблицы или порции в бинарном формате"""
+    with open(os.path.join(folder, NpyHistoryWriter.SCHEMA_FILE), encoding="UTF-8") as file:
+        return json.load(file)
+
+
+def _merge_kinds(kinds: set[str], complete: bool) -> str:
+    """Наиболее общий вид столбца для набора порций, complete - столбец есть во всех порциях"""
+    if KIND_OBJECT in kinds or (KIND_CATEGORY in kinds and len(kinds) > 1):
+        return KIND_OBJECT
+    if KIND_CATEGORY in kinds:
+        return KIND_CATEGORY
+    if KIND_FLOAT in kinds or not complete:
+        return KIND_FLOAT
+    return KIND_INT
+
+
+def _read_part_column(folder: str, schema: dict, column_name: str, kind: str, dtype: np.dtype,
+                      categories: list[str]) -> np.ndarray:
+    """Значения столбца порции, приведённые к виду kind общей таблицы"""
+    rows = schema["rows"]
+    meta = next((column for column in schema["columns"] if column["name"] == column_name), None)
+    if meta is None:
+        return HistoryColumn(kind, capacity=rows, dtype=dtype).data
+
+    data = np.load(os.path.join(folder, meta["file"]), mmap_mode=None if meta["kind"] == KIND_OBJECT else "r",
+                   allow_pickle=meta["kind"] == KIND_OBJECT)
+    if meta["kind"] == KIND_CATEGORY:
+        if kind == KIND_CATEGORY:
+            # Перекодируем коды порции в коды общего словаря, -1 (пропуск) переходит в -1
+            remap = np.array([categories.index(category) for category in meta["categories"]] + [-1], dtype=np.int32)
+            return remap[data]
+        data = np.array(meta["categories"] + [None], dtype=object)[data]
+    if kind == KIND_OBJECT:
+        return data.astype(object)
+    return data.astype(dtype, copy=False)
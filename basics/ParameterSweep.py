@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from numbers import Number
+from typing import Any, Callable, TYPE_CHECKING
+
+import numpy as np
+
+from basics.FunctionalBlock import FunctionalBlock
+from basics.SimulationEngine import SimulationEngine
+from basics.EnsembleRunner import final_model_state, seed_everything
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def find_block(engine: SimulationEngine, block_name: str) -> FunctionalBlock:
+    """
+    find_block
+    ---
+    Поиск функционального блока симуляции по имени:
+    model - модель, control_system - система управления, иначе - имя контроллера или эстиматора в банках супервизора
+    """
+    if block_name == "model":
+        return engine.model
+    if block_name == "control_system":
+        return engine.control_system
+    supervisor = engine.control_system.supervisor
+    for bank in (supervisor.controller_bank, supervisor.estimator_bank):
+        if block_name in bank.get_names():
+            return bank[block_name]
+    raise KeyError(f"Функциональный блок {block_name} не найден в симуляции {engine.name}")
+
+
+def apply_overrides(engine: SimulationEngine, overrides: dict[str, Any]) -> None:
+    """
+    apply_overrides
+    ---
+    Записывает значения параметров блоков симуляции.
+    Ключи задаются как "блок.параметр", например "model.omega" или "Controller_min.Strength"
+    """
+    touched = set()
+    for path, value in overrides.items():
+        block_name, _, key = path.partition(".")
+        block = find_block(engine, block_name)
+        block.parameters[key] = value
+        touched.add(block_name)
+    for block_name in touched:
+        find_block(engine, block_name).parameters.update_derived()
+
+
+def point_id(point: dict[str, Any]) -> str:
+    """Устойчивый идентификатор точки перебора, не зависит от порядка ключей"""
+    return hashlib.sha1(json.dumps(point, sort_keys=True, default=str).encode("UTF-8")).hexdigest()[:16]
+
+
+def _run_point(factory: Callable[..., SimulationEngine],
+               simulation_time: float,
+               point: dict[str, Any],
+               seed: int,
+               metrics: Callable[[SimulationEngine], dict[str, Number]]) -> dict[str, Any]:
+    """Вычисление одной точки перебора, выполняется в процессе пула. Ошибка точки не прерывает перебор"""
+    record = {"point_id": point_id(point), "point": point, "seed": seed, "metrics": {}, "error": None}
+    try:
+        seed_everything(seed)
+        factory_kwargs = {key: value for key, value in point.items() if "." not in key}
+        overrides = {key: value for key, value in point.items() if "." in key}
+        engine = factory(**factory_kwargs)
+        apply_overrides(engine, overrides)
+        engine.run(simulation_time)
+        record["metrics"] = metrics(engine)
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    return record
+
+
+class ParameterSweep:
+    """
+    ParameterSweep
+    ---
+    Перебор параметров симуляции на пуле процессов со сбором скалярных метрик по каждой точке.
+
+    Точка перебора - словарь значений. Ключи без точки передаются в factory как именованные аргументы
+    (например boundary для границ эстиматора), ключи вида "блок.параметр" записываются в параметры
+    блока после создания симуляции (например "Controller_min.Strength" или "model.omega").
+
+    Если задан results_file, результат каждой точки дописывается в файл JSON Lines сразу по готовности.
+    При повторном запуске точки, уже записанные в файл, пропускаются - перебор продолжается после падения.
+
+    Аргументы:
+        factory: Callable[..., SimulationEngine]                            - Функция создания симуляции, уровня модуля
+        simulation_time: float                                              - Время моделирования каждой точки
+        grid: dict[str, list] | None = None                                 - Сетка значений, перебираются все сочетания
+        points: list[dict[str, Any]] | None = None                          - Явный список точек (вместо или вместе с grid)
+        metrics: Callable[[SimulationEngine], dict[str, Number]] = None     - Скалярные метрики точки, по умолчанию -
+                                                                              конечное состояние модели
+        results_file: str | None = None                                     - Файл JSON Lines для результатов и продолжения
+        seed: int | None = 0                                                - Начальное значение генераторов, seed точки
+                                                                              вычисляется из него и идентификатора точки
+        max_workers: int | None = None                                      - Число процессов, 1 - в текущем процессе
+        retry_failed: bool = False                                          - Пересчитывать ли точки, завершившиеся ошибкой
+    """
+
+    def __init__(self,
+                 factory: Callable[..., SimulationEngine],
+                 simulation_time: float,
+                 grid: dict[str, list] | None = None,
+                 points: list[dict[str, Any]] | None = None,
+                 metrics: Callable[[SimulationEngine], dict[str, Number]] | None = None,
+                 results_file: str | None = None,
+                 seed: int | None = 0,
+                 max_workers: int | None = None,
+                 retry_failed: bool = False) -> None:
+        self.factory = factory
+        self.simulation_time = simulation_time
+        self.points = (self.grid_points(grid) if grid is not None else []) + list(points or [])
+        if not self.points:
+            raise ValueError("Не заданы точки перебора: нужен grid или points")
+        self.metrics = metrics if metrics is not None else final_model_state
+        self.results_file = results_file
+        self.seed = seed
+        self.max_workers = max_workers
+        self.retry_failed = retry_failed
+        self.records: dict[str, dict[str, Any]] = {}
+
+    @staticmethod
+    def grid_points(grid: dict[str, list]) -> list[dict[str, Any]]:
+        """Все сочетания значений сетки"""
+        keys = list(grid.keys())
+        return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+    def point_seed(self, identifier: str) -> int:
+        """Seed точки зависит только от общего seed и самой точки, поэтому не меняется при продолжении перебора"""
+        sequence = np.random.SeedSequence([self.seed or 0, int(identifier, 16)])
+        return int(sequence.generate_state(1, dtype=np.uint64)[0])
+
+    def _load_done(self) -> None:
+        """Читает уже посчитанные точки из файла результатов, недописанная последняя строка игнорируется"""
+        if self.results_file is None or not os.path.isfile(self.results_file):
+            return
+        # Читаем байты и декодируем каждую строку отдельно: обрезанная строка может заканчиваться
+        # на середине многобайтного символа
+        with open(self.results_file, "rb") as file:
+            for line in file:
+                try:
+                    record = json.loads(line.decode("UTF-8"))
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    continue
+                self.records[record["point_id"]] = record
+
+    def _save(self, record: dict[str, Any], file) -> None:
+        self.records[record["point_id"]] = record
+        if file is not None:
+            file.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    def pending(self) -> list[dict[str, Any]]:
+        """Точки, которые ещё нужно посчитать"""
+        self._load_done()
+        pending, seen = [], set()
+        for point in self.points:
+            identifier = point_id(point)
+            if identifier in seen:
+                continue
+            seen.add(identifier)
+            record = self.records.get(identifier)
+            if record is None or (self.retry_failed and record["error"] is not None):
+                pending.append(point)
+        return pending
+
+    def run(self) -> pd.DataFrame:
+        """
+        run
+        ---
+        Считает все ещё не посчитанные точки и возвращает таблицу результатов по всем точкам перебора
+        """
+        pending = self.pending()
+        arguments = [(self.factory, self.simulation_time, point, self.point_seed(point_id(point)), self.metrics)
+                     for point in pending]
+
+        file = None
+        if self.results_file is not None:
+            broken_line = False
+            if os.path.isfile(self.results_file) and os.path.getsize(self.results_file) > 0:
+                with open(self.results_file, "rb") as existing:
+                    existing.seek(-1, os.SEEK_END)
+                    broken_line = existing.read(1) != b"\n"
+            file = open(self.results_file, "a", encoding="UTF-8")
+            if broken_line:
+                file.write("\n")  # После падения последняя строка могла остаться недописанной
+        try:
+            if self.max_workers == 1:
+                for args in arguments:
+                    self._save(_run_point(*args), file)
+            elif arguments:
+                with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                    futures = [executor.submit(_run_point, *args) for args in arguments]
+                    for future in as_completed(futures):
+                        self._save(future.result(), file)
+        finally:
+            if file is not None:
+                file.close()
+
+        return self.results()
+
+    def results(self) -> pd.DataFrame:
+        """Таблица результатов: значения точки, метрики, seed и ошибка, строка на точку в порядке перебора"""
+        import pandas as pd
+        rows = []
+        for point in self.points:
+            record = self.records.get(point_id(point))
+            if record is None:
+                continue
+            rows.append({"point_id": record["point_id"], **record["point"], **record["metrics"],
+                         "seed": record["seed"], "error": record["error"]})
+        if not rows:
+            return pd.DataFrame(columns=["point_id", "seed", "error"])
+        return pd.DataFrame(rows).drop_duplicates(subset="point_id", ignore_index=True)
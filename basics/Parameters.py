@@ -1,8 +1,16 @@
-import sympy as sp
+from __future__ import annotations
+
+import math
+
 from dataclasses import dataclass, field
-from typing import Any, Callable, Optional, Union
+from typing import Any, Callable, Optional, Union, TYPE_CHECKING
 from numbers import Number
-from collections import deque
+
+from basics.ValueHistory import (ValueHistory, HistoryClock, INTEGRATION_METHODS, gather_last, step_intervals,
+                                 step_integrals, derivatives)
+
+if TYPE_CHECKING:
+    import sympy as sp  # sympy импортируется при первом построении символьных выражений
 
 
 @dataclass
@@ -38,7 +46,8 @@ class Parameter:
     dtype: Optional[type] = None  # тип данных (float, int, bool, str, np.ndarray)
 
     previous_value_depth: Optional[int] = 2
-    previous_values = None
+    previous_values = None  # ValueHistory, создаётся при первой записи числового значения
+    clock = None  # HistoryClock набора параметров, из него берутся отметки времени для previous_values
     Integral: Number = 0
 
     sensor_noise: Optional[Callable[[Number], Number]] = None  # Функция для добавления шума, ограничений и нелинейности измерения параметра
@@ -56,10 +65,10 @@ class Parameter:
                 value = self.dtype(value)
             if isinstance(value, Number):
                 if self.previous_values is None:
-                    self.previous_values = deque([], maxlen=self.previous_value_depth + 1)
-                self.previous_values.appendleft(value)
+                    self.previous_values = ValueHistory(self.previous_value_depth)
+                self.previous_values.append(value, None if self.clock is None else self.clock.time)
         elif name == "previous_value_depth" and self.previous_values is not None:
-            self.previous_values = deque(list(self.previous_values), maxlen=self.previous_value_depth+1)
+            self.previous_values = self.previous_values.resize(value)
         super().__setattr__(name, value)
 
     def validate(self) -> None: # TODO: Подумать, может стоит разделить логику обрезания значения и невозможных значений
@@ -93,64 +102,107 @@ class Parameter:
     def __call__(self):
         return self.value
 
-    def compute_step_integral(self, dt: Number) -> None:
+    def _check_integral_inputs(self, dt: Number | None, method: str) -> None:
+        if dt is not None:
+            if not isinstance(dt, Number):
+                raise TypeError("dt должен быть числом")
+            if dt <= 0:
+                raise ValueError("dt должен быть положительным")
+        if method not in INTEGRATION_METHODS:
+            raise ValueError(f"Неизвестный метод интегрирования {method}, доступны {INTEGRATION_METHODS}")
+        if self.previous_values is None or self.previous_value_depth<1:
+            raise ValueError(f"Предыдущие значения {self.name} деактивированы, расчёт интеграла невозможен")
+
+    def compute_step_integral(self, dt: Number | None = None, method: str = "trapezoid") -> None:
         """
         integral
         ---
         Численно рассчитывает интеграл параметра по накопленным предыдущим значениям (на 1 шаг назад)
-        методом трапеций с постоянным шагом dt.
+        и добавляет его к Integral. Метод трапеций или, при method="simpson", интеграл параболы
+        по трём последним значениям (см. ValueHistory.step_integral).
 
         Аргументы:
-            :param dt:  Number - шаг дискретизации по времени
+            :param dt:  Number | None = None - шаг дискретизации по времени, None - по отметкам времени значений (ParameterSet.set_time)
+            :param method: str = "trapezoid" - метод интегрирования, "trapezoid" или "simpson"
         """
-        if not isinstance(dt, Number):
-            raise TypeError("dt должен быть числом")
-        if dt <= 0:
-            raise ValueError("dt должен быть положительным")
-        if self.previous_values is None or self.previous_value_depth<1:
-            raise ValueError(f"Предыдущие значения {self.name} деактивированы, расчёт интеграла невозможен")
+        self._check_integral_inputs(dt, method)
         if len(self.previous_values) < 2:
             raise RuntimeWarning(f"Недостаточно предыдущих значений параметра {self.name}, интеграл не обновлён")
             return
 
-        values = list(self.previous_values)
-        self.Integral += (values[0] + values[1]) * dt / 2
+        self.Integral += self.previous_values.step_integral(dt, method)
         return
 
-    def compute_multiple_step_integral(self, dt: Number, steps: int | None = None) -> None:
+    def compute_multiple_step_integral(self, dt: Number | None = None, steps: int | None = None,
+                                       method: str = "trapezoid") -> None:
         """
         integral
         ---
-        Численно рассчитывает интеграл параметра по накопленным предыдущим значениям (на 1 шаг назад)
-        методом трапеций с постоянным шагом dt.
+        Численно рассчитывает интеграл параметра по накопленным предыдущим значениям на steps шагов назад
+        и записывает его в Integral. Метод трапеций по всем значениям считается за O(1) по текущим суммам
+        ValueHistory, method="simpson" - составная формула Симпсона.
 
         Аргументы:
-            :param dt:  Number - шаг дискретизации по времени для всех шагов
+            :param dt:  Number | None = None - шаг дискретизации по времени для всех шагов, None - по отметкам времени значений
             :param steps: int | None = None - число шагов, для которых посчитать интеграл, если None, то для всех доступных шагов
+            :param method: str = "trapezoid" - метод интегрирования, "trapezoid" или "simpson"
         """
-        if not isinstance(dt, Number):
-            raise TypeError("dt должен быть числом")
-        if dt <= 0:
-            raise ValueError("dt должен быть положительным")
-        if self.previous_values is None or self.previous_value_depth<1:
-            raise ValueError(f"Предыдущие значения {self.name} деактивированы, расчёт интеграла невозможен")
+        self._check_integral_inputs(dt, method)
         if len(self.previous_values) < 2:
             raise RuntimeWarning(f"Недостаточно предыдущих значений параметра {self.name}, интеграл не обновлён")
             self.Integral = 0
             return
-        if steps is None:
-            steps = self.previous_value_depth
 
-        values = list(self.previous_values)
-        self.Integral = sum((values[i] + values[i + 1]) * dt / 2 for i in range(steps))
+        self.Integral = self.previous_values.window_integral(dt, steps, method)
         return
 
+    def derivative(self, dt: Number | None = None, order: int = 1) -> Number:
+        """
+        derivative
+        ---
+        Производная параметра в момент последнего значения: order=1 - разность назад,
+        order=2 - по параболе через три последних значения
+
+        Аргументы:
+            :param dt:  Number | None = None - шаг дискретизации по времени, None - по отметкам времени значений
+            :param order: int = 1 - порядок точности, 1 или 2
+        """
+        if self.previous_values is None or len(self.previous_values) < 2:
+            raise RuntimeWarning(f"Недостаточно предыдущих значений параметра {self.name} для расчёта производной")
+        return self.previous_values.derivative(dt, order)
+
     def get_integral(self) -> Number:
         return self.Integral
 
     def zero_integral(self):
         self.Integral = 0
 
+    def snapshot(self) -> tuple[Any, ValueHistory | None, Number]:
+        """
+        snapshot
+        ---
+        Изменяемое во время симуляции состояние параметра: значение, копия предыдущих значений и интеграл
+        """
+        previous_values = None if self.previous_values is None else self.previous_values.copy()
+        return self.value, previous_values, self.Integral
+
+    def restore(self, state: tuple[Any, ValueHistory | list | None, Number]) -> None:
+        """
+        restore
+        ---
+        Восстановление состояния из snapshot без проверок и без записи значения в предыдущие значения.
+        Предыдущие значения можно передать и списком, начиная с последнего, тогда они восстанавливаются без отметок времени
+        """
+        value, previous_values, integral = state
+        object.__setattr__(self, "value", value)
+        if previous_values is None:
+            object.__setattr__(self, "previous_values", None)
+        elif isinstance(previous_values, ValueHistory):
+            object.__setattr__(self, "previous_values", previous_values.copy())
+        else:
+            object.__setattr__(self, "previous_values", ValueHistory(self.previous_value_depth, previous_values))
+        self.Integral = integral
+
 
 class DerivedParameter(Parameter):
     """
@@ -187,16 +239,18 @@ class DerivedParameter(Parameter):
         self.category = "derived"
         self.formula_func = formula
         self.dependencies = dependencies
-        self._symbolic_expr = None  # символьное выражение будет создано позже
+        self._symbolic_expr = None  # символьное выражение будет создано при первом вызове symbolic()
+        self._symbolic_built = False
 
     def build_symbolic(self) -> None:
-        """Создаёт символьное выражение из зависимости"""
+        """Создаёт символьное выражение из зависимости, при ошибке в формуле выражение остаётся None"""
+        import sympy as sp
         symbols = [sp.Symbol(dep) for dep in self.dependencies]
-        expr = self.formula_func(*symbols)
         try:
-            self._symbolic_expr = expr
+            self._symbolic_expr = self.formula_func(*symbols)
         except Exception:
             self._symbolic_expr = None
+        self._symbolic_built = True
         return
 
     def compute(self, parameters: "ParameterSet") -> Number:
@@ -206,10 +260,122 @@ class DerivedParameter(Parameter):
         return self.value
 
     def symbolic(self):
-        """Возвращает символьное выражение"""
+        """Возвращает символьное выражение, при первом вызове строит его"""
+        if not self._symbolic_built:
+            self.build_symbolic()
         return self._symbolic_expr
 
 
+def _symbolic_expression(param: DerivedParameter, aliases: dict[str, str]) -> sp.Expr | None:
+    """Символьное выражение параметра через псевдонимы зависимостей, None - если построить не удалось"""
+    import sympy as sp
+    from sympy.printing.pycode import PythonCodePrinter
+    try:
+        expr = sp.sympify(param.symbolic())
+        if not isinstance(expr, sp.Expr) or not expr.free_symbols <= {sp.Symbol(dep) for dep in param.dependencies}:
+            return None
+        expr = expr.xreplace({sp.Symbol(dep): sp.Symbol(aliases[dep]) for dep in param.dependencies})
+        PythonCodePrinter().doprint(expr)  # Проверка, что выражение печатается в код Python
+        return expr
+    except Exception:
+        return None
+
+
+def compile_derived_formulas(params: dict[str, Parameter],
+                             order: list[str],
+                             use_symbolic: bool = True,
+                             cse: bool = True) -> tuple[Callable[..., tuple], list[str], list[str], dict[str, int]]:
+    """
+    compile_derived_formulas
+    ---
+    Компиляция всех зависимых параметров набора в одну сгенерированную функцию: формулы вычисляются подряд
+    в порядке order, промежуточные значения передаются через локальные переменные.
+    Для параметров с символьным выражением (DerivedParameter.symbolic) в функцию подставляется код выражения,
+    напечатанный sympy, для остальных - вызов исходной формулы. Символьный код может отличаться от исходной
+    формулы на ошибку округления, так как sympy приводит подобные слагаемые.
+
+    При cse=True над символьными выражениями всех параметров выполняется исключение общих подвыражений (sympy.cse):
+    общие подвыражения вычисляются один раз, перед первым использованием.
+
+    Возвращает (функция, ключи входных независимых параметров, ключи вычисляемых параметров в порядке результата,
+    статистика). Функция принимает значения входных параметров и возвращает кортеж значений вычисляемых.
+    Статистика: symbolic - число параметров из символьных выражений, formula_calls - с вызовом исходной формулы,
+    subexpressions - число общих подвыражений, ops_before / ops_after - число операций в символьных выражениях
+    (sympy.count_ops) до и после исключения общих подвыражений, ops_saved - их разность.
+
+    Аргументы:
+        params: dict[str, Parameter]    - Параметры набора по ключам
+        order: list[str]                - Порядок пересчёта параметров (топологическая сортировка)
+        use_symbolic: bool = True       - Подставлять код символьных выражений, False - только вызовы формул
+        cse: bool = True                - Исключать общие подвыражения символьных выражений
+    """
+    import sympy as sp
+    from sympy.printing.pycode import PythonCodePrinter
+    aliases = {key: f"_p{position}" for position, key in enumerate(params)}
+    derived = [key for key in order if isinstance(params[key], DerivedParameter)]
+    derived_keys = set(derived)
+    inputs = [key for key in params
+              if key not in derived_keys and any(key in params[name].dependencies for name in derived)]
+
+    expressions = {}
+    if use_symbolic:
+        for key in derived:
+            expr = _symbolic_expression(params[key], aliases)
+            if expr is not None:
+                expressions[key] = expr
+    ops_before = sum(sp.count_ops(expr) for expr in expressions.values())
+    replacements = []
+    if cse and expressions:
+        replacements, reduced = sp.cse(list(expressions.values()), symbols=sp.numbered_symbols("_c"), order="none")
+        expressions = dict(zip(expressions, reduced))
+    ops_after = sum(sp.count_ops(expr) for _, expr in replacements) + sum(sp.count_ops(expr) for expr in expressions.values())
+
+    replacement_exprs = dict(replacements)
+    printer = PythonCodePrinter()
+    namespace = {"math": math}
+    lines = []
+    emitted = set()
+    for key in derived:
+        param = params[key]
+        expr = expressions.get(key)
+        if expr is None:
+            namespace[f"_f{aliases[key]}"] = param.formula_func
+            lines.append(f"    {aliases[key]} = _f{aliases[key]}({', '.join(aliases[dep] for dep in param.dependencies)})")
+            continue
+        # Общие подвыражения, нужные параметру (в том числе через другие подвыражения), в порядке sympy.cse
+        needed, stack = set(), [expr]
+        while stack:
+            for symbol in stack.pop().free_symbols:
+                if symbol in replacement_exprs and symbol not in needed and symbol not in emitted:
+                    needed.add(symbol)
+                    stack.append(replacement_exprs[symbol])
+        try:
+            for symbol, subexpression in replacements:
+                if symbol in needed:
+                    lines.append(f"    {symbol.name} = {printer.doprint(subexpression)}")
+                    emitted.add(symbol)
+            lines.append(f"    {aliases[key]} = {printer.doprint(expr)}")
+        except Exception:
+            if not cse:
+                raise
+            # Подвыражение не печатается в код Python - компилируем без исключения общих подвыражений
+            return compile_derived_formulas(params, order, use_symbolic=use_symbolic, cse=False)
+
+    source = "\n".join([f"def _update_derived({', '.join(aliases[key] for key in inputs)}):",
+                        *lines,
+                        f"    return ({''.join(aliases[key] + ', ' for key in derived)})"])
+    exec(compile(source, "<compiled derived parameters>", "exec"), namespace)
+    stats = {
+        "symbolic": len(expressions),
+        "formula_calls": len(derived) - len(expressions),
+        "subexpressions": len(replacements),
+        "ops_before": ops_before,
+        "ops_after": ops_after,
+        "ops_saved": ops_before - ops_after,
+    }
+    return namespace["_update_derived"], inputs, derived, stats
+
+
 class ParameterSet:
     """
     ParameterSet
@@ -223,7 +389,7 @@ class ParameterSet:
         ---
         Конструктор класса ParameterSet.
         Обеспечивает подготовку к работе с зависимыми параметрами - построение графа зависимостей, проверку на циклы,
-        вычисляет начальное значение зависимых параметров и строит символьные выражения.
+        вычисляет начальное значение зависимых параметров. Символьные выражения строятся по запросу (DerivedParameter.symbolic).
 
         Аргументы:
             **params: Parameter     - Набор именованных параметров (класс Parameter или DerivedParameter)
@@ -234,8 +400,18 @@ class ParameterSet:
         self._build_dependency_graph()
         self._check_for_cycles()
         self.order = self._topological_sort()
+        self._compiled_derived = None  # Результат compile_derived_formulas, если включена компиляция
+        self._compile_options = None  # Аргументы compile_derived, None - компиляция не включена
+        self.compile_stats = None  # Статистика компиляции зависимых параметров, см. compile_derived_formulas
+        self._changed = None  # Параметры, изменённые после пересчёта зависимых, None - нужен полный пересчёт
+        self._affected_cache = {}  # Зависимые параметры для набора изменённых, см. _affected_derived
+        self.clock = HistoryClock()  # Время для отметок в предыдущих значениях параметров, см. set_time
+        for p in self._params.values():
+            p.clock = self.clock
+        self._tracked_integrals = {}  # {ключ: (ключ для записи интеграла или None, метод)}, см. track_integral
+        self._tracked_derivatives = {}  # {ключ: (ключ для записи производной, порядок)}, см. track_derivative
         self.update_derived()
-        self._build_symbolic_expressions() # Пока при ошибке ничего не делаем
+        # Символьные выражения строятся при первом вызове DerivedParameter.symbolic() или _build_symbolic_expressions
 
         # Перенесено в self.update_derived()
         # for key in self._params: # При вводе значений проверим, что все числа корректные
@@ -300,21 +476,87 @@ class ParameterSet:
                     q.append(m)
         return order
 
-    def update_derived(self) -> None:
+    def update_derived(self, full: bool = False) -> None:
         """
         update_derived
         ---
-        Метод для пересчёта всех зависимых параметров.
-        Также содержит проверку всех параметров на соблюдение границ.
-        Запускать вручную на каждой итерации!"""
+        Метод для пересчёта зависимых параметров.
+        Пересчитываются только параметры, зависящие (в том числе через другие зависимые) от параметров,
+        изменённых через __setitem__ / load_dict после предыдущего пересчёта, и проверяются границы только
+        изменённых и пересчитанных. Первый пересчёт, пересчёт после update
+        и restore, а также при full=True - полный, с проверкой всех параметров.
+        Запускать вручную на каждой итерации!
+
+        Аргументы:
+            full: bool = False  - Пересчитать и проверить все параметры, например после записи value напрямую в params_dict
+        """
         # order = self._topological_sort() # Будем считать, что формулы не меняются, поэтому пересчитывать граф вычислений нет нужды
-        for name in self.order:
-            p = self._params[name]
-            if isinstance(p, DerivedParameter):
-                p.compute(self)
+        if full or self._changed is None:
+            affected = None
+        elif self._changed:
+            affected = self._affected_derived(frozenset(self._changed))
+        else:
+            return
 
-        for key in self._params: # При обновлении значений проверим, что все числа корректные
+        # Сгенерированная функция считает все зависимые параметры, при малой доле затронутых дешевле пересчитать их по одному
+        if self._compiled_derived is not None and (affected is None or 2 * len(affected) >= len(self._compiled_derived[2])):
+            function, inputs, outputs, _ = self._compiled_derived
+            values = function(*[self._params[key].value for key in inputs])
+            for key, value in zip(outputs, values):
+                if affected is None or key in affected:
+                    self._params[key].value = value
+        else:
+            for name in self.order if affected is None else affected:
+                p = self._params[name]
+                if isinstance(p, DerivedParameter):
+                    p.compute(self)
+
+        # При обновлении значений проверим, что все числа корректные. Изменённые проверяются повторно:
+        # значение, отклонённое при записи, остаётся в параметре, и ошибка должна повториться здесь
+        for key in self._params if affected is None else [*self._changed, *affected]:
             self._params[key].validate()
+        self._changed = set()
+
+    def _affected_derived(self, changed: frozenset[str]) -> list[str]:
+        """Зависимые параметры, достижимые по графу из изменённых, в порядке пересчёта"""
+        affected = self._affected_cache.get(changed)
+        if affected is None:
+            reached, stack = set(), list(changed)
+            while stack:
+                for dependent in self._graph.get(stack.pop(), []):
+                    if dependent not in reached:
+                        reached.add(dependent)
+                        stack.append(dependent)
+            affected = self._affected_cache[changed] = [key for key in self.order if key in reached]
+        return affected
+
+    def compile_derived(self, use_symbolic: bool = True, cse: bool = True) -> dict[str, int]:
+        """
+        compile_derived
+        ---
+        Включает пересчёт всех зависимых параметров одним вызовом сгенерированной функции
+        (см. compile_derived_formulas) вместо обхода order с вызовом DerivedParameter.compute.
+        Возвращает статистику компиляции, в том числе число сэкономленных операций ops_saved.
+
+        Аргументы:
+            use_symbolic: bool = True   - Подставлять код символьных выражений, False - только вызовы формул
+            cse: bool = True            - Исключать общие подвыражения символьных выражений
+        """
+        self._compiled_derived = compile_derived_formulas(self._params, self.order, use_symbolic, cse)
+        self._compile_options = {"use_symbolic": use_symbolic, "cse": cse}
+        self.compile_stats = self._compiled_derived[3]
+        return self.compile_stats
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Сгенерированная функция не сериализуется, она строится заново при загрузке
+        state = self.__dict__.copy()
+        state["_compiled_derived"] = None
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        if self._compile_options is not None:
+            self.compile_derived(**self._compile_options)
 
     def _build_symbolic_expressions(self) -> None:
         """Построить символьные выражения для DerivedParameter"""
@@ -334,6 +576,10 @@ class ParameterSet:
         if isinstance(p, DerivedParameter):
             raise AttributeError(f"{key} — вычисляемый параметр.")
         p.value = value
+        # Значение уже записано, поэтому отмечаем его до проверки: иначе отклонённое значение
+        # осталось бы в параметре без пересчёта зависимых и повторной проверки в update_derived
+        if self._changed is not None:
+            self._changed.add(key)
         p.validate()
         # Убрал автоматическое обновление, чтобы постоянно не пересчитывать, пока все параметры не заданы
         # self.update_derived()
@@ -342,6 +588,11 @@ class ParameterSet:
         for new_param in additional_parameters:
             self._params[new_param] = additional_parameters[new_param]
             self.params_dict[new_param] = additional_parameters[new_param]
+            additional_parameters[new_param].clock = self.clock
+        self._changed = None
+        self._affected_cache = {}
+        if self._compile_options is not None:
+            self.compile_derived(**self._compile_options)
 
 
     def as_dict(self, keys: list[str] = None, read_sensors: bool = False) -> dict[str, Number]:
@@ -382,40 +633,149 @@ class ParameterSet:
     def __repr__(self):
         return ", ".join(f"{k}={p.value}" for k, p in self._params.items() if p.value is not None)
 
-    def compute_step_integral(self, dt: Number, keys: list[str] = None) -> None:
+    def set_time(self, time: Number | None) -> None:
+        """Время, с которым записываются следующие значения параметров в их предыдущие значения (None - без отметок)"""
+        self.clock.time = time
+
+    def compute_step_integral(self, dt: Number | None = None, keys: list[str] = None, method: str = "trapezoid") -> None:
         """
         integral
         ---
         Численно рассчитывает интеграл параметра по накопленным предыдущим значениям (на 1 шаг назад)
-        методом трапеций с постоянным шагом dt. Для заданных параметров из набора
+        с шагом dt или по отметкам времени значений. Для заданных параметров из набора
 
         Аргументы:
-            :param dt:  Number - шаг дискретизации по времени для всех параметров
+            :param dt:  Number | None = None - шаг дискретизации по времени для всех параметров, None - по отметкам времени (set_time)
             :param keys:  list[str] = None - ключи параметров, для которых надо посчитать интеграл, если None, то для всех
+            :param method: str = "trapezoid" - метод интегрирования, "trapezoid" или "simpson"
         """
         if keys is None:
             keys = self._params.keys()
 
         for key in keys:
-            self._params[key].compute_step_integral(dt=dt)
+            self._params[key].compute_step_integral(dt=dt, method=method)
 
-    def compute_multiple_step_integral(self, dt: Number, steps: int | None = None, keys: list[str] = None) -> None:
+    def compute_multiple_step_integral(self, dt: Number | None = None, steps: int | None = None, keys: list[str] = None,
+                                       method: str = "trapezoid") -> None:
         """
         integral
         ---
-        Численно рассчитывает интеграл параметра по накопленным предыдущим значениям (на 1 шаг назад)
-        методом трапеций с постоянным шагом dt.
+        Численно рассчитывает интеграл параметра по накопленным предыдущим значениям на steps шагов назад,
+        см. Parameter.compute_multiple_step_integral
 
         Аргументы:
-            :param dt:  Number - шаг дискретизации по времени для всех шагов
+            :param dt:  Number | None = None - шаг дискретизации по времени для всех шагов, None - по отметкам времени
             :param steps: int | None = None - число шагов, для которых посчитать интеграл, если None, то для всех доступных шагов
             :param keys:  list[str] = None - ключи параметров, для которых надо посчитать интеграл, если None, то для всех
+            :param method: str = "trapezoid" - метод интегрирования, "trapezoid" или "simpson"
         """
         if keys is None:
             keys = self._params.keys()
 
         for key in keys:
-            self._params[key].compute_multiple_step_integral(dt=dt, steps=steps)
+            self._params[key].compute_multiple_step_integral(dt=dt, steps=steps, method=method)
+
+    def track_integral(self, key: str, target: str | None = None, method: str = "trapezoid") -> None:
+        """
+        track_integral
+        ---
+        Добавляет параметр key в пакетный расчёт интегралов update_tracked
+
+        Аргументы:
+            key: str                    - Интегрируемый параметр
+            target: str | None = None   - Параметр, в который записывается накопленный интеграл, None - только Integral
+            method: str = "trapezoid"   - Метод интегрирования на шаге, "trapezoid" или "simpson"
+        """
+        self._check_tracked(key, target)
+        if method not in INTEGRATION_METHODS:
+            raise ValueError(f"Неизвестный метод интегрирования {method}, доступны {INTEGRATION_METHODS}")
+        self._tracked_integrals[key] = (target, method)
+
+    def track_derivative(self, key: str, target: str, order: int = 1) -> None:
+        """
+        track_derivative
+        ---
+        Добавляет параметр key в пакетный расчёт производных update_tracked, производная записывается в target
+
+        Аргументы:
+            key: str            - Дифференцируемый параметр
+            target: str         - Параметр, в который записывается производная
+            order: int = 1      - Порядок точности, 1 или 2, см. Parameter.derivative
+        """
+        self._check_tracked(key, target)
+        if order not in (1, 2):
+            raise ValueError(f"Поддерживается порядок производной 1 или 2, получено {order}")
+        self._tracked_derivatives[key] = (target, order)
+
+    def _check_tracked(self, key: str, target: str | None) -> None:
+        if key not in self._params:
+            raise KeyError(f"{key} не найден.")
+        if target is not None:
+            if target not in self._params:
+                raise KeyError(f"{target} не найден.")
+            if isinstance(self._params[target], DerivedParameter):
+                raise AttributeError(f"{target} — вычисляемый параметр.")
+
+    def update_tracked(self, dt: Number | None = None) -> None:
+        """
+        update_tracked
+        ---
+        Пакетный шаг для всех параметров из track_integral и track_derivative: последние значения собираются
+        в массивы, интегралы на шаге и производные считаются одной векторной операцией на метод,
+        интегралы добавляются к Integral, результаты записываются в целевые параметры.
+        Заменяет последовательность compute_step_integral + get_integral + запись по каждому параметру.
+
+        Аргументы:
+            dt: Number | None = None    - Шаг по времени, None - по отметкам времени значений (set_time)
+        """
+        if dt is not None and dt <= 0:
+            raise ValueError("dt должен быть положительным")
+        results = []
+        for method in INTEGRATION_METHODS:
+            keys = [key for key, (_, key_method) in self._tracked_integrals.items() if key_method == method]
+            if not keys:
+                continue
+            values, times = self._gather_tracked(keys, 3 if method == "simpson" else 2)
+            for key, area in zip(keys, step_integrals(values, step_intervals(times, dt), method).tolist()):
+                p = self._params[key]
+                p.Integral += area
+                if self._tracked_integrals[key][0] is not None:
+                    results.append((self._tracked_integrals[key][0], p.Integral))
+        for order in (1, 2):
+            keys = [key for key, (_, key_order) in self._tracked_derivatives.items() if key_order == order]
+            if not keys:
+                continue
+            values, times = self._gather_tracked(keys, order + 1)
+            for key, value in zip(keys, derivatives(values, step_intervals(times, dt), order).tolist()):
+                results.append((self._tracked_derivatives[key][0], value))
+        for target, value in results:
+            self[target] = value
+
+    def _gather_tracked(self, keys: list[str], count: int):
+        histories = [self._params[key].previous_values for key in keys]
+        for key, history in zip(keys, histories):
+            if history is None or len(history) < 2:
+                raise RuntimeWarning(f"Недостаточно предыдущих значений параметра {key}, интеграл и производная не обновлены")
+        return gather_last(histories, count)
+
+    def get_derivative(self, keys: list[str] = None, dt: Number | None = None, order: int = 1) -> dict[str, Number]:
+        """Производные параметров в момент последнего значения, см. Parameter.derivative"""
+        if keys is None:
+            keys = self._params.keys()
+
+        return {key: self._params[key].derivative(dt=dt, order=order) for key in keys}
+
+    def snapshot(self) -> dict[str, tuple[Any, ValueHistory | None, Number]]:
+        """Состояние всех параметров набора, см. Parameter.snapshot"""
+        return {key: p.snapshot() for key, p in self._params.items()}
+
+    def restore(self, state: dict[str, tuple[Any, ValueHistory | list | None, Number]]) -> None:
+        """Восстановление состояния параметров набора из snapshot"""
+        for key, param_state in state.items():
+            if key not in self._params:
+                raise KeyError(f"Параметр {key} из сохранённого состояния не найден в наборе")
+            self._params[key].restore(param_state)
+        self._changed = None
 
     def get_integral(self, keys: list[str] = None) -> dict[str, Number]:
         if keys is None:
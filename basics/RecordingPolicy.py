@@ -0,0 +1,108 @@
+from numbers import Number
+from typing import Any
+
+
+class RecordingPolicy:
+    """
+    RecordingPolicy
+    ---
+    Базовая политика записи таблицы истории - записывается каждая строка.
+    Наследники решают в should_record, нужно ли записывать очередную строку таблицы.
+    Политики хранят состояние (последнюю записанную строку и т.п.), поэтому один объект
+    политики обслуживает одну таблицу.
+    """
+
+    def should_record(self, timestamp: float, data: dict[str, Any]) -> bool:
+        return True
+
+    def reset(self) -> None:
+        """Сбрасывает состояние политики, следующая строка будет записана"""
+        return None
+
+
+class DecimationPolicy(RecordingPolicy):
+    """
+    DecimationPolicy
+    ---
+    Запись каждой every-й строки таблицы, начиная с первой
+
+    Аргументы:
+        every: int      - Период записи в вызовах record
+    """
+
+    def __init__(self, every: int) -> None:
+        if every < 1:
+            raise ValueError("Период записи every должен быть положительным")
+        self.every = every
+        self._counter = 0
+
+    def should_record(self, timestamp: float, data: dict[str, Any]) -> bool:
+        record = self._counter == 0
+        self._counter += 1
+        if self._counter == self.every:
+            self._counter = 0
+        return record
+
+    def reset(self) -> None:
+        self._counter = 0
+
+
+class ChangePolicy(RecordingPolicy):
+    """
+    ChangePolicy
+    ---
+    Запись строки только при изменении значений относительно последней записанной строки.
+    Например, для control_system_state с columns=["current_controller"] записываются только переключения контроллера.
+
+    Аргументы:
+        columns: list[str] | None = None    - Отслеживаемые столбцы, если None - все столбцы строки
+    """
+
+    def __init__(self, columns: list[str] | None = None) -> None:
+        self.columns = columns
+        self._last: dict[str, Any] | None = None
+
+    def _changed(self, key: str, value: Any, last_value: Any) -> bool:
+        return value != last_value
+
+    def should_record(self, timestamp: float, data: dict[str, Any]) -> bool:
+        last = self._last
+        columns = self.columns if self.columns is not None else data.keys()
+        if last is None:
+            record = True
+        else:
+            record = False
+            for key in columns:
+                if key not in last or self._changed(key, data.get(key), last[key]):
+                    record = True
+                    break
+        if record:
+            self._last = {key: data.get(key) for key in columns}
+        return record
+
+    def reset(self) -> None:
+        self._last = None
+
+
+class DeadbandPolicy(ChangePolicy):
+    """
+    DeadbandPolicy
+    ---
+    Запись строки, только если хотя бы одно числовое значение отклонилось от последнего записанного
+    больше чем на зону нечувствительности. Нечисловые значения записываются при любом изменении.
+
+    Аргументы:
+        deadband: Number | dict[str, Number]    - Зона нечувствительности, общая или по столбцам
+                                                  (для столбцов, не заданных в словаре, - 0)
+        columns: list[str] | None = None        - Отслеживаемые столбцы, если None - все столбцы строки
+    """
+
+    def __init__(self, deadband: Number | dict[str, Number], columns: list[str] | None = None) -> None:
+        super().__init__(columns=columns)
+        self.deadband = deadband
+
+    def _changed(self, key: str, value: Any, last_value: Any) -> bool:
+        if isinstance(value, Number) and isinstance(last_value, Number):
+            deadband = self.deadband.get(key, 0) if isinstance(self.deadband, dict) else self.deadband
+            return abs(value - last_value) > deadband
+        return value != last_value
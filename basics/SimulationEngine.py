@@ -1,7 +1,14 @@
 import logging, os
+import pickle
+import random
 import warnings
+from numbers import Number
+from typing import Any, Callable
 
-from basics import FunctionalBlock, ControlSystem, Historizer
+import numpy as np
+
+from basics import FunctionalBlock, ControlSystem, Historizer, TickProfiler, EventTrace
+from basics.logger import make_queue_handler
 from datetime import datetime
 
 
@@ -14,6 +21,12 @@ class SimulationEngine:
 
     """
 
+    # Имена основных таблиц истории
+    SENSOR_DATA = "model_sensor_data"
+    CONTROL_ACTIONS = "control_actions"
+    MODEL_STATE = "model_state"
+    CONTROL_SYSTEM_STATE = "control_system_state"
+
     def __init__(self,
                  name: str = 'Test',
                  model: FunctionalBlock = None,
@@ -23,6 +36,12 @@ class SimulationEngine:
                  logger: logging.Logger | None = None,
                  logs_subfolder: str | None = 0,
                  results_subfolder: str | None = 0,
+                 capture: dict[str, list[str] | None] | None = None,
+                 control_period: float | None = None,
+                 profiler: TickProfiler | None = None,
+                 log_level: int | str | None = logging.DEBUG,
+                 log_queue: bool = False,
+                 event_trace: EventTrace | None = None,
                  *args,
                  **kwargs
                  ) -> None:
@@ -39,6 +58,21 @@ class SimulationEngine:
             logger: logging.Logger | None = None    - Логгер для дебага программы
             logs_subfolder: str | None = "/"        - Папка для сохранения логов внутри папки logs. Если None, то логи не сохраняются
             results_subfolder: str | None = "/",    - Папка для сохранения результатов внутри папки results. Если None, то результаты не сохраняются
+            capture: dict[str, list[str] | None] | None = None  - Какие таблицы и параметры записывать в историю.
+                                                      Ключи - имена таблиц: model_sensor_data, control_actions, model_state,
+                                                      control_system_state, имена контроллеров и эстиматоров.
+                                                      Значения - список параметров или None для всех параметров.
+                                                      Таблицы, не указанные в словаре, не собираются вовсе.
+                                                      Если None, записываются все таблицы целиком
+            control_period: float | None = None     - Период работы системы управления. Модель интегрируется с шагом tick_duration,
+                                                      а система управления вычисляется раз в control_period и между вычислениями
+                                                      держит управляющие воздействия. Если None - на каждом шаге
+            profiler: TickProfiler | None = None    - Профайлер времени фаз тика и вычисления блоков, None - без замеров
+            log_level: int | str | None = DEBUG     - Уровень логгера. Сообщения ниже уровня отбрасываются до форматирования,
+                                                      для быстрых запусков - logging.WARNING. None - уровень логгера не меняется
+            log_queue: bool = False                 - Записывать файлы логов в отдельном потоке (QueueHandler/QueueListener),
+                                                      поток останавливается в close_logging
+            event_trace: EventTrace | None = None   - Бинарный журнал событий супервизора (переключения, промахи областей)
         """
 
         self.name = name
@@ -49,26 +83,30 @@ class SimulationEngine:
         else:
             self.logger = logger
 
-        self.logger.info(f"Инициализация симуляции {self.name}")
+        self.logger.info("Инициализация симуляции %s", self.name)
 
         if logs_subfolder == 0:
-            self.logger.debug(f'Подпапка для сохранения логов не задана, будет использован путь logs/{self.name}')
+            self.logger.debug('Подпапка для сохранения логов не задана, будет использован путь logs/%s', self.name)
             logs_subfolder = f'/{self.name}'
         elif logs_subfolder is not None:
-            self.logger.debug(f'Путь для сохранения логов logs/{logs_subfolder}')
+            self.logger.debug('Путь для сохранения логов logs/%s', logs_subfolder)
         else:
             self.logger.info("Логи не будут сохранены в папку")
         self.logs_subfolder = logs_subfolder
 
         if results_subfolder == 0:
-            self.logger.debug(f'Подпапка для сохранения результатов не задана, будет использован путь results/{self.name}')
+            self.logger.debug('Подпапка для сохранения результатов не задана, будет использован путь results/%s', self.name)
             results_subfolder = f'/{self.name}'
         elif results_subfolder is not None:
-            self.logger.debug(f'Путь для сохранения результатов results/{results_subfolder}')
+            self.logger.debug('Путь для сохранения результатов results/%s', results_subfolder)
         else:
             self.logger.info("Результаты не будут сохранены в папку")
         self.results_subfolder = results_subfolder
 
+        self.log_level = log_level
+        self.log_queue = log_queue
+        self._log_handlers: list[logging.Handler] = []
+        self._log_listener = None
         self.set_logging(self.logger)
 
         if model is None:
@@ -93,17 +131,32 @@ class SimulationEngine:
             self.historizer.subfolder = results_subfolder
             self.logger.info("Система сбора данных инициализирована")
             self.historizer.create_folder(self.name)
-            self.logger.debug(f"Создана папка хранения истории {self.historizer.dir}")
+            self.logger.debug("Создана папка хранения истории %s", self.historizer.dir)
 
         try:
             assert float(tick_duration) > 0
             self.tick_duration = float(tick_duration)
-            self.logger.info(f"Задана величина шага симуляции {float(tick_duration)}")
+            self.logger.info("Задана величина шага симуляции %s", float(tick_duration))
         except:
             self.logger.error(f"Некорректная величина шага симуляции {tick_duration}")
             raise AttributeError("Некорректное значение шага симуляции")
 
         self.time = 0
+        self.ticks = 0  # Число выполненных тиков
+
+        self.capture = capture
+        self._capture_plan = None  # Строится один раз на первом тике
+        self._time_setters = None  # set_time наборов параметров блоков, строится на первом тике
+
+        if control_period is not None and control_period < self.tick_duration:
+            self.logger.error(f"Период системы управления {control_period} меньше шага симуляции {self.tick_duration}")
+            raise AttributeError("Период системы управления меньше шага симуляции")
+        self.control_period = control_period
+        self._control_elapsed = None  # Время с последнего вычисления системы управления, None - ещё не вычислялась
+        self._control_carry = 0  # Опоздание последнего вычисления относительно периода, переносится на следующий
+
+        self.set_profiler(profiler)
+        self.set_event_trace(event_trace)
 
     def run(self, simulation_time: float):
         """
@@ -115,7 +168,7 @@ class SimulationEngine:
             simulation_time:float     - Время на которое необходимо запустить математическое моделирование
         """
 
-        self.logger.info(f"Запуск симуляции {self.name} с времени {self.time} на период {simulation_time}")
+        self.logger.info("Запуск симуляции %s с времени %s на период %s", self.name, self.time, simulation_time)
         start_time = self.time
         #
         while self.time <= start_time + simulation_time:
@@ -137,44 +190,316 @@ class SimulationEngine:
             control_system_state: dict{name: value}     - Реальное состояние системы управления, используется для архива и аналитики, записаны все переменные
         """
 
-        self.logger.info(f"Обработка итерации симуляции для момента времени {self.time}")
+        self.logger.info("Обработка итерации симуляции для момента времени %s", self.time)
+        profiler = self.profiler
+        if profiler is not None:
+            tick_start = phase_start = profiler.start()
+        if self.event_trace is not None:
+            self.event_trace.set_clock(self.ticks, self.time)
+        if self._time_setters is None:
+            self._time_setters = self._build_time_setters()
+        for set_time in self._time_setters:
+            set_time(self.time)
 
         # Получаем данные с сенсоров модели за предыдущую итерацию
-        self.logger.debug(f"Собираем данные сенсоров для момента времени {self.time}")
+        self.logger.debug("Собираем данные сенсоров для момента времени %s", self.time)
         sensor_data = self.model.read_sensors()
+        if profiler is not None:
+            profiler.add("read_sensors", phase_start)
 
         # Передаём данные с сенсоров в систему управления, получаем управляющие воздействия
-        self.control_system.load_sensor_data(sensor_data)
-        self.control_system.compute(tick_duration=self.tick_duration)
-        self.logger.debug(f"Собираем управляющие воздействия для момента времени {self.time}")
+        control_duration = self._control_due()
+        if control_duration is not None:
+            if profiler is not None:
+                phase_start = profiler.start()
+            self.control_system.load_sensor_data(sensor_data)
+            if profiler is not None:
+                profiler.add("load_sensor_data", phase_start)
+            self.control_system.compute(tick_duration=control_duration)
+        else:
+            self.logger.debug("Система управления не вычисляется в момент времени %s, управление удерживается", self.time)
+        self.logger.debug("Собираем управляющие воздействия для момента времени %s", self.time)
         control_actions = self.control_system.read_control_actions()
 
+        if profiler is not None:
+            phase_start = profiler.start()
         self.model.load_variables(control_actions)
-
-        # Получаем реальное состояние модели и системы управления
-        self.logger.debug(f"Собираем реальное состояние физ. системы для момента времени {self.time}")
-        model_state = self.model.get_state()
-        self.logger.debug(f"Собираем реальное состояние системы управления для момента времени {self.time}")
-        control_system_state = self.control_system.get_state()
-        controllers_state = self.control_system.supervisor.controller_bank.get_state()
-        estimators_state = self.control_system.supervisor.estimator_bank.get_state()
+        if profiler is not None:
+            profiler.add("load_control_actions", phase_start)
+            phase_start = profiler.start()
+
+        # Получаем реальное состояние модели и системы управления, только для выбранных таблиц
+        self.logger.debug("Собираем состояние физ. системы и системы управления для момента времени %s", self.time)
+        if self._capture_plan is None:
+            self._capture_plan = self._build_capture_plan(self.capture)
+        history = {}
+        for table_name, block, keys in self._capture_plan:
+            if table_name == self.SENSOR_DATA:
+                data = sensor_data
+            elif table_name == self.CONTROL_ACTIONS:
+                data = control_actions
+            else:
+                history[table_name] = block.get_state(keys)
+                continue
+            history[table_name] = data if keys is None else {key: data[key] for key in keys if key in data}
+
+        if profiler is not None:
+            profiler.add("get_state", phase_start)
+            phase_start = profiler.start()
 
         # Записываем текущее состояние системы в модуль ведения истории
-        self.logger.debug(f"Записываем историю для момента времени {self.time}")
-        self.historizer.record(self.time, model_sensor_data=sensor_data, control_actions=control_actions,
-                               model_state=model_state, control_system_state=control_system_state,
-                               **controllers_state, **estimators_state) # TODO: Основное время тратится на этот шаг, оптимизировать
+        self.logger.debug("Записываем историю для момента времени %s", self.time)
+        self.historizer.record(self.time, **history)
+        if profiler is not None:
+            profiler.add("record", phase_start)
+            phase_start = profiler.start()
 
         # Записываем управляющие воздействия в модель, делаем шаг симуляции
-        self.logger.debug(f"Запускам шаг симуляции модели для момента времени {self.time}")
+        self.logger.debug("Запускам шаг симуляции модели для момента времени %s", self.time)
 
+        set_time = getattr(self.model.parameters, "set_time", None)
+        if set_time is not None:
+            set_time(self.time + self.tick_duration)  # Результаты шага модели относятся к концу шага
         self.model.compute(self.tick_duration)
+        if profiler is not None:
+            profiler.add("model_compute", phase_start)
+            profiler.add("tick", tick_start)
 
         # Двигаем время
         self.time += self.tick_duration
+        self.ticks += 1
+
+    def set_profiler(self, profiler: TickProfiler | None) -> None:
+        """
+        set_profiler
+        ---
+        Подключает профайлер к симуляции, системе управления и банкам супервизора, None - отключает замеры
+        """
+        self.profiler = profiler
+        self.control_system.profiler = profiler
+        supervisor = self.control_system.supervisor
+        supervisor.estimator_bank.profiler = profiler
+        supervisor.controller_bank.profiler = profiler
+
+    def set_event_trace(self, event_trace: EventTrace | None) -> None:
+        """
+        set_event_trace
+        ---
+        Подключает журнал событий к системе управления и эстиматорам, None - отключает
+        """
+        self.event_trace = event_trace
+        self.control_system.event_trace = event_trace
+        estimator_bank = self.control_system.supervisor.estimator_bank
+        for estimator_name in estimator_bank.get_names():
+            estimator_bank[estimator_name].event_trace = event_trace
+
+    CHECKPOINT_VERSION = 1
+
+    def snapshot(self) -> dict:
+        """
+        snapshot
+        ---
+        Полное изменяемое состояние симуляции: время, состояние модели и системы управления
+        (значения параметров, предыдущие значения, интегралы, выбор супервизора) и состояние генераторов
+        случайных чисел random и numpy.random. История в состояние не входит.
+        """
+        return {
+            "version": self.CHECKPOINT_VERSION,
+            "name": self.name,
+            "time": self.time,
+            "ticks": self.ticks,
+            "control_elapsed": self._control_elapsed,
+            "control_carry": self._control_carry,
+            "model": self.model.snapshot(),
+            "control_system": self.control_system.snapshot(),
+            "random_state": random.getstate(),
+            "numpy_random_state": np.random.get_state(),
+        }
+
+    def restore(self, state: dict) -> None:
+        """
+        restore
+        ---
+        Восстановление состояния из snapshot. Симуляция должна быть собрана из той же конфигурации блоков,
+        продолжение после восстановления совпадает с непрерывным запуском
+        """
+        if state.get("version") != self.CHECKPOINT_VERSION:
+            self.logger.error(f"Неподдерживаемая версия контрольной точки {state.get('version')}")
+            raise ValueError(f"Неподдерживаемая версия контрольной точки {state.get('version')}")
+        self.time = state["time"]
+        self.ticks = state["ticks"]
+        self._control_elapsed = state["control_elapsed"]
+        self._control_carry = state.get("control_carry", 0)
+        self.model.restore(state["model"])
+        self.control_system.restore(state["control_system"])
+        random.setstate(state["random_state"])
+        np.random.set_state(state["numpy_random_state"])
+        self.logger.info("Состояние симуляции %s восстановлено на момент времени %s", self.name, self.time)
+
+    def save_checkpoint(self, path: str) -> None:
+        """
+        save_checkpoint
+        ---
+        Сохраняет контрольную точку симуляции в бинарный файл path (pickle состояния snapshot).
+        Запись атомарная: сначала во временный файл, затем переименование, поэтому падение во время
+        сохранения не портит предыдущую контрольную точку.
+
+        Аргументы:
+            path: str       - Путь к файлу контрольной точки
+        """
+        if self.historizer is not None:
+            self.historizer.flush()  # Записи асинхронной очереди должны попасть в историю до контрольной точки
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as file:
+            pickle.dump(self.snapshot(), file, protocol=pickle.HIGHEST_PROTOCOL)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+        self.logger.info("Контрольная точка симуляции %s на момент времени %s сохранена в %s", self.name, self.time, path)
+
+    def load_checkpoint(self, path: str) -> None:
+        """
+        load_checkpoint
+        ---
+        Загружает контрольную точку из файла path, сохранённого save_checkpoint
+
+        Аргументы:
+            path: str       - Путь к файлу контрольной точки
+        """
+        with open(path, "rb") as file:
+            state = pickle.load(file)
+        self.restore(state)
+
+    def fork(self,
+             branches: list[dict[str, Any]] | int,
+             simulation_time: float,
+             apply: Callable[["SimulationEngine", dict[str, Any]], None] | None = None,
+             metrics: Callable[["SimulationEngine"], dict[str, Number]] | None = None,
+             seed: int | None = None,
+             keep_history: bool = False,
+             max_workers: int | None = None,
+             factory: Callable[[], "SimulationEngine"] | None = None) -> "EnsembleResult":
+        """
+        fork
+        ---
+        Ветвление симуляции: из текущего состояния запускается несколько вариантов продолжения
+        на время simulation_time, общий начальный участок не пересчитывается.
+        Каждая ветка начинается с одного и того же состояния (snapshot), получает свои изменения и пишет
+        свой хвост истории в отдельное хранилище (подпапка branch-XXXXX папки запуска).
+        По умолчанию ветки выполняются на пуле процессов с методом запуска fork: состояние передаётся
+        дочерним процессам копированием памяти при записи, без deepcopy и pickle симуляции.
+        Сама симуляция после ветвления остаётся в точке ветвления.
+
+        Аргументы:
+            branches: list[dict[str, Any]] | int                    - Изменения веток: {"блок.параметр": значение, "seed": seed}
+                                                                      или число веток без изменений (отличаются шумом)
+            simulation_time: float                                  - Время моделирования каждой ветки
+            apply: Callable[[SimulationEngine, dict], None] = None  - Применение изменений ветки к симуляции
+                                                                      (возмущения, замена контроллеров), по умолчанию -
+                                                                      запись значений параметров блоков
+            metrics: Callable[[SimulationEngine], dict] = None      - Скалярные метрики ветки, по умолчанию - конечное
+                                                                      состояние модели
+            seed: int | None = None                                 - Начальное значение для seed веток. None - для числа
+                                                                      веток seed берутся из энтропии системы (записываются
+                                                                      в столбец seed), для списка веток ветки продолжают
+                                                                      общее состояние генераторов случайных чисел
+            keep_history: bool = False                              - Возвращать ли хвост истории каждой ветки
+            max_workers: int | None = None                          - Число процессов, 1 - ветки по очереди в текущем процессе
+            factory: Callable[[], SimulationEngine] = None          - Сборка такой же симуляции для платформ без fork,
+                                                                      состояние восстанавливается из snapshot
+
+        Возвращает EnsembleResult с метриками по веткам (столбцы branch, seed, изменения ветки, метрики)
+        """
+        from basics.SimulationFork import fork_simulation  # SimulationFork сам зависит от SimulationEngine
+        return fork_simulation(self, branches, simulation_time, apply=apply, metrics=metrics, seed=seed,
+                               keep_history=keep_history, max_workers=max_workers, factory=factory)
+
+    def _control_due(self) -> float | None:
+        """
+        _control_due
+        ---
+        Проверяет, нужно ли вычислять систему управления на текущем шаге.
+        Возвращает время, прошедшее с её последнего вычисления, или None, если период ещё не истёк.
+        Опоздание относительно периода переносится на следующий интервал, поэтому при периоде, не кратном шагу,
+        средняя частота вычисления равна заданной.
+        """
+        if self.control_period is None:
+            return self.tick_duration
+        if self._control_elapsed is None:
+            self._control_elapsed = self.control_period
+        else:
+            self._control_elapsed += self.tick_duration
+        if self._control_elapsed + self._control_carry < self.control_period * (1 - 1e-9):  # Допуск на ошибку округления
+            return None
+        self._control_carry = min(self._control_elapsed + self._control_carry - self.control_period, self.control_period)
+        elapsed, self._control_elapsed = self._control_elapsed, 0
+        return elapsed
+
+    def _build_capture_plan(self, capture: dict[str, list[str] | None] | None) -> list[tuple[str, FunctionalBlock | None, list[str] | None]]:
+        """
+        _build_capture_plan
+        ---
+        Заранее собирает перечень таблиц истории в виде (имя таблицы, блок, ключи параметров),
+        чтобы на каждом тике не вызывать get_state для невыбранных блоков и не проверять ключи.
+        Для таблиц данных сенсоров и управляющих воздействий блок не нужен - данные уже есть в тике.
+        """
+        supervisor = self.control_system.supervisor
+        tables: dict[str, FunctionalBlock | None] = {
+            self.SENSOR_DATA: None,
+            self.CONTROL_ACTIONS: None,
+            self.MODEL_STATE: self.model,
+            self.CONTROL_SYSTEM_STATE: self.control_system,
+        }
+        for bank in (supervisor.controller_bank, supervisor.estimator_bank):
+            for block_name in bank.get_names():
+                tables[block_name] = bank[block_name]
+
+        if capture is None:
+            return [(table_name, block, None) for table_name, block in tables.items()]
+
+        unknown_tables = set(capture) - set(tables)
+        if unknown_tables:
+            self.logger.error(f"Для записи истории заданы неизвестные таблицы {sorted(unknown_tables)}")
+            raise KeyError(f"Неизвестные таблицы истории {sorted(unknown_tables)}")
+
+        plan = []
+        for table_name, block in tables.items():  # Порядок таблиц как при полной записи
+            if table_name not in capture:
+                continue
+            keys = capture[table_name]
+            if keys is not None and block is not None:
+                unknown_keys = set(keys) - set(block.parameters.params_dict) - set(block.STATE_KEYS)
+                if unknown_keys:
+                    self.logger.error(f"Для таблицы {table_name} заданы несуществующие параметры {sorted(unknown_keys)}")
+                    raise KeyError(f"Несуществующие параметры {sorted(unknown_keys)} для таблицы {table_name}")
+                keys = list(keys)
+            plan.append((table_name, block, keys))
+
+        self.logger.info("Таблицы для записи истории: %s", [table_name for table_name, _, _ in plan])
+        return plan
+
+    def _build_time_setters(self) -> list:
+        """
+        _build_time_setters
+        ---
+        Методы set_time наборов параметров модели и блоков системы управления: значения, записанные на тике,
+        получают отметку времени тика, по ним считаются интегралы и производные без постоянного шага.
+        Блоки без набора параметров и наборы без set_time пропускаются
+        """
+        supervisor = self.control_system.supervisor
+        blocks = [self.model, self.control_system, supervisor]
+        for bank in (supervisor.controller_bank, supervisor.estimator_bank):
+            blocks.extend(bank[block_name] for block_name in bank.get_names())
+        setters = []
+        for block in blocks:
+            set_time = getattr(getattr(block, "parameters", None), "set_time", None)
+            if set_time is not None:
+                setters.append(set_time)
+        return setters
 
     def set_logging(self, logger) -> None:
-        logger.setLevel(logging.DEBUG)
+        if self.log_level is not None:
+            logger.setLevel(self.log_level)
         if self.logs_subfolder is None:
             return
 
@@ -208,8 +533,30 @@ class SimulationEngine:
         # logger = logging.getLogger(__name__)
 
         # Добавляем обработчики
-        logger.addHandler(file_handler)
-        logger.addHandler(error_handler)
+        if self.log_queue:
+            # Запись в файлы выполняет отдельный поток, в тике остаётся только постановка записи в очередь
+            queue_handler, self._log_listener = make_queue_handler(file_handler, error_handler)
+            self._log_handlers = [queue_handler]
+        else:
+            self._log_handlers = [file_handler, error_handler]
+        for handler in self._log_handlers:
+            logger.addHandler(handler)
 
         return
 
+    def close_logging(self) -> None:
+        """
+        close_logging
+        ---
+        Дописывает очередь логов, останавливает поток записи и закрывает файлы логов этой симуляции
+        """
+        for handler in self._log_handlers:
+            self.logger.removeHandler(handler)
+            handler.close()
+        self._log_handlers = []
+        if self._log_listener is not None:
+            self._log_listener.stop()
+            for handler in self._log_listener.handlers:
+                handler.close()
+            self._log_listener = None
+
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from numbers import Number
+from typing import Any, Callable, TYPE_CHECKING
+
+import numpy as np
+
+from basics.SimulationEngine import SimulationEngine
+from basics.EnsembleRunner import EnsembleResult, aggregate_metrics, final_model_state, seed_everything
+from basics.ParameterSweep import apply_overrides
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Симуляция-источник ветвления и настройки веток. Задаётся в родительском процессе перед созданием пула
+# с методом запуска fork: дочерние процессы получают её через копирование памяти при записи, без pickle
+_FORK_SOURCE: tuple | None = None
+
+
+def apply_branch(engine: SimulationEngine, branch: dict[str, Any]) -> None:
+    """Изменения ветки по умолчанию: значения параметров блоков вида {"блок.параметр": значение}"""
+    apply_overrides(engine, {key: value for key, value in branch.items() if key != "seed"})
+
+
+def _run_branch(engine: SimulationEngine,
+                state: dict,
+                branch_index: int,
+                branch: dict[str, Any],
+                seed: int | None,
+                simulation_time: float,
+                apply: Callable[[SimulationEngine, dict[str, Any]], None],
+                metrics: Callable[[SimulationEngine], dict[str, Number]],
+                keep_history: bool) -> tuple[int, int | None, dict[str, Number], dict[str, pd.DataFrame] | None]:
+    """Одна ветка: восстановление общего состояния, изменения ветки, запуск с отдельным хвостом истории"""
+    engine.restore(state)
+    if seed is not None:
+        seed_everything(seed)
+    parent_historizer = engine.historizer
+    engine.historizer = parent_historizer.branch(f"branch-{branch_index:05d}")
+    try:
+        apply(engine, branch)
+        engine.run(simulation_time)
+        history = engine.historizer.records if keep_history else None
+        engine.historizer.save_history()
+        return branch_index, seed, metrics(engine), history
+    finally:
+        engine.historizer = parent_historizer
+
+
+def _fork_worker(branch_index: int, branch: dict[str, Any], seed: int | None):
+    """Ветка в дочернем процессе fork, симуляция и настройки берутся из унаследованной памяти"""
+    engine, state, simulation_time, apply, metrics, keep_history = _FORK_SOURCE
+    return _run_branch(engine, state, branch_index, branch, seed, simulation_time, apply, metrics, keep_history)
+
+
+def _factory_worker(factory: Callable[[], SimulationEngine],
+                    state: dict,
+                    branch_index: int,
+                    branch: dict[str, Any],
+                    seed: int | None,
+                    simulation_time: float,
+                    apply: Callable[[SimulationEngine, dict[str, Any]], None],
+                    metrics: Callable[[SimulationEngine], dict[str, Number]],
+                    keep_history: bool):
+    """Ветка в процессе без fork: симуляция собирается через factory и восстанавливается из состояния"""
+    engine = factory()
+    return _run_branch(engine, state, branch_index, branch, seed, simulation_time, apply, metrics, keep_history)
+
+
+def fork_simulation(engine: SimulationEngine,
+                    branches: list[dict[str, Any]] | int,
+                    simulation_time: float,
+                    apply: Callable[[SimulationEngine, dict[str, Any]], None] | None = None,
+                    metrics: Callable[[SimulationEngine], dict[str, Number]] | None = None,
+                    seed: int | None = None,
+                    keep_history: bool = False,
+                    max_workers: int | None = None,
+                    factory: Callable[[], SimulationEngine] | None = None) -> EnsembleResult:
+    """
+    fork_simulation
+    ---
+    Ветвление симуляции из текущего состояния, см. SimulationEngine.fork
+    """
+    import pandas as pd
+    global _FORK_SOURCE
+
+    noise_only = isinstance(branches, int)
+    if noise_only:
+        branches = [{} for _ in range(branches)]
+    if not branches:
+        raise ValueError("Не заданы ветки симуляции")
+    apply = apply if apply is not None else apply_branch
+    metrics = metrics if metrics is not None else final_model_state
+
+    seeds = [None] * len(branches)
+    if seed is not None or noise_only:
+        # Ветки без изменений отличаются только шумом, поэтому без seed им нужны разные seed из энтропии системы
+        sequence = np.random.SeedSequence(seed)
+        seeds = [int(child.generate_state(1, dtype=np.uint64)[0]) for child in sequence.spawn(len(branches))]
+    seeds = [branch.get("seed", branch_seed) for branch, branch_seed in zip(branches, seeds)]
+
+    engine.historizer.flush()
+    state = engine.snapshot()  # Только значения, без копирования блоков, логгеров и истории
+    engine.logger.info("Ветвление симуляции %s в момент времени %s на %s веток", engine.name, engine.time, len(branches))
+
+    if max_workers == 1:
+        try:
+            results = [_run_branch(engine, state, branch_index, branch, branch_seed,
+                                   simulation_time, apply, metrics, keep_history)
+                       for branch_index, (branch, branch_seed) in enumerate(zip(branches, seeds))]
+        finally:
+            engine.restore(state)  # Симуляция остаётся в точке ветвления
+    elif "fork" in multiprocessing.get_all_start_methods():
+        _FORK_SOURCE = (engine, state, simulation_time, apply, metrics, keep_history)
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers or os.cpu_count() or 1,
+                                     mp_context=multiprocessing.get_context("fork")) as executor:
+                results = list(executor.map(_fork_worker, range(len(branches)), branches, seeds))
+        finally:
+            _FORK_SOURCE = None
+    elif factory is not None:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_factory_worker, factory, state, branch_index, branch, branch_seed,
+                                       simulation_time, apply, metrics, keep_history)
+                       for branch_index, (branch, branch_seed) in enumerate(zip(branches, seeds))]
+            results = [future.result() for future in futures]
+    else:
+        engine.logger.error("Метод запуска процессов fork недоступен, для параллельных веток нужен factory")
+        raise ValueError("Метод запуска процессов fork недоступен, задайте factory или max_workers=1")
+
+    rows = [{"branch": branch_index, "seed": branch_seed,
+             **{key: value for key, value in branches[branch_index].items() if key != "seed"}, **values}
+            for branch_index, branch_seed, values, _ in results]
+    frame = pd.DataFrame(rows)
+    histories = [history for _, _, _, history in results] if keep_history else None
+    statistics = aggregate_metrics(frame, exclude=("branch", "seed", *{key for branch in branches for key in branch}))
+    return EnsembleResult(metrics=frame, statistics=statistics, histories=histories)
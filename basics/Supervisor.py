@@ -1,7 +1,8 @@
 import logging
 
 from numbers import Number
-import copy
+
+import numpy as np
 
 from basics import FunctionalBlock, FunctionalBlockBank, Estimator
 
@@ -12,8 +13,28 @@ class Supervisor:
                  name: str = "",
                  controllers: list[FunctionalBlock] = None,
                  estimators: list[Estimator] = None,
+                 estimator_periods: Number | dict[str, Number] | None = None,
+                 controller_periods: Number | dict[str, Number] | None = None,
+                 dirty_tracking: bool = False,
+                 dirty_tolerance: Number = 0,
                  *args,
                  **kwargs):
+        """
+        __init__
+        ---
+        Аргументы:
+            logger: logging.Logger                                  - Логгер для записи логов в файл и консоль
+            name: str = ""                                          - Имя супервизора
+            controllers: list[FunctionalBlock] = None               - Набор контроллеров
+            estimators: list[Estimator] = None                      - Набор эстиматоров
+            estimator_periods: Number | dict[str, Number] = None    - Период вычисления эстиматоров: общий или по именам блоков.
+                                                                      Между вычислениями блок держит свои выходы.
+                                                                      None или блок не указан в словаре - вычисляется каждый раз
+            controller_periods: Number | dict[str, Number] = None   - Период вычисления контроллеров, аналогично estimator_periods
+            dirty_tracking: bool = False                            - Пропускать вычисление блоков с неизменившимися входами
+                                                                      (см. FunctionalBlockBank)
+            dirty_tolerance: Number = 0                             - Допуск для сравнения входов при dirty_tracking
+        """
 
         self.logger = logger
 
@@ -21,15 +42,16 @@ class Supervisor:
             self.logger.warning(f"Не задано имя супервизора")
         self.name = name
 
-        self.logger.info(f"Инициализация супервизора {name}")
-        self.logger.debug(f"Банк контроллеров: {controllers}")
-        self.logger.debug(f"Банк эстиматоров: {estimators}")
+        self.logger.info("Инициализация супервизора %s", name)
+        self.logger.debug("Банк контроллеров: %s", controllers)
+        self.logger.debug("Банк эстиматоров: %s", estimators)
 
         if controllers is None:
             self.logger.error(f"Не задан банк контроллеров для супервизора {self.name}")
         else:
             # Загружаем банк контроллеров
-            self.controller_bank = FunctionalBlockBank(logger=logger, model_set=controllers, name="Controller bank")
+            self.controller_bank = FunctionalBlockBank(logger=logger, model_set=controllers, name="Controller bank",
+                                                       dirty_tracking=dirty_tracking, tolerance=dirty_tolerance)
 
         if estimators is None:
             self.logger.error(f"Не задан банк эстиматоров для супервизора {self.name}")
@@ -38,7 +60,8 @@ class Supervisor:
             for estimator in estimators:
                 estimator.update_controllers(self.controller_bank)
             # Загружаем банк эстиматоров
-            self.estimator_bank = FunctionalBlockBank(logger=logger, model_set=estimators, name="Estimator bank")
+            self.estimator_bank = FunctionalBlockBank(logger=logger, model_set=estimators, name="Estimator bank",
+                                                      dirty_tracking=dirty_tracking, tolerance=dirty_tolerance)
 
         self.last_switch: Number = None  # TODO: Точно ли супервайзеру нужно это знать?
         self.current_controller: str = None
@@ -47,12 +70,31 @@ class Supervisor:
         self.estimators_backup = None
         self.controllers_backup = None
 
+        # Многочастотное выполнение: периоды блоков и время, накопленное с их последнего вычисления
+        self.estimator_periods = estimator_periods
+        self.controller_periods = controller_periods
+        self._estimators_elapsed: dict[str, Number] = {}
+        self._controllers_elapsed: dict[str, Number] = {}
+        # Перенос: насколько позже периода блок вычислился в последний раз, сохраняет среднюю частоту блока
+        self._estimators_carry: dict[str, Number] = {}
+        self._controllers_carry: dict[str, Number] = {}
+        self.computed_estimators: list[str] = []  # Блоки, вычисленные при последнем вызове compute_estimators
+        self.computed_controllers: list[str] = []  # Блоки, вычисленные при последнем вызове compute_controllers
+
     def choose_controller(self) -> None:
         raise NotImplementedError
 
     def chose_estimator(self) -> None:
         raise NotImplementedError
 
+    def choose_controller_batch(self, estimator_states: dict[str, tuple[np.ndarray, dict[str, int]]]) -> np.ndarray:
+        """
+        Векторизованный выбор контроллера для ансамбля из N копий системы управления.
+        estimator_states - состояние эстиматоров в виде {имя: (значения формы (N, число параметров), номера столбцов)}.
+        Должен вернуть массив формы (N,) с номерами контроллеров в controller_bank.get_names().
+        """
+        raise NotImplementedError(f"Векторизованный выбор контроллера не реализован для супервизора {self.name}")
+
     def compute_estimators(self,
                            tick_duration: Number | dict[str, Number],
                            names: list[str] | None = None,
@@ -60,8 +102,13 @@ class Supervisor:
                            save_backup: bool = False) -> None:
 
         if save_backup:
-            self.estimators_backup = copy.deepcopy(self.estimator_bank)
+            self.estimators_backup = self.estimator_bank.snapshot()
+        if self.estimator_periods is not None and isinstance(tick_duration, Number):
+            tick_duration = self._due_blocks(self.estimator_bank, self.estimator_periods,
+                                             self._estimators_elapsed, self._estimators_carry, tick_duration, names)
+            names = list(tick_duration.keys())
         self.estimator_bank.compute(tick_duration, names, time_for_not_specified)
+        self.computed_estimators = self.estimator_bank.last_computed
 
     def compute_controllers(self,
                            tick_duration: Number | dict[str, Number],
@@ -70,20 +117,94 @@ class Supervisor:
                             save_backup: bool = False) -> None:
 
         if save_backup:
-            self.controllers_backup = copy.deepcopy(self.controller_bank)
+            self.controllers_backup = self.controller_bank.snapshot()
+        if self.controller_periods is not None and isinstance(tick_duration, Number):
+            tick_duration = self._due_blocks(self.controller_bank, self.controller_periods,
+                                             self._controllers_elapsed, self._controllers_carry, tick_duration, names)
+            names = list(tick_duration.keys())
         self.controller_bank.compute(tick_duration, names, time_for_not_specified)
+        self.computed_controllers = self.controller_bank.last_computed
+
+    def _due_blocks(self,
+                    bank: FunctionalBlockBank,
+                    periods: Number | dict[str, Number],
+                    elapsed: dict[str, Number],
+                    carry: dict[str, Number],
+                    tick_duration: Number,
+                    names: list[str] | None = None) -> dict[str, Number]:
+        """
+        _due_blocks
+        ---
+        Планирование многочастотного выполнения банка: накапливает время tick_duration для каждого блока
+        и возвращает блоки, у которых истёк период, в виде {имя: время с прошлого вычисления}.
+        Этот словарь передаётся в FunctionalBlockBank.compute как индивидуальные периоды блоков.
+        При первом вызове блок вычисляется сразу на свой период.
+        Если период не кратен шагу, опоздание относительно периода переносится на следующий интервал (carry),
+        поэтому средняя частота вычисления блока равна заданной.
+        """
+        due = {}
+        for block_name in (names if names is not None else bank.get_names()):
+            period = periods.get(block_name) if isinstance(periods, dict) else periods
+            if period is None:
+                due[block_name] = tick_duration
+                continue
+            block_elapsed = elapsed.get(block_name)
+            block_elapsed = period if block_elapsed is None else block_elapsed + tick_duration
+            block_carry = carry.get(block_name, 0)
+            if block_elapsed + block_carry >= period * (1 - 1e-9):  # Допуск на накопление ошибки округления
+                due[block_name] = block_elapsed
+                carry[block_name] = min(block_elapsed + block_carry - period, period)
+                block_elapsed = 0
+            elapsed[block_name] = block_elapsed
+        self.logger.debug("Блоки банка %s к вычислению на этом шаге: %s", bank.name, due)
+        return due
+
+    def tracking_stats(self) -> dict[str, dict[str, int]]:
+        """Счётчики вычисленных и пропущенных из-за неизменных входов блоков по банкам"""
+        return {"estimators": dict(self.estimator_bank.tracking_stats),
+                "controllers": dict(self.controller_bank.tracking_stats)}
+
+    def snapshot(self) -> dict:
+        """Состояние супервизора: выбор эстиматора и контроллера, расписание и состояние банков"""
+        return {
+            "current_controller": self.current_controller,
+            "current_estimator": self.current_estimator,
+            "last_switch": self.last_switch,
+            "estimators_elapsed": dict(self._estimators_elapsed),
+            "controllers_elapsed": dict(self._controllers_elapsed),
+            "estimators_carry": dict(self._estimators_carry),
+            "controllers_carry": dict(self._controllers_carry),
+            "computed_estimators": list(self.computed_estimators),
+            "computed_controllers": list(self.computed_controllers),
+            "estimator_bank": self.estimator_bank.snapshot(),
+            "controller_bank": self.controller_bank.snapshot(),
+        }
+
+    def restore(self, state: dict) -> None:
+        """Восстановление состояния супервизора из snapshot"""
+        self.current_controller = state["current_controller"]
+        self.current_estimator = state["current_estimator"]
+        self.last_switch = state["last_switch"]
+        self._estimators_elapsed = dict(state["estimators_elapsed"])
+        self._controllers_elapsed = dict(state["controllers_elapsed"])
+        self._estimators_carry = dict(state.get("estimators_carry", {}))
+        self._controllers_carry = dict(state.get("controllers_carry", {}))
+        self.computed_estimators = list(state["computed_estimators"])
+        self.computed_controllers = list(state["computed_controllers"])
+        self.estimator_bank.restore(state["estimator_bank"])
+        self.controller_bank.restore(state["controller_bank"])
 
     def revert_estimators(self) -> None:
         if self.estimators_backup is None:
             self.logger.warning(f"Попытка вернуть бэкап эстиматоров, но он пуст, супервизор {self.name}")
         else:
-            self.estimator_bank = copy.deepcopy(self.estimators_backup)
+            self.estimator_bank.restore(self.estimators_backup)
 
     def revert_controllers(self) -> None:
         if self.controllers_backup is None:
             self.logger.warning(f"Попытка вернуть бэкап контроллеров, но он пуст, супервизор {self.name}")
         else:
-            self.controller_bank = copy.deepcopy(self.controllers_backup)
+            self.controller_bank.restore(self.controllers_backup)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import time
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+class TickProfiler:
+    """
+    TickProfiler
+    ---
+    Сбор времени выполнения фаз тика симуляции и вычисления отдельных блоков банков.
+    Подключается через SimulationEngine(profiler=TickProfiler()). Без профайлера в горячем цикле
+    остаётся только проверка profiler is None на каждую фазу.
+
+    Фазы тика SimulationEngine:
+        read_sensors            - Чтение сенсоров модели
+        load_sensor_data        - Загрузка данных сенсоров в банки эстиматоров и контроллеров
+        compute_estimators      - Вычисление банка эстиматоров
+        choose_estimator        - Выбор эстиматора супервизором
+        compute_controllers     - Вычисление банка контроллеров
+        choose_controller       - Выбор контроллера супервизором
+        compute_control_actions - Вычисление управляющих воздействий выбранного контроллера
+        load_control_actions    - Загрузка управляющих воздействий в модель
+        get_state               - Сбор состояния блоков для истории
+        record                  - Запись истории
+        model_compute           - Шаг модели
+        tick                    - Тик целиком
+    """
+
+    PHASES = ("read_sensors", "load_sensor_data", "compute_estimators", "choose_estimator", "compute_controllers",
+              "choose_controller", "compute_control_actions", "load_control_actions", "get_state", "record", "model_compute", "tick")
+
+    def __init__(self) -> None:
+        # Накопленная статистика: {фаза: [число вызовов, суммарное время, максимальное время]}
+        self.phases: dict[str, list] = {}
+        self.blocks: dict[str, dict[str, list]] = {}
+
+    @staticmethod
+    def start() -> float:
+        return time.perf_counter()
+
+    def add(self, phase: str, start: float) -> None:
+        """Добавляет к фазе phase время, прошедшее с момента start"""
+        elapsed = time.perf_counter() - start
+        stats = self.phases.get(phase)
+        if stats is None:
+            self.phases[phase] = [1, elapsed, elapsed]
+            return
+        stats[0] += 1
+        stats[1] += elapsed
+        if elapsed > stats[2]:
+            stats[2] = elapsed
+
+    def add_block(self, bank_name: str, block_name: str, start: float) -> None:
+        """Добавляет время вычисления блока block_name банка bank_name, прошедшее с момента start"""
+        elapsed = time.perf_counter() - start
+        bank = self.blocks.setdefault(bank_name, {})
+        stats = bank.get(block_name)
+        if stats is None:
+            bank[block_name] = [1, elapsed, elapsed]
+            return
+        stats[0] += 1
+        stats[1] += elapsed
+        if elapsed > stats[2]:
+            stats[2] = elapsed
+
+    def reset(self) -> None:
+        self.phases = {}
+        self.blocks = {}
+
+    @staticmethod
+    def _describe(stats: list, total: float) -> dict[str, float]:
+        count, elapsed, maximum = stats
+        return {"count": count, "total": elapsed, "mean": elapsed / count, "max": maximum,
+                "share": elapsed / total if total > 0 else 0.0}
+
+    def summary(self) -> dict[str, dict]:
+        """
+        summary
+        ---
+        Сводка в виде {"phases": {фаза: статистика}, "blocks": {банк: {блок: статистика}}}.
+        Статистика: count, total, mean, max в секундах и share - доля от суммарного времени тиков
+        """
+        total = self.phases["tick"][1] if "tick" in self.phases else sum(stats[1] for stats in self.phases.values())
+        phases = {phase: self._describe(self.phases[phase], total)
+                  for phase in sorted(self.phases, key=lambda name: self.PHASES.index(name)
+                                      if name in self.PHASES else len(self.PHASES))}
+        blocks = {bank_name: {block_name: self._describe(stats, total) for block_name, stats in bank.items()}
+                  for bank_name, bank in self.blocks.items()}
+        return {"phases": phases, "blocks": blocks}
+
+    def to_frame(self) -> pd.DataFrame:
+        """Сводка в виде таблицы: строка на фазу и на блок банка (столбцы group, name и статистика)"""
+        import pandas as pd
+        summary = self.summary()
+        rows = [{"group": "phase", "name": phase, **stats} for phase, stats in summary["phases"].items()]
+        for bank_name, bank in summary["blocks"].items():
+            rows += [{"group": bank_name, "name": block_name, **stats} for block_name, stats in bank.items()]
+        return pd.DataFrame(rows, columns=["group", "name", "count", "total", "mean", "max", "share"])
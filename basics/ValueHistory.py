@@ -0,0 +1,324 @@
+from numbers import Number
+from typing import Iterable
+
+import numpy as np
+
+NAN = float("nan")
+
+INTEGRATION_METHODS = ("trapezoid", "simpson")
+
+
+def step_intervals(times: np.ndarray, dt: Number | None) -> np.ndarray:
+    """
+    Шаги по времени между соседними значениями строк (значения новые - первыми): dt для всех шагов, если задан,
+    иначе разности отметок времени times. Для последнего шага отметки времени обязательны
+    """
+    if dt is not None:
+        return np.full((times.shape[0], times.shape[1] - 1), dt, dtype=np.float64)
+    intervals = times[:, :-1] - times[:, 1:]
+    if np.isnan(intervals[:, 0]).any():
+        raise ValueError("Не у всех значений есть отметки времени, задайте шаг dt")
+    return intervals
+
+
+def step_integrals(values: np.ndarray, intervals: np.ndarray, method: str = "trapezoid") -> np.ndarray:
+    """
+    step_integrals
+    ---
+    Интеграл на последнем шаге для строк values (значения новые - первыми, не меньше 2 столбцов)
+
+    trapezoid - метод трапеций, simpson - интеграл параболы по трём последним значениям (для шага dt
+    dt / 12 * (5 f0 + 8 f1 - f2)), строки без третьего значения (NaN) считаются методом трапеций
+
+    Аргументы:
+        values: np.ndarray          - Значения формы (N, k), новые - первыми
+        intervals: np.ndarray       - Шаги по времени формы (N, k - 1), intervals[:, j] = t_j - t_{j+1}
+        method: str = "trapezoid"   - Метод интегрирования из INTEGRATION_METHODS
+    """
+    h2 = intervals[:, 0]
+    trapezoid = (values[:, 0] + values[:, 1]) * h2 / 2
+    if method == "trapezoid" or values.shape[1] < 3:
+        return trapezoid
+    if method != "simpson":
+        raise ValueError(f"Неизвестный метод интегрирования {method}, доступны {INTEGRATION_METHODS}")
+    h1 = intervals[:, 1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        parabola = (-h2 ** 3 / (6 * h1 * (h1 + h2)) * values[:, 2]
+                    + h2 * (h2 + 3 * h1) / (6 * h1) * values[:, 1]
+                    + h2 * (2 * h2 + 3 * h1) / (6 * (h1 + h2)) * values[:, 0])
+    return np.where(np.isnan(values[:, 2]) | np.isnan(h1), trapezoid, parabola)
+
+
+def derivatives(values: np.ndarray, intervals: np.ndarray, order: int = 1) -> np.ndarray:
+    """
+    derivatives
+    ---
+    Производная в момент последнего значения для строк values: order=1 - разность назад,
+    order=2 - по параболе через три последних значения (для шага dt (3 f0 - 4 f1 + f2) / (2 dt)),
+    строки без третьего значения (NaN) считаются разностью назад
+    """
+    h2 = intervals[:, 0]
+    backward = (values[:, 0] - values[:, 1]) / h2
+    if order == 1 or values.shape[1] < 3:
+        return backward
+    if order != 2:
+        raise ValueError(f"Поддерживается порядок производной 1 или 2, получено {order}")
+    h1 = intervals[:, 1]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        parabola = (h2 / (h1 * (h1 + h2)) * values[:, 2]
+                    - (h1 + h2) / (h1 * h2) * values[:, 1]
+                    + (h1 + 2 * h2) / (h2 * (h1 + h2)) * values[:, 0])
+    return np.where(np.isnan(values[:, 2]) | np.isnan(h1), backward, parabola)
+
+
+def window_integral(values: np.ndarray, intervals: np.ndarray, method: str = "trapezoid") -> Number:
+    """
+    window_integral
+    ---
+    Интеграл по всем шагам между значениями values (одномерный массив, новые - первыми).
+    simpson - составная формула Симпсона для неравных шагов по парам шагов от самого старого значения,
+    при нечётном числе шагов последний шаг считается по параболе через три последних значения
+    """
+    if len(values) < 2:
+        return 0.0
+    if method == "trapezoid":
+        return float(np.sum((values[:-1] + values[1:]) * intervals / 2))
+    if method != "simpson":
+        raise ValueError(f"Неизвестный метод интегрирования {method}, доступны {INTEGRATION_METHODS}")
+    f = values[::-1]  # Старые - первыми
+    h = intervals[::-1]
+    pairs = len(h) // 2
+    h0, h1 = h[0:2 * pairs:2], h[1:2 * pairs:2]
+    total = np.sum((h0 + h1) / 6 * ((2 - h1 / h0) * f[0:2 * pairs:2]
+                                    + (h0 + h1) ** 2 / (h0 * h1) * f[1:2 * pairs + 1:2]
+                                    + (2 - h0 / h1) * f[2:2 * pairs + 1:2]))
+    if len(h) % 2:
+        last = step_integrals(values[None, :3], intervals[None, :2], "simpson" if len(h) > 1 else "trapezoid")
+        total += last[0]
+    return float(total)
+
+
+class HistoryClock:
+    """
+    HistoryClock
+    ---
+    Текущее время для отметок времени в истории значений параметров набора, задаётся через ParameterSet.set_time
+    """
+
+    def __init__(self, time: Number | None = None) -> None:
+        self.time = time
+
+
+class ValueHistory:
+    """
+    ValueHistory
+    ---
+    Кольцевой буфер с предыдущими значениями параметра и отметками времени их записи.
+    Заменяет deque в Parameter.previous_values и ведёт себя как последовательность значений,
+    начиная с последнего: len, индексация, итерация, list(...). Запись - O(1) без NumPy, массивы NumPy
+    строятся только для расчёта интегралов и производных (values, times, gather_last).
+
+    Поддерживает текущие суммы значений и площадей трапеций между значениями с отметками времени,
+    поэтому интеграл методом трапеций по всему окну буфера считается за O(1). Для устойчивости
+    суммы периодически пересчитываются заново.
+
+    Аргументы:
+        depth: int = 2                                  - Глубина истории, хранится depth + 1 значение, как в deque(maxlen=depth + 1)
+        values: Iterable[Number] | None = None          - Начальные значения, начиная с последнего
+        times: Iterable[Number | None] | None = None    - Отметки времени начальных значений
+    """
+
+    RESUM_PERIOD = 64  # Пересчёт текущих сумм через RESUM_PERIOD заполнений буфера
+
+    def __init__(self, depth: int = 2, values: Iterable[Number] | None = None,
+                 times: Iterable[Number | None] | None = None) -> None:
+        self.depth = depth
+        self.capacity = depth + 1
+        self._values = [0.0] * self.capacity  # Значения в том виде, в каком записаны
+        self._numbers = [0.0] * self.capacity  # Те же значения, приведённые к float, для сумм и расчётов
+        self._times = [NAN] * self.capacity
+        self._segments = [0.0] * self.capacity  # Площадь трапеции между значением в ячейке и предыдущим
+        self._position = -1
+        self._count = 0
+        self._value_sum = 0.0
+        self._segment_sum = 0.0
+        self._untimed = 0  # Число шагов в окне без отметок времени
+        self._appends = 0
+        if values is not None:
+            values = list(values)
+            times = [None] * len(values) if times is None else list(times)
+            for value, time in zip(reversed(values[:self.capacity]), reversed(times[:self.capacity])):
+                self.append(value, time)
+
+    def append(self, value: Number, time: Number | None = None) -> None:
+        """Запись нового значения с отметкой времени time (None или NaN - без отметки).
+        Значение хранится как есть, для текущих сумм оно приводится к float (комплексные - без приведения)"""
+        number = value if isinstance(value, (float, complex)) else float(value)
+        time = NAN if time is None else float(time)
+        capacity = self.capacity
+        values, times, segments = self._values, self._times, self._segments
+        slot = self._position + 1
+        if slot == capacity:
+            slot = 0
+        if self._count == capacity:
+            # Вытесняется самое старое значение и шаг от него к следующему
+            self._value_sum -= self._numbers[slot]
+            if capacity > 1:
+                following = slot + 1 if slot + 1 < capacity else 0
+                if times[following] != times[following] or times[slot] != times[slot]:  # NaN - нет отметки времени
+                    self._untimed -= 1
+                else:
+                    self._segment_sum -= segments[following]
+                segments[following] = 0.0
+        segment = 0.0
+        if self._count and capacity > 1:
+            previous_time = times[self._position]
+            if time != time or previous_time != previous_time:
+                self._untimed += 1
+            else:
+                segment = (number + self._numbers[self._position]) * (time - previous_time) / 2
+                self._segment_sum += segment
+        values[slot] = value
+        self._numbers[slot] = number
+        times[slot] = time
+        segments[slot] = segment
+        self._value_sum += number
+        self._position = slot
+        if self._count < capacity:
+            self._count += 1
+        self._appends += 1
+        if self._appends >= self.RESUM_PERIOD * capacity:
+            self._resum()
+
+    def _resum(self) -> None:
+        """Точный пересчёт текущих сумм, накопленная ошибка округления сбрасывается"""
+        self._appends = 0
+        slots = self._slots(self._count)
+        self._value_sum = sum(self._numbers[slot] for slot in slots) if self._count else 0.0
+        self._segment_sum = 0.0
+        self._untimed = 0
+        for newer, older in zip(slots[:-1], slots[1:]):  # Шаг хранится в ячейке более нового значения
+            if self._times[newer] != self._times[newer] or self._times[older] != self._times[older]:
+                self._untimed += 1
+            else:
+                self._segment_sum += self._segments[newer]
+
+    def _slots(self, count: int) -> list[int]:
+        """Номера ячеек count последних значений, начиная с последнего"""
+        return [(self._position - i) % self.capacity for i in range(count)]
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return self.tolist()[item]
+        if item < 0:
+            item += self._count
+        if not 0 <= item < self._count:
+            raise IndexError("Индекс вне истории значений")
+        return self._values[(self._position - item) % self.capacity]
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def __reversed__(self):
+        return reversed(self.tolist())
+
+    def __repr__(self):
+        return f"ValueHistory({self.tolist()})"
+
+    def tolist(self) -> list[Number]:
+        """Значения, начиная с последнего"""
+        return [self._values[slot] for slot in self._slots(self._count)]
+
+    def values(self, count: int | None = None) -> np.ndarray:
+        """count последних значений (по умолчанию все), начиная с последнего, в виде массива float для расчётов"""
+        slots = self._slots(self._count if count is None else min(count, self._count))
+        return np.array([self._numbers[slot] for slot in slots])
+
+    def times(self, count: int | None = None) -> np.ndarray:
+        """Отметки времени count последних значений, NaN - значение записано без отметки"""
+        slots = self._slots(self._count if count is None else min(count, self._count))
+        return np.array([self._times[slot] for slot in slots], dtype=np.float64)
+
+    def copy(self) -> "ValueHistory":
+        res = ValueHistory.__new__(ValueHistory)
+        res.__dict__.update(self.__dict__)
+        res._values = self._values.copy()
+        res._numbers = self._numbers.copy()
+        res._times = self._times.copy()
+        res._segments = self._segments.copy()
+        return res
+
+    def resize(self, depth: int) -> "ValueHistory":
+        """Копия истории с другой глубиной, сохраняются последние значения"""
+        return ValueHistory(depth, self.tolist(), self.times().tolist())
+
+    def clear(self) -> None:
+        self.__init__(self.depth)
+
+    def step_integral(self, dt: Number | None = None, method: str = "trapezoid") -> Number:
+        """Интеграл на последнем шаге, см. step_integrals. dt=None - шаги по отметкам времени"""
+        if self._count < 2:
+            raise ValueError("Для интеграла на шаге нужно не меньше двух значений")
+        if method == "trapezoid":  # Без массивов NumPy, та же формула, что в step_integrals
+            newest, previous = self._position, (self._position - 1) % self.capacity
+            interval = dt if dt is not None else self._times[newest] - self._times[previous]
+            if interval != interval:
+                raise ValueError("Не у всех значений есть отметки времени, задайте шаг dt")
+            return (self._numbers[newest] + self._numbers[previous]) * interval / 2
+        values, times = gather_last([self], 3 if method == "simpson" else 2)
+        return step_integrals(values, step_intervals(times, dt), method)[0].item()
+
+    def window_integral(self, dt: Number | None = None, steps: int | None = None, method: str = "trapezoid") -> Number:
+        """
+        window_integral
+        ---
+        Интеграл по steps последним шагам (по умолчанию по всем шагам в буфере), см. window_integral.
+        Метод трапеций по всему буферу считается за O(1) по текущим суммам
+
+        Аргументы:
+            dt: Number | None = None        - Постоянный шаг, None - шаги по отметкам времени
+            steps: int | None = None        - Число последних шагов
+            method: str = "trapezoid"       - Метод интегрирования из INTEGRATION_METHODS
+        """
+        available = self._count - 1
+        if available < 1:
+            return 0.0
+        if method == "trapezoid" and (steps is None or steps >= available):
+            if dt is None:
+                if self._untimed:
+                    raise ValueError("Не у всех значений есть отметки времени, задайте шаг dt")
+                return self._segment_sum
+            newest = self._numbers[self._position]
+            oldest = self._numbers[(self._position - available) % self.capacity]
+            return dt * (self._value_sum - (newest + oldest) / 2)
+        count = self._count if steps is None else min(steps + 1, self._count)
+        intervals = step_intervals(self.times(count)[None, :], dt)[0]
+        if np.isnan(intervals).any():
+            raise ValueError("Не у всех значений есть отметки времени, задайте шаг dt")
+        return window_integral(self.values(count), intervals, method)
+
+    def derivative(self, dt: Number | None = None, order: int = 1) -> Number:
+        """Производная в момент последнего значения, см. derivatives. dt=None - шаги по отметкам времени"""
+        if self._count < 2:
+            raise ValueError("Для производной нужно не меньше двух значений")
+        values, times = gather_last([self], order + 1)
+        return derivatives(values, step_intervals(times, dt), order)[0].item()
+
+
+def gather_last(histories: list[ValueHistory], count: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    gather_last
+    ---
+    Последние count значений и отметок времени нескольких историй в виде массивов (N, count), новые - первыми,
+    недостающие значения - NaN. Используется для пакетного расчёта интегралов и производных набора параметров
+    """
+    rows = [history._slots(min(count, history._count)) for history in histories]
+    padding = [NAN] * count
+    values = np.array([([history._numbers[slot] for slot in slots] + padding)[:count]
+                       for history, slots in zip(histories, rows)]).reshape(len(histories), count)
+    times = np.array([([history._times[slot] for slot in slots] + padding)[:count]
+                      for history, slots in zip(histories, rows)], dtype=np.float64).reshape(len(histories), count)
+    return values, times
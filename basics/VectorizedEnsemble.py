@@ -0,0 +1,247 @@
+import random
+from numbers import Number
+from typing import Any, Callable
+
+import numpy as np
+
+from basics.FunctionalBlock import FunctionalBlock
+from basics.ControlSystem import ControlSystem
+
+
+class BatchBlock:
+    """
+    BatchBlock
+    ---
+    Состояние N копий функционального блока в одном массиве формы (N, число параметров).
+    Начальные значения берутся из параметров блока-шаблона, сам шаблон не изменяется.
+
+    Аргументы:
+        block: FunctionalBlock      - Блок-шаблон, его compute_batch выполняет расчёт
+        n: int                      - Число копий
+    """
+
+    def __init__(self, block: FunctionalBlock, n: int) -> None:
+        self.block = block
+        self.name = block.name
+        params = block.parameters.params_dict
+        self.keys = list(params.keys())
+        self.index = {key: position for position, key in enumerate(self.keys)}
+
+        initial = []
+        for key in self.keys:
+            value = params[key].value
+            if not isinstance(value, Number):
+                raise TypeError(f"Параметр {key} блока {self.name} не числовой, векторизация невозможна")
+            initial.append(float(value))
+        self.values = np.tile(np.array(initial, dtype=np.float64), (n, 1))
+
+        self.min_values = np.array([-np.inf if params[key].min_value is None else params[key].min_value
+                                    for key in self.keys])
+        self.max_values = np.array([np.inf if params[key].max_value is None else params[key].max_value
+                                    for key in self.keys])
+        self.variables = [key for key in block.variables if key in self.index]
+
+        # Зависимые параметры в порядке пересчёта: (столбец, формула, столбцы зависимостей)
+        self.derived = []
+        for key in block.parameters.order:
+            param = params[key]
+            if getattr(param, "formula_func", None) is not None:  # DerivedParameter или его представление в ArrayParameterSet
+                self.derived.append((self.index[key], param.formula_func,
+                                     [self.index[dependency] for dependency in param.dependencies]))
+
+    def column(self, key: str) -> np.ndarray:
+        return self.values[:, self.index[key]]
+
+    def load(self, data: dict[str, np.ndarray]) -> None:
+        """Векторизованный load_variables: запись входных переменных, пересчёт зависимых и проверка границ"""
+        for key in self.variables:
+            if key in data:
+                self.values[:, self.index[key]] = data[key]
+        self.update_derived()
+
+    def update_derived(self) -> None:
+        values = self.values
+        for column, formula, dependencies in self.derived:
+            values[:, column] = formula(*(values[:, dependency] for dependency in dependencies))
+        self.validate()
+
+    def validate(self) -> None:
+        """Векторизованный validate: проверка границ всех параметров всех копий"""
+        below = self.values < self.min_values
+        above = self.values > self.max_values
+        if below.any() or above.any():
+            columns = np.flatnonzero(below.any(axis=0) | above.any(axis=0))
+            members = int(np.sum((below | above).any(axis=1)))
+            raise ValueError(f"{self.name}: параметры {[self.keys[column] for column in columns]} "
+                             f"вышли за границы в {members} копиях")
+
+    def compute(self, tick_duration: Number) -> None:
+        self.block.compute_batch(self.values, self.index, tick_duration=tick_duration)
+
+
+class VectorizedEnsemble:
+    """
+    VectorizedEnsemble
+    ---
+    Ансамбль из N копий одной и той же модели и системы управления, которые шагают синхронно.
+    Состояние каждого блока хранится массивом (N, число параметров), тик выполняется теми же шагами,
+    что и SimulationEngine.tick, но сразу для всех копий: шум сенсоров генерируется пачкой,
+    проверка областей эстиматоров и законы управления контроллеров вычисляются векторно.
+
+    Блоки должны реализовывать векторизованные методы: compute_batch у модели и контроллеров,
+    select_controller_batch у эстиматоров, choose_controller_batch у супервизора.
+    Все параметры блоков должны быть числовыми.
+
+    Аргументы:
+        model: FunctionalBlock                                          - Модель-шаблон объекта управления
+        control_system: ControlSystem                                   - Система управления-шаблон
+        n: int                                                          - Число копий
+        tick_duration: float = 0.1                                      - Шаг симуляции
+        variations: dict[str, Any] | None = None                        - Значения параметров по копиям в виде
+                                                                          {"блок.параметр": массив (N,) или число},
+                                                                          блок - model, имя контроллера или эстиматора
+        sensor_noise: dict[str, Callable[[np.ndarray, np.random.Generator], np.ndarray]] = None
+                                                                        - Векторизованный шум сенсоров модели по именам
+                                                                          параметров, по умолчанию - BATCH_SENSOR_NOISE
+                                                                          модели. Для сенсоров без векторного шума
+                                                                          поэлементно применяется Parameter.sensor_noise:
+                                                                          это медленно и использует модуль random, а не
+                                                                          генератор ансамбля, поэтому воспроизводимо только
+                                                                          в одном процессе и при отсутствии других
+                                                                          потребителей random (random засевается seed)
+        seed: int | None = None                                         - Начальное значение генератора шума
+        record: dict[str, list[str]] | None = None                      - Какие параметры записывать на каждом тике:
+                                                                          {блок: [параметры]}, история формы (тики, N)
+    """
+
+    def __init__(self,
+                 model: FunctionalBlock,
+                 control_system: ControlSystem,
+                 n: int,
+                 tick_duration: float = 0.1,
+                 variations: dict[str, Any] | None = None,
+                 sensor_noise: dict[str, Callable[[np.ndarray, np.random.Generator], np.ndarray]] | None = None,
+                 seed: int | None = None,
+                 record: dict[str, list[str]] | None = None) -> None:
+        if n < 1:
+            raise ValueError("Число копий n должно быть положительным")
+        if float(tick_duration) <= 0:
+            raise ValueError("Некорректное значение шага симуляции")
+
+        self.n = n
+        self.tick_duration = float(tick_duration)
+        self.control_system = control_system
+        self.supervisor = control_system.supervisor
+        self.rng = np.random.default_rng(seed)
+        self.time = 0.0
+        self.ticks = 0
+
+        self.model = BatchBlock(model, n)
+        self.controllers = [BatchBlock(self.supervisor.controller_bank[name], n)
+                            for name in self.supervisor.controller_bank.get_names()]
+        self.estimators = [BatchBlock(self.supervisor.estimator_bank[name], n)
+                           for name in self.supervisor.estimator_bank.get_names()]
+        self.blocks = {block.name: block for block in [*self.controllers, *self.estimators]}
+        self.blocks["model"] = self.model
+
+        for path, value in (variations or {}).items():
+            block_name, _, key = path.partition(".")
+            block = self.blocks[block_name]
+            block.values[:, block.index[key]] = np.broadcast_to(np.asarray(value, dtype=np.float64), (n,))
+        for block in self.blocks.values():
+            block.update_derived()
+
+        self.sensors = list(model.sensors)
+        self.sensor_noise = {}
+        batch_noise = {**model.BATCH_SENSOR_NOISE, **(sensor_noise or {})}
+        scalar_keys = []
+        for key in self.sensors:
+            if key in batch_noise:
+                self.sensor_noise[key] = batch_noise[key]
+            elif model.parameters.params_dict[key].sensor_noise is not None:
+                scalar_noise = np.vectorize(model.parameters.params_dict[key].sensor_noise, otypes=[np.float64])
+                self.sensor_noise[key] = lambda values, rng, noise=scalar_noise: noise(values)
+                scalar_keys.append(key)
+        if scalar_keys:
+            model.logger.warning("Для сенсоров %s нет векторизованного шума, используется поэлементный "
+                                 "Parameter.sensor_noise на модуле random (медленно, не зависит от генератора ансамбля)",
+                                 scalar_keys)
+            if seed is not None:
+                random.seed(seed)
+
+        self.current_controller = np.zeros(n, dtype=np.int64)
+        self.record = record or {}
+        self.history: dict[str, list[np.ndarray]] = {}
+        self.history_time: list[float] = []
+
+    def read_sensors(self) -> dict[str, np.ndarray]:
+        """Данные сенсоров модели для всех копий с учётом шума"""
+        res = {}
+        for key in self.sensors:
+            values = self.model.column(key).copy()
+            noise = self.sensor_noise.get(key)
+            res[key] = values if noise is None else noise(values, self.rng)
+        return res
+
+    def tick(self) -> None:
+        """Один шаг всех копий, порядок как в SimulationEngine.tick"""
+        sensor_data = self.read_sensors()
+
+        for block in self.estimators:
+            block.load(sensor_data)
+        for block in self.controllers:
+            block.load(sensor_data)
+
+        # Эстиматоры и выбор контроллера
+        for block in self.estimators:
+            block.compute(self.tick_duration)
+        self.supervisor.chose_estimator()
+        self.current_controller = self.supervisor.choose_controller_batch(
+            {block.name: (block.values, block.index) for block in self.estimators})
+
+        # Контроллеры считаются все, управление берётся от выбранного в каждой копии
+        for block in self.controllers:
+            block.compute(self.tick_duration)
+        members = np.arange(self.n)
+        control_actions = {}
+        for key in self.control_system.control_action_keys:
+            stacked = np.stack([block.column(key) for block in self.controllers])
+            control_actions[key] = stacked[self.current_controller, members]
+
+        self.model.load(control_actions)
+        self._record()
+        self.model.compute(self.tick_duration)
+        self.model.update_derived()
+
+        self.time += self.tick_duration
+        self.ticks += 1
+
+    def _record(self) -> None:
+        if not self.record:
+            return
+        self.history_time.append(self.time)
+        self.history.setdefault("current_controller", []).append(self.current_controller.copy())
+        for block_name, keys in self.record.items():
+            block = self.blocks[block_name]
+            for key in keys:
+                self.history.setdefault(f"{block_name}.{key}", []).append(block.column(key).copy())
+
+    def run(self, simulation_time: float) -> None:
+        """Запускает все копии на время simulation_time, условие остановки как в SimulationEngine.run"""
+        start_time = self.time
+        while self.time <= start_time + simulation_time:
+            self.tick()
+
+    def get_history(self) -> dict[str, np.ndarray]:
+        """Записанная история: {"блок.параметр": массив (тики, N)}, а также time и current_controller"""
+        res = {"time": np.array(self.history_time)}
+        res.update({key: np.stack(values) for key, values in self.history.items()})
+        return res
+
+    def get_state(self, block_name: str = "model") -> dict[str, np.ndarray]:
+        """Текущие значения параметров блока по всем копиям"""
+        block = self.blocks[block_name]
+        return {key: block.column(key).copy() for key in block.keys}
+
+    def controller_names(self) -> list[str]:
+        return self.supervisor.controller_bank.get_names()
@@ -1,9 +1,21 @@
+from basics.ValueHistory import ValueHistory, HistoryClock
 from basics.Parameters import Parameter, DerivedParameter, ParameterSet
+from basics.ArrayParameterSet import ArrayParameterSet, ArrayParameter
 from basics.FunctionalBlock import FunctionalBlock
 from basics.FunctionalBlockBank import FunctionalBlockBank
 from basics.Supervisor import Supervisor
 from basics.Estimator import Estimator
 from basics.ControlSystem import ControlSystem
+from basics.HistoryTable import HistoryTable
+from basics.HistoryWriter import CsvHistoryWriter, NpyHistoryWriter
+from basics.HistoryReader import HistoryReader, HistoryTableView
+from basics.RecordingPolicy import RecordingPolicy, DecimationPolicy, ChangePolicy, DeadbandPolicy
+from basics.HistoryQuery import HistoryQuery, Transitions
 from basics.Historizer import Historizer
-from basics.logger import ColoredFormatter
+from basics.logger import ColoredFormatter, LazyQueueHandler, make_queue_handler
+from basics.TickProfiler import TickProfiler
+from basics.EventTrace import EventTrace
 from basics.SimulationEngine import SimulationEngine
+from basics.EnsembleRunner import EnsembleRunner, EnsembleResult
+from basics.ParameterSweep import ParameterSweep
+from basics.VectorizedEnsemble import VectorizedEnsemble, BatchBlock
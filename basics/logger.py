@@ -1,4 +1,7 @@
+import copy
 import logging
+import logging.handlers
+import queue
 from colorama import Fore, Style
 
 class ColoredFormatter(logging.Formatter):
@@ -17,3 +20,38 @@ class ColoredFormatter(logging.Formatter):
         message = super().format(record)
         return f"{color}{message}{reset}"
 
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    LazyQueueHandler
+    ---
+    QueueHandler, который в вызывающем потоке только подставляет аргументы в сообщение (%-форматирование),
+    а оформление записи форматтерами (время, уровень, цвета) выполняется обработчиками в потоке QueueListener.
+    Аргументы подставляются сразу, поэтому изменение переданных в лог объектов после вызова не влияет на запись.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def make_queue_handler(*handlers: logging.Handler) -> tuple[LazyQueueHandler, logging.handlers.QueueListener]:
+    """
+    make_queue_handler
+    ---
+    Переносит обработчики handlers (файлы, консоль) в отдельный поток: возвращает обработчик для логгера
+    и запущенный QueueListener, который нужно остановить (stop) по завершении работы.
+    Уровень обработчика очереди равен минимальному уровню handlers, поэтому записи, которые никто
+    не выведет, отбрасываются до форматирования.
+    """
+    log_queue = queue.SimpleQueue()
+    queue_handler = LazyQueueHandler(log_queue)
+    queue_handler.setLevel(min(handler.level for handler in handlers))
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return queue_handler, listener
@@ -0,0 +1,218 @@
+"""
+Бенчмарк производительности симуляции на сценарии example.py.
+
+Измеряет тики в секунду и прирост памяти на тик (tracemalloc) при росте длины запуска, числа контроллеров,
+числа параметров и числа зависимых параметров модели. Результаты можно сохранить как базовые (JSON)
+и сравнивать с ними последующие запуски: падение скорости или рост памяти больше порога считается регрессией.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_simulation --save-baseline benchmarks/baseline.json
+    python -m benchmarks.bench_simulation --compare benchmarks/baseline.json --threshold 0.1
+"""
+import argparse
+import copy
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any
+
+from basics import SimulationEngine, Historizer, ControlSystem, Parameter, DerivedParameter, ParameterSet
+from modules.estimators import RangeEstimator
+from modules.supervisors import OneEstimatorSupervisor
+
+from examples.example import ExampleModel, ExampleController
+
+# Оси масштабирования: для каждой оси меняется один параметр, остальные берутся из DEFAULT
+DEFAULT = {"simulation_time": 50, "controllers": 3, "parameters": 0, "derived": 0}
+AXES = {
+    "simulation_time": [10, 50, 200],
+    "controllers": [3, 9, 27],
+    "parameters": [0, 10, 100],
+    "derived": [0, 10, 100],
+}
+QUICK_AXES = {
+    "simulation_time": [10, 50],
+    "controllers": [3, 9],
+    "parameters": [0, 10],
+    "derived": [0, 10],
+}
+LEVEL_RANGE = 15  # Границы уровня в ExampleModel
+
+
+def build_benchmark_simulation(controllers: int = 3,
+                               parameters: int = 0,
+                               derived: int = 0,
+                               results_subfolder: str | None = "/benchmark") -> SimulationEngine:
+    """
+    build_benchmark_simulation
+    ---
+    Сценарий example.py с изменяемым размером: controllers контроллеров делят диапазон уровня на равные области
+    RangeEstimator, в модель добавляются parameters независимых параметров и цепочка из derived зависимых параметров.
+    История записывается в память (results_subfolder), чтобы учитывать её в памяти на тик.
+
+    Аргументы:
+        controllers: int = 3                        - Число контроллеров
+        parameters: int = 0                         - Число дополнительных параметров модели
+        derived: int = 0                            - Число дополнительных зависимых параметров модели
+        results_subfolder: str | None = "/benchmark"- Папка результатов, None - история не записывается
+    """
+    logger = logging.getLogger(f"{__name__}.engine")
+    logger.propagate = False
+
+    model_params = {key: copy.deepcopy(param) for key, param in ExampleModel.model_parameters.params_dict.items()}
+    model_params["Level"].value = 5
+    model_params["Level_dot"].value = 0
+    for i in range(parameters):
+        model_params[f"extra_{i}"] = Parameter(f"extra {i}", float(i), sensor=i % 2 == 0)
+    for i in range(derived):  # Имя зависимого параметра должно совпадать с ключом (см. ParameterSet._topological_sort)
+        if i == 0:
+            model_params["derived_0"] = DerivedParameter("derived_0", lambda level: 2 * level, ["Level"])
+        else:
+            model_params[f"derived_{i}"] = DerivedParameter(f"derived_{i}", lambda previous, level: 0.5 * previous + level,
+                                                            [f"derived_{i - 1}", "Level"])
+    model = ExampleModel.ExampleModel(logger=logger, parameters=ParameterSet(**model_params), name="Benchmark model")
+
+    # Равные области уровня для контроллеров, крайние области открыты
+    bounds = [-LEVEL_RANGE + 2 * LEVEL_RANGE * i / controllers for i in range(controllers + 1)]
+    bounds[0], bounds[-1] = None, None
+    controller_blocks, regions = [], {}
+    for i in range(controllers):
+        controller_parameters = copy.deepcopy(ExampleController.controller_parameters)
+        controller_parameters["Strength"] = 0.8 if i != controllers // 2 else 0
+        name = f"Controller_{i}"
+        controller_blocks.append(ExampleController.Controller(logger=logger, parameters=controller_parameters, name=name))
+        regions[name] = {"Level": (bounds[i], bounds[i + 1])}
+
+    estimator = RangeEstimator(logger=logger, process_parameters=["Level"], controller_regions=regions)
+    supervisor = OneEstimatorSupervisor(logger=logger, controllers=controller_blocks, estimators=[estimator],
+                                        name="Benchmark supervisor")
+    control_system = ControlSystem(logger=logger, parameters=ParameterSet(), supervisor=supervisor,
+                                   control_action_keys=["Level_control"], name="Benchmark control system")
+    return SimulationEngine(name="Benchmark", model=model, control_system=control_system, historizer=Historizer(),
+                            tick_duration=0.1, logger=logger, logs_subfolder=None, results_subfolder=results_subfolder)
+
+
+def measure(case: dict[str, Any], repeat: int = 3) -> dict[str, float]:
+    """
+    measure
+    ---
+    Лучшая из repeat скорость в тиках в секунду и прирост памяти на тик в отдельном запуске под tracemalloc
+    """
+    build_kwargs = {key: case[key] for key in ("controllers", "parameters", "derived")}
+    best = 0.0
+    ticks = 0
+    for _ in range(repeat):
+        engine = build_benchmark_simulation(**build_kwargs)
+        start_time = engine.time
+        start = time.perf_counter()
+        engine.run(case["simulation_time"])
+        elapsed = time.perf_counter() - start
+        ticks = round((engine.time - start_time) / engine.tick_duration)
+        best = max(best, ticks / elapsed)
+
+    engine = build_benchmark_simulation(**build_kwargs)
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    engine.run(case["simulation_time"])
+    after, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "ticks": ticks,
+        "ticks_per_sec": best,
+        "bytes_per_tick": (after - before) / ticks,
+        "peak_bytes": peak - before,
+    }
+
+
+def case_name(case: dict[str, Any]) -> str:
+    return ",".join(f"{key}={case[key]}" for key in DEFAULT)
+
+
+def run_suite(axes: dict[str, list], repeat: int = 3) -> dict[str, dict[str, float]]:
+    """Прогон всех случаев по осям масштабирования, результат {имя случая: метрики}"""
+    cases = {}
+    for axis, values in axes.items():
+        for value in values:
+            case = {**DEFAULT, axis: value}
+            cases.setdefault(case_name(case), case)
+
+    results = {}
+    for name, case in cases.items():
+        results[name] = {**case, **measure(case, repeat=repeat)}
+        print(f"{name:60s} {results[name]['ticks_per_sec']:10.1f} тиков/с "
+              f"{results[name]['bytes_per_tick']:10.1f} байт/тик")
+    return results
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[str]:
+    """
+    compare
+    ---
+    Регрессии относительно базовых результатов: скорость ниже базовой больше чем на threshold
+    или память на тик выше больше чем на threshold (доли, 0.1 = 10%)
+    """
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        speed_change = current["ticks_per_sec"] / base["ticks_per_sec"] - 1
+        if speed_change < -threshold:
+            regressions.append(f"{name}: скорость {current['ticks_per_sec']:.1f} тиков/с, "
+                               f"базовая {base['ticks_per_sec']:.1f} ({speed_change:+.1%})")
+        if base["bytes_per_tick"] > 0:
+            memory_change = current["bytes_per_tick"] / base["bytes_per_tick"] - 1
+            if memory_change > threshold:
+                regressions.append(f"{name}: память {current['bytes_per_tick']:.1f} байт/тик, "
+                                   f"базовая {base['bytes_per_tick']:.1f} ({memory_change:+.1%})")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк скорости и памяти симуляции")
+    parser.add_argument("--quick", action="store_true", help="Сокращённый набор случаев")
+    parser.add_argument("--repeat", type=int, default=3, help="Число повторов для замера скорости")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Сохранить результаты как базовые в JSON")
+    parser.add_argument("--compare", metavar="PATH", help="Сравнить с базовыми результатами из JSON")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Допустимое ухудшение, доля (0.1 = 10%%)")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare, encoding="UTF-8") as file:
+            baseline = json.load(file)["results"]
+    save_path = None if args.save_baseline is None else os.path.abspath(args.save_baseline)
+
+    # История пишется в папку results относительно текущей папки - работаем во временной
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            results = run_suite(QUICK_AXES if args.quick else AXES, repeat=args.repeat)
+        finally:
+            os.chdir(cwd)
+
+    if save_path is not None:
+        with open(save_path, "w", encoding="UTF-8") as file:
+            json.dump({"python": sys.version, "platform": platform.platform(), "results": results},
+                      file, indent=2, ensure_ascii=False)
+        print(f"Базовые результаты сохранены в {save_path}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("Регрессии производительности:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print("Регрессий нет")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
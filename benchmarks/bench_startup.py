@@ -0,0 +1,136 @@
+"""
+Бенчмарк времени запуска: импорт basics, сборка сценария example.py и первый тик, копирование наборов параметров.
+
+Каждый случай выполняется в отдельном чистом процессе Python, чтобы учитывалось время импорта модулей.
+Кроме времени проверяется, что тяжёлые зависимости (LAZY_MODULES) не импортируются раньше, чем нужны:
+импорт basics и сборка симуляции не должны загружать sympy, pandas и scipy. Результаты можно сохранить
+как базовые (JSON) и сравнивать с ними последующие запуски, как в bench_simulation.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_startup --save-baseline benchmarks/startup_baseline.json
+    python -m benchmarks.bench_startup --compare benchmarks/startup_baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAZY_MODULES = ("sympy", "pandas", "scipy")
+
+# Случаи: (подготовка без замера, замеряемый код, должны ли тяжёлые модули оставаться незагруженными)
+CASES = {
+    "import_basics": ("", "import basics", True),
+    "build_example": ("",
+                      "import basics\n"
+                      "from examples.example.ExampleScenario import build_simulation\n"
+                      "engine = build_simulation()", True),
+    "deepcopy_parameters": ("import copy\n"
+                            "from examples.example import ExampleController, ExampleModel",
+                            "for _ in range(100):\n"
+                            "    copy.deepcopy(ExampleController.controller_parameters)\n"
+                            "    copy.deepcopy(ExampleModel.model_parameters)", True),
+    "first_tick": ("from examples.example.ExampleScenario import build_simulation\n"
+                   "engine = build_simulation()",
+                   "engine.run(engine.tick_duration)", False),
+}
+
+# Код, выполняемый в отдельном процессе: замер и список загруженных тяжёлых модулей в JSON
+RUNNER = """
+import json, sys, time
+{setup}
+start = time.perf_counter()
+{measured}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds,
+                  "modules": [name for name in {lazy!r} if name in sys.modules]}}))
+"""
+
+
+def run_case(setup: str, measured: str) -> dict:
+    """Один запуск случая в новом процессе Python, рабочая папка - временная"""
+    code = RUNNER.format(setup=setup, measured=measured, lazy=LAZY_MODULES)
+    env = {**os.environ, "PYTHONPATH": ROOT + os.pathsep + os.environ.get("PYTHONPATH", "")}
+    with tempfile.TemporaryDirectory() as directory:
+        result = subprocess.run([sys.executable, "-c", code], cwd=directory, env=env,
+                                capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure(repeat: int = 5) -> dict[str, dict]:
+    """Лучшее из repeat время каждого случая и тяжёлые модули, загруженные к концу замера"""
+    results = {}
+    for name, (setup, measured, must_stay_lazy) in CASES.items():
+        runs = [run_case(setup, measured) for _ in range(repeat)]
+        results[name] = {
+            "seconds": min(run["seconds"] for run in runs),
+            "modules": runs[0]["modules"],
+            "must_stay_lazy": must_stay_lazy,
+        }
+        print(f"{name:25s} {results[name]['seconds'] * 1000:10.1f} мс  загружены: {', '.join(runs[0]['modules']) or '-'}")
+    return results
+
+
+def check_lazy(results: dict[str, dict]) -> list[str]:
+    """Случаи, в которых тяжёлые модули загружены раньше, чем нужны"""
+    return [f"{name}: загружены {', '.join(result['modules'])}"
+            for name, result in results.items() if result["must_stay_lazy"] and result["modules"]]
+
+
+def compare(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[str]:
+    """Регрессии: время больше базового больше чем на threshold (доля, 0.2 = 20%)"""
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        change = current["seconds"] / base["seconds"] - 1
+        if change > threshold:
+            regressions.append(f"{name}: {current['seconds'] * 1000:.1f} мс, "
+                               f"базовое {base['seconds'] * 1000:.1f} мс ({change:+.1%})")
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Бенчмарк времени импорта и запуска симуляции")
+    parser.add_argument("--repeat", type=int, default=5, help="Число запусков каждого случая")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Сохранить результаты как базовые в JSON")
+    parser.add_argument("--compare", metavar="PATH", help="Сравнить с базовыми результатами из JSON")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Допустимое ухудшение, доля (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    results = measure(repeat=args.repeat)
+    failed = False
+
+    eager = check_lazy(results)
+    if eager:
+        print("Тяжёлые модули импортируются раньше, чем нужны:")
+        for message in eager:
+            print(f"  {message}")
+        failed = True
+
+    if args.save_baseline is not None:
+        with open(args.save_baseline, "w", encoding="UTF-8") as file:
+            json.dump({"python": sys.version, "platform": platform.platform(), "results": results},
+                      file, indent=2, ensure_ascii=False)
+        print(f"Базовые результаты сохранены в {args.save_baseline}")
+
+    if args.compare is not None:
+        with open(args.compare, encoding="UTF-8") as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("Регрессии времени запуска:")
+            for regression in regressions:
+                print(f"  {regression}")
+            failed = True
+        else:
+            print("Регрессий нет")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
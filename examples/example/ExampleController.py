@@ -8,6 +8,10 @@ class Controller(FunctionalBlock):
         # Управляющиее воздействие от контроллера вычисляется как сила*текущий уровень
         self.parameters['Level_control'] = self.parameters['Strength'] * self.parameters["Level"]
 
+    def compute_batch(self, values, index, tick_duration: Number = None) -> None:
+        # То же самое сразу для всех копий контроллера в ансамбле
+        values[:, index['Level_control']] = values[:, index['Strength']] * values[:, index['Level']]
+
 
 controller_parameters = ParameterSet(
     # Параметр уровня, обращаться по ключу "Level", начальное значение 0, не является сенсором, так как для контроллера это входное значение
@@ -1,10 +1,18 @@
 from basics import FunctionalBlock, Parameter, ParameterSet
 from numbers import Number
 import random
-from scipy.integrate import solve_ivp
+
+import numpy as np
+
+
+def level_sensor_noise(values: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Векторизованный шум датчика уровня для VectorizedEnsemble, как sensor_noise параметра Level"""
+    return values + rng.uniform(-1, 1, values.shape)
 
 
 class ExampleModel(FunctionalBlock):
+    BATCH_SENSOR_NOISE = {"Level": level_sensor_noise}
+
     @staticmethod
     def update_level(t, y, omega, control):
         """Функция, описывающая динамику системы. Представлена в виде системы диф уравнений в нормальной форме
@@ -15,7 +23,9 @@ class ExampleModel(FunctionalBlock):
         return [level_dot, -1*omega**2*level + control]
 
     def compute(self, tick_duration:Number = None) -> None:
-        self.logger.debug(f"Уровень в модели до обновления {self.parameters['Level']}")
+        from scipy.integrate import solve_ivp  # scipy импортируется при первом шаге модели, а не при импорте примера
+
+        self.logger.debug("Уровень в модели до обновления %s", self.parameters['Level'])
         # Посчитаем новые значения уровня и его скорости как решение ОДУ
         sol = solve_ivp(fun=self.update_level,
                         y0=[self.parameters['Level'], self.parameters['Level_dot']],
@@ -30,10 +40,31 @@ class ExampleModel(FunctionalBlock):
         self.parameters['Level_dot'] = sol.y[1, -1]
         self.parameters['Level'] = sol.y[0, -1]
 
-        self.parameters.compute_step_integral(dt=tick_duration, keys=['Level'])
-        self.parameters['Level_Integral'] = self.parameters.get_integral(keys=['Level'])['Level']
+        # Интеграл уровня на шаге записывается в Level_Integral, см. track_integral ниже
+        self.parameters.update_tracked(dt=tick_duration)
+
+        self.logger.debug("Уровень в модели после обновления %s", self.parameters['Level'])
+
+    def compute_batch(self, values, index, tick_duration: Number = None) -> None:
+        # Для ансамбля решаем ту же ОДУ сразу для всех копий модели методом Рунге-Кутты 4 порядка с постоянным шагом
+        omega = values[:, index["omega"]]
+        control = values[:, index["Level_control"]]
+        level_before = values[:, index["Level"]].copy()
+        y = np.stack([level_before, values[:, index["Level_dot"]]])
+
+        def rhs(state):
+            return np.stack([state[1], -1 * omega ** 2 * state[0] + control])
+
+        k1 = rhs(y)
+        k2 = rhs(y + tick_duration / 2 * k1)
+        k3 = rhs(y + tick_duration / 2 * k2)
+        k4 = rhs(y + tick_duration * k3)
+        y = y + tick_duration / 6 * (k1 + 2 * k2 + 2 * k3 + k4)
 
-        self.logger.debug(f"Уровень в модели после обновления {self.parameters['Level']}")
+        values[:, index["Level"]] = y[0]
+        values[:, index["Level_dot"]] = y[1]
+        # Интеграл уровня методом трапеций, как compute_step_integral в скалярной версии
+        values[:, index["Level_Integral"]] += (level_before + y[0]) * tick_duration / 2
 
 
 model_parameters = ParameterSet(
@@ -48,3 +79,5 @@ model_parameters = ParameterSet(
                 # Параметр для демонстрации, что мы умеем интегрировать
                 Level_Integral = Parameter("Level Integral", 0),
                 )
+# Интеграл уровня методом трапеций пересчитывается на каждом шаге модели через update_tracked
+model_parameters.track_integral("Level", target="Level_Integral")
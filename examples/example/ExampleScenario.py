@@ -0,0 +1,70 @@
+import copy
+import logging
+
+from basics import SimulationEngine, Historizer, ControlSystem, ParameterSet
+from modules.supervisors import OneEstimatorSupervisor
+
+from examples.example import ExampleModel, ExampleController, ExampleEstimator
+
+
+def build_simulation(run_index: int = 0,
+                     boundary: float = 4,
+                     strengths: dict[str, float] | None = None,
+                     level: float = 5,
+                     omega: float = 1,
+                     tick_duration: float = 0.1,
+                     results_subfolder: str | None = None,
+                     historizer: Historizer | None = None,
+                     logger: logging.Logger | None = None) -> SimulationEngine:
+    """
+    build_simulation
+    ---
+    Сборка сценария example.py в виде функции, чтобы его можно было создавать в отдельных процессах
+    (ансамбли Монте-Карло, перебор параметров, бенчмарки).
+
+    Аргументы:
+        run_index: int = 0                          - Номер запуска, добавляется к имени симуляции
+        boundary: float = 4                         - Граница областей контроллеров в эстиматоре
+        strengths: dict[str, float] | None = None   - Сила управления по именам контроллеров
+        level: float = 5                            - Начальный уровень
+        omega: float = 1                            - Собственная частота модели
+        tick_duration: float = 0.1                  - Шаг симуляции
+        results_subfolder: str | None = None        - Папка результатов, None - история не сохраняется
+        historizer: Historizer | None = None        - Хранилище истории, по умолчанию новый Historizer
+        logger: logging.Logger | None = None        - Логгер, по умолчанию логгер без обработчиков
+    """
+    if logger is None:
+        logger = logging.getLogger(f"{__name__}.{run_index}")
+        logger.propagate = False
+    if strengths is None:
+        strengths = {"Controller_min": 0.8, "Controller_max": 0.75, "Controller_middle": 0}
+
+    model_parameters = copy.deepcopy(ExampleModel.model_parameters)
+    model_parameters["Level"] = level
+    model_parameters["Level_dot"] = 0
+    model_parameters["omega"] = omega
+    model = ExampleModel.ExampleModel(logger=logger, parameters=model_parameters, name="Example level control model")
+
+    controllers = []
+    for controller_name in ("Controller_min", "Controller_max", "Controller_middle"):
+        controller_parameters = copy.deepcopy(ExampleController.controller_parameters)
+        controller_parameters["Strength"] = strengths[controller_name]
+        controllers.append(ExampleController.Controller(logger=logger, parameters=controller_parameters,
+                                                        name=controller_name))
+
+    estimator = ExampleEstimator.get_estimator(logger, boundary=boundary)
+    supervisor = OneEstimatorSupervisor(logger=logger, controllers=controllers, estimators=[estimator],
+                                        name="Example supervisor")
+    control_system = ControlSystem(logger=logger, parameters=ParameterSet(), supervisor=supervisor,
+                                   control_action_keys=["Level_control"], name="Example Control system")
+
+    return SimulationEngine(
+        name=f"Example Simulation {run_index}",
+        model=model,
+        control_system=control_system,
+        historizer=historizer if historizer is not None else Historizer(),
+        tick_duration=tick_duration,
+        logger=logger,
+        logs_subfolder=None,
+        results_subfolder=results_subfolder,
+    )
@@ -1,7 +1,10 @@
 from basics import Estimator, FunctionalBlockBank, Parameter, ParameterSet
+from basics.EventTrace import EVENT_REGION_MISS, EVENT_REGION_OVERLAP
 from numbers import Number
 import logging
 
+import numpy as np
+
 
 class RangeEstimator(Estimator):
     """
@@ -131,10 +134,40 @@ class RangeEstimator(Estimator):
 
         return matched
 
+    def select_controller_batch(self, values: np.ndarray, index: dict[str, int]) -> np.ndarray:
+        """
+        Векторизованный select_controller: проверка попадания в области сразу для всех копий эстиматора
+        """
+        matched = np.ones((len(self.controller_names), values.shape[0]), dtype=bool)
+        for position, controller_name in enumerate(self.controller_names):
+            for parameter_name, (lower, upper) in self.controller_regions[controller_name].items():
+                column = values[:, index[parameter_name]]
+                if lower is not None:
+                    matched[position] &= column >= lower
+                if upper is not None:
+                    matched[position] &= column < upper
+
+        counts = matched.sum(axis=0)
+        if np.any(counts == 0):
+            self.logger.error(f"Для {int(np.sum(counts == 0))} копий эстиматора {self.name} не найдено ни одного контроллера")
+            raise ValueError(
+                "Текущая точка процесса не попала ни в одну область. "
+                "Проверьте разбиение пространства параметров на области контроллеров."
+            )
+        if np.any(counts > 1):
+            self.logger.warning(f"Для {int(np.sum(counts > 1))} копий эстиматора {self.name} найдено более одного контроллера")
+            raise RuntimeWarning(
+                "Текущая точка процесса попала сразу в несколько областей. "
+                "Границы контроллеров должны формировать непересекающиеся области."
+            )
+        return np.argmax(matched, axis=0)
+
     def select_controller(self) -> str:
         matched_controllers = self._find_matching_controllers()
 
         if len(matched_controllers) == 0:
+            if self.event_trace is not None:
+                self.event_trace.emit(EVENT_REGION_MISS, source=self.name)
             self.logger.error(f"Для точки {self.parameters.as_dict(self.process_parameter_names)} не найдено ни одного контроллера")
             raise ValueError(
                 "Текущая точка процесса не попала ни в одну область. "
@@ -142,6 +175,8 @@ class RangeEstimator(Estimator):
             )
 
         if len(matched_controllers) > 1:
+            if self.event_trace is not None:
+                self.event_trace.emit(EVENT_REGION_OVERLAP, source=self.name, new=matched_controllers[0])
             self.logger.warning(
                 f"Для точки {self.parameters.as_dict(self.process_parameter_names)} найдено более одного контроллера: "
                 f"{matched_controllers}")
@@ -2,6 +2,8 @@ from basics import Estimator, FunctionalBlock, FunctionalBlockBank, Parameter, P
 from numbers import Number
 import logging
 
+import numpy as np
+
 
 class OneEstimatorSupervisor(Supervisor):
     """
@@ -42,5 +44,13 @@ class OneEstimatorSupervisor(Supervisor):
         chosen_controller = max(controller_quality, key=controller_quality.get)  # имя (ключ) с максимальным значением
         self.current_controller = chosen_controller
 
+    def choose_controller_batch(self, estimator_states: dict[str, tuple[np.ndarray, dict[str, int]]]) -> np.ndarray:
+        """
+        Векторизованный choose_controller: для каждой копии выбирается контроллер с максимальным quality
+        """
+        values, index = estimator_states[self.current_estimator]
+        columns = [index[controller_name] for controller_name in self.controller_bank.get_names()]
+        return np.argmax(values[:, columns], axis=1)
+
     def chose_estimator(self) -> None:
         self.current_estimator = self.estimator_bank.get_names()[0]
\ No newline at end of file
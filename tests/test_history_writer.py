@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from basics.Historizer import Historizer
+from basics.HistoryReader import HistoryReader
+
+
+class NpyStreamMergeTest(unittest.TestCase):
+    """Объединение порций потоковой записи в бинарном формате"""
+
+    def setUp(self) -> None:
+        self._cwd = os.getcwd()
+        self._tmp = tempfile.TemporaryDirectory()
+        os.chdir(self._tmp.name)  # Historizer пишет в папку results относительно рабочей папки
+
+    def tearDown(self) -> None:
+        os.chdir(self._cwd)
+        self._tmp.cleanup()
+
+    def test_int_column_appearing_late_keeps_missing_values(self):
+        historizer = Historizer(stream_chunk_size=2, file_format="npy")
+        historizer.subfolder = "/test"
+        historizer.create_folder("late_column")
+        historizer.record(0.0, state={"a": 1.0})
+        historizer.record(1.0, state={"a": 2.0})
+        historizer.record(2.0, state={"a": 3.0, "count": 5})
+        historizer.record(3.0, state={"a": 4.0, "count": 6})
+        historizer.save_history()
+
+        frame = HistoryReader(historizer.dir).read("state")
+
+        self.assertEqual(frame["count"].dtype, np.float64)
+        self.assertTrue(np.isnan(frame["count"].iloc[:2]).all())
+        self.assertEqual(frame["count"].iloc[2:].tolist(), [5.0, 6.0])
+
+
+if __name__ == "__main__":
+    unittest.main()